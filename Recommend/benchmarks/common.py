@@ -0,0 +1,52 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against the database configured in config/config.py and are
+started from the Recommend directory, e.g.:
+
+    python -m benchmarks.ingredient_similarity --samples 200
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+from config.config import LOG_FORMAT
+from config.db import initialize_pool
+
+def setup(log_level: str = "WARNING"):
+    """Configure logging and open the connection pool."""
+    logging.basicConfig(level=getattr(logging, log_level), format=LOG_FORMAT)
+    initialize_pool()
+
+def percentile(values: List[float], pct: float) -> float:
+    """Get the pct-th percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+def summarize(latencies_ms: List[float]) -> Dict[str, float]:
+    """Summarize latencies in milliseconds."""
+    return {
+        "count": len(latencies_ms),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3)
+    }
+
+@contextmanager
+def timer(latencies_ms: List[float]):
+    """Append the elapsed time of the block, in milliseconds, to a list."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        latencies_ms.append((time.perf_counter() - start_time) * 1000)
+
+def print_summary(name: str, summary: Dict[str, float]):
+    """Print one summary line."""
+    fields = "  ".join(f"{key}={value}" for key, value in summary.items())
+    print(f"{name:<28} {fields}")
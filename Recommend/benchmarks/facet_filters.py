@@ -0,0 +1,94 @@
+"""
+Benchmark the facet index against the equivalent SQL filter predicates.
+
+Draws random combinations of cuisine, diet, time and calorie filters, resolves
+each one to a set of recipe IDs with both paths, checks the sets agree and
+reports latency.
+
+    python -m benchmarks.facet_filters --samples 200
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import setup, summarize, timer, print_summary
+from config.db import execute_query
+from indexes.facets import FacetIndex
+from models.queries_recipe import get_recipe_facet_rows
+
+DIET_COLUMNS = ["vegan", "lacto_vegetarian", "pescetarian"]
+
+def sql_ids(filters):
+    """Resolve filters with the SQL predicates used by the search queries."""
+    clauses = ["1=1"]
+    params = {}
+    if filters.get("cuisines"):
+        clauses.append("(r.region = ANY(%(cuisines)s) OR r.sub_region = ANY(%(cuisines)s))")
+        params["cuisines"] = filters["cuisines"]
+    if filters.get("diets"):
+        conditions = " OR ".join(f"rda.{column} = TRUE" for column in filters["diets"])
+        clauses.append(f"EXISTS (SELECT 1 FROM recipe_diet_attributes rda WHERE rda.recipe_id = r.recipe_id AND ({conditions}))")
+    if filters.get("max_time") is not None:
+        clauses.append("COALESCE(r.total_time, r.prep_time + COALESCE(r.cook_time, 0)) <= %(max_time)s")
+        params["max_time"] = filters["max_time"]
+    if filters.get("max_calories") is not None:
+        clauses.append("r.calories <= %(max_calories)s")
+        params["max_calories"] = filters["max_calories"]
+
+    query = f"SELECT r.recipe_id FROM recipes r WHERE {' AND '.join(clauses)} ORDER BY r.recipe_id"
+    return [row["recipe_id"] for row in execute_query(query, params)]
+
+def random_filters(cuisines):
+    """Draw a random, non-empty filter combination."""
+    filters = {}
+    while not filters:
+        if cuisines and random.random() < 0.6:
+            filters["cuisines"] = random.sample(cuisines, min(len(cuisines), random.randint(1, 2)))
+        if random.random() < 0.5:
+            filters["diets"] = [random.choice(DIET_COLUMNS)]
+        if random.random() < 0.5:
+            filters["max_time"] = random.choice([15, 30, 45, 60, 120])
+        if random.random() < 0.3:
+            filters["max_calories"] = random.choice([300, 500, 800])
+    return filters
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=200, help="Number of filter combinations")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    setup()
+    random.seed(args.seed)
+
+    start_time = time.perf_counter()
+    rows = get_recipe_facet_rows()
+    load_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    index = FacetIndex(rows)
+    build_seconds = time.perf_counter() - start_time
+
+    print(f"Indexed {len(index)} recipes: load {load_seconds:.2f}s, build {build_seconds:.2f}s")
+    print(f"Index stats: {index.stats()}")
+
+    cuisines = sorted({row["region"] for row in rows if row["region"]})
+    sql_latencies, index_latencies = [], []
+    mismatches = 0
+
+    for _ in range(args.samples):
+        filters = random_filters(cuisines)
+        with timer(sql_latencies):
+            expected = sql_ids(filters)
+        with timer(index_latencies):
+            actual = index.to_ids(index.match(**filters)).tolist()
+
+        if actual != expected:
+            mismatches += 1
+
+    print_summary("SQL predicates", summarize(sql_latencies))
+    print_summary("facet index", summarize(index_latencies))
+    print(f"mismatched candidate sets: {mismatches} of {args.samples}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Generate a synthetic catalog and interaction history for scale testing.
+
+Loads recipes, recipe_ingredients, recipe_diet_attributes, recipe_embeddings
+and user_interactions with COPY, in chunks, into the database configured in
+config/config.py, so the other benchmarks can run against production-sized
+tables. The data is shaped like real traffic rather than uniform noise:
+
+- Recipe popularity follows a Zipf distribution over a shuffled ranking, so a
+  few hundred recipes take most interactions and the long tail is barely seen.
+- History lengths per user are log-normal: most users have a handful of
+  interactions and a few have thousands.
+- Interactions are mostly views, and recent days are busier than old ones.
+  Each user has at most one row per recipe and interaction type, as the
+  service's own writes keep it.
+- Embeddings are random unit vectors pulled towards a centroid per region, so
+  vector search returns neighbours of the same cuisine.
+
+Generated recipes have source "synthetic-dataset" and generated users the
+"synth-" prefix; --clean deletes both, and the rating stats trigger of
+migration 007 keeps recipe_rating_stats in step with both the load and the
+clean. Needs migrations 002, 004 and 007. Scales from 10K recipes / 100K
+interactions to 1M recipes / 100M interactions:
+
+    python -m benchmarks.generate_dataset --scale small
+    python -m benchmarks.generate_dataset --recipes 200000 --interactions 5000000 --seed 7
+    python -m benchmarks.generate_dataset --clean
+"""
+import argparse
+import io
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.common import setup
+from config.config import EMBEDDING_DIMENSION, INTERACTION_RETENTION_DAYS
+from config.db import get_connection, statement_timeout, execute_query
+from maintenance.interaction_retention import next_month
+from models.queries_recommend import interactions_partitioned, create_interaction_partition, typed_recipe_key_available
+
+SYNTHETIC_SOURCE = "synthetic-dataset"
+SYNTHETIC_USER_PREFIX = "synth-"
+
+# (recipes, interactions) per scale
+SCALES = {
+    "small": (10_000, 100_000),
+    "medium": (100_000, 1_000_000),
+    "large": (300_000, 10_000_000),
+    "xlarge": (1_000_000, 100_000_000)
+}
+
+# Rows generated and copied per round trip
+CHUNK_ROWS = 200_000
+
+REGIONS = [
+    ("Italian", "Southern European", "Europe"),
+    ("French", "Western European", "Europe"),
+    ("Spanish", "Southern European", "Europe"),
+    ("Greek", "Southern European", "Europe"),
+    ("British", "Northern European", "Europe"),
+    ("Mexican", "Central American", "North America"),
+    ("American", "Northern American", "North America"),
+    ("Brazilian", "South American", "South America"),
+    ("Peruvian", "South American", "South America"),
+    ("Indian", "Indian Subcontinent", "Asia"),
+    ("Chinese", "Eastern Asian", "Asia"),
+    ("Japanese", "Eastern Asian", "Asia"),
+    ("Korean", "Eastern Asian", "Asia"),
+    ("Thai", "South-Eastern Asian", "Asia"),
+    ("Vietnamese", "South-Eastern Asian", "Asia"),
+    ("Lebanese", "Middle Eastern", "Asia"),
+    ("Turkish", "Middle Eastern", "Asia"),
+    ("Moroccan", "Northern Africa", "Africa"),
+    ("Ethiopian", "Eastern Africa", "Africa"),
+    ("Australian", "Australian", "Australia")
+]
+
+TITLE_ADJECTIVES = ["Smoky", "Spicy", "Creamy", "Crispy", "Roasted", "Grilled", "Braised", "Tangy",
+                    "Herbed", "Garlic", "Lemon", "Honey", "Charred", "Slow-Cooked", "Sticky", "Zesty"]
+TITLE_PROTEINS = ["Chicken", "Beef", "Pork", "Lamb", "Salmon", "Shrimp", "Tofu", "Chickpea", "Lentil",
+                  "Mushroom", "Eggplant", "Cauliflower", "Duck", "Cod", "Paneer", "Black Bean"]
+TITLE_DISHES = ["Stew", "Curry", "Salad", "Tacos", "Skewers", "Soup", "Noodles", "Rice Bowl", "Pie",
+                "Flatbread", "Stir-Fry", "Tagine", "Risotto", "Wraps", "Casserole", "Dumplings"]
+
+INGREDIENT_BASES = ["onion", "garlic", "tomato", "potato", "carrot", "celery", "bell pepper", "chili",
+                    "ginger", "lemon", "lime", "olive oil", "butter", "flour", "rice", "pasta", "egg",
+                    "milk", "cream", "cheese", "yogurt", "chicken", "beef", "pork", "lamb", "salmon",
+                    "shrimp", "tofu", "chickpeas", "lentils", "black beans", "spinach", "kale",
+                    "mushroom", "eggplant", "zucchini", "cauliflower", "broccoli", "cabbage", "corn",
+                    "coriander", "cumin", "paprika", "turmeric", "cinnamon", "basil", "parsley",
+                    "thyme", "rosemary", "oregano", "soy sauce", "fish sauce", "vinegar", "honey",
+                    "sugar", "salt", "black pepper", "coconut milk", "peanuts", "sesame seeds"]
+INGREDIENT_VARIANTS = ["", "fresh", "dried", "ground", "chopped", "smoked", "organic", "frozen"]
+UNITS = ["g", "ml", "tbsp", "tsp", "cup", "piece", "clove", "pinch"]
+STATES = ["", "chopped", "diced", "sliced", "minced", "grated", "whole"]
+
+INTERACTION_TYPES = ["view", "like", "save", "cook", "rating", "ignore"]
+INTERACTION_WEIGHTS = [0.62, 0.14, 0.09, 0.06, 0.05, 0.04]
+RATING_TYPE = INTERACTION_TYPES.index("rating")
+
+DIET_COLUMNS = ["vegan", "vegetarian", "pescetarian", "gluten_free", "dairy_free",
+                "low_carb", "keto", "paleo", "lacto_vegetarian"]
+
+# NULL in COPY text format
+NULL = "\\N"
+
+def copy_rows(cursor, table: str, columns, lines) -> None:
+    """COPY tab-separated lines into a table."""
+    buffer = io.StringIO("\n".join(lines) + "\n")
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+def text(value) -> str:
+    """Format a value for COPY text format."""
+    return NULL if value is None else str(value)
+
+def reserve_ids(cursor, table: str, column: str, count: int) -> int:
+    """
+    Move a serial column's sequence past count IDs and get the first one.
+
+    Rows are copied with explicit IDs so that the child tables can reference
+    them without reading them back.
+    """
+    cursor.execute(
+        "SELECT setval(pg_get_serial_sequence(%(table)s, %(column)s), "
+        "nextval(pg_get_serial_sequence(%(table)s, %(column)s)) + %(count)s - 1) as last_id",
+        {"table": table, "column": column, "count": count}
+    )
+    return cursor.fetchone()[0] - count + 1
+
+def popularity_weights(count: int, skew: float) -> np.ndarray:
+    """Get Zipf probabilities for ranks 1..count."""
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+def ensure_ingredients(cursor) -> np.ndarray:
+    """Insert the synthetic ingredient names that do not exist yet and get all their IDs."""
+    names = [f"{variant} {base}".strip() for base in INGREDIENT_BASES for variant in INGREDIENT_VARIANTS]
+    cursor.execute(
+        "INSERT INTO ingredients (ingredient_name) SELECT unnest(%(names)s::text[]) ON CONFLICT (ingredient_name) DO NOTHING",
+        {"names": names}
+    )
+    cursor.execute("SELECT ingredient_id FROM ingredients WHERE ingredient_name = ANY(%(names)s)", {"names": names})
+    return np.array([row[0] for row in cursor.fetchall()])
+
+def load_recipes(conn, rng: np.random.Generator, count: int, skew: float) -> dict:
+    """
+    Generate and copy recipes with their ingredients, diet attributes and embeddings.
+
+    Args:
+        conn: Database connection
+        rng: Random generator
+        count: Number of recipes
+        skew: Zipf exponent of ingredient popularity
+
+    Returns:
+        First recipe ID and the row count of each table
+    """
+    counts = {"recipes": 0, "recipe_ingredients": 0, "recipe_diet_attributes": 0, "recipe_embeddings": 0}
+    with conn.cursor() as cursor:
+        first_id = reserve_ids(cursor, "recipes", "recipe_id", count)
+        ingredient_ids = ensure_ingredients(cursor)
+        conn.commit()
+
+    ingredient_weights = popularity_weights(len(ingredient_ids), skew)
+    centroids = rng.standard_normal((len(REGIONS), EMBEDDING_DIMENSION))
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+    vector_format = "%d\t[" + ",".join(["%.5f"] * EMBEDDING_DIMENSION) + "]"
+    created_at = datetime.now().isoformat(sep=" ", timespec="seconds")
+
+    for offset in range(0, count, CHUNK_ROWS):
+        size = min(CHUNK_ROWS, count - offset)
+        ids = np.arange(first_id + offset, first_id + offset + size)
+        regions = rng.integers(0, len(REGIONS), size)
+        prep = np.maximum(5, rng.gamma(2.0, 8.0, size)).astype(int)
+        cook = np.maximum(0, rng.gamma(1.5, 20.0, size)).astype(int)
+        servings = rng.integers(1, 9, size)
+        calories = np.round(rng.lognormal(6.0, 0.45, size), 1)
+        adjectives = rng.integers(0, len(TITLE_ADJECTIVES), size)
+        proteins = rng.integers(0, len(TITLE_PROTEINS), size)
+        dishes = rng.integers(0, len(TITLE_DISHES), size)
+
+        recipe_lines = []
+        for i in range(size):
+            region, sub_region, continent = REGIONS[regions[i]]
+            title = f"{TITLE_ADJECTIVES[adjectives[i]]} {region} {TITLE_PROTEINS[proteins[i]]} {TITLE_DISHES[dishes[i]]}"
+            recipe_lines.append("\t".join([
+                str(ids[i]), title, region, sub_region, continent, SYNTHETIC_SOURCE,
+                f"https://example.com/images/{ids[i]}.jpg", str(cook[i]), str(prep[i]), str(prep[i] + cook[i]),
+                str(servings[i]), f"https://example.com/recipes/{ids[i]}", str(calories[i]), created_at, created_at
+            ]))
+
+        # 4 to 15 ingredients per recipe, common ones picked more often
+        ingredient_counts = rng.integers(4, 16, size)
+        picks = rng.choice(len(ingredient_ids), int(ingredient_counts.sum()), p=ingredient_weights)
+        owners = np.repeat(ids, ingredient_counts)
+        quantities = np.round(rng.lognormal(3.0, 1.0, len(picks)), 1)
+        units = rng.integers(0, len(UNITS), len(picks))
+        states = rng.integers(0, len(STATES), len(picks))
+        ingredient_lines = [
+            f"{owners[i]}\t{ingredient_ids[picks[i]]}\t{quantities[i]}\t{UNITS[units[i]]}\t{text(STATES[states[i]] or None)}"
+            for i in range(len(picks))
+        ]
+
+        # Diets follow from each other the way real labels do: vegan implies vegetarian and dairy free
+        vegan = rng.random(size) < 0.12
+        vegetarian = vegan | (rng.random(size) < 0.18)
+        pescetarian = vegetarian | (rng.random(size) < 0.08)
+        keto = rng.random(size) < 0.06
+        low_carb = keto | (rng.random(size) < 0.1)
+        diet = np.column_stack([
+            vegan, vegetarian, pescetarian, rng.random(size) < 0.25, vegan | (rng.random(size) < 0.15),
+            low_carb, keto, ~vegetarian & (rng.random(size) < 0.05), vegetarian & ~vegan & (rng.random(size) < 0.5)
+        ])
+        diet_lines = [
+            f"{ids[i]}\t" + "\t".join("t" if flag else "f" for flag in diet[i])
+            for i in range(size)
+        ]
+
+        # Recipes of one region have a cosine similarity of about 0.7, above MIN_SIMILARITY_SCORE
+        noise = rng.standard_normal((size, EMBEDDING_DIMENSION)) * (0.6 / np.sqrt(EMBEDDING_DIMENSION))
+        vectors = centroids[regions] + noise
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        embedding_lines = [vector_format % (ids[i], *vectors[i]) for i in range(size)]
+
+        with conn.cursor() as cursor:
+            copy_rows(cursor, "recipes", [
+                "recipe_id", "recipe_title", "region", "sub_region", "continent", "source", "image_url",
+                "cook_time", "prep_time", "total_time", "servings", "url", "calories", "created_at", "updated_at"
+            ], recipe_lines)
+            copy_rows(cursor, "recipe_ingredients",
+                      ["recipe_id", "ingredient_id", "quantity", "unit", "ingredient_state"], ingredient_lines)
+            copy_rows(cursor, "recipe_diet_attributes", ["recipe_id"] + DIET_COLUMNS, diet_lines)
+            copy_rows(cursor, "recipe_embeddings", ["recipe_id", "embedding"], embedding_lines)
+        conn.commit()
+
+        counts["recipes"] += size
+        counts["recipe_ingredients"] += len(ingredient_lines)
+        counts["recipe_diet_attributes"] += size
+        counts["recipe_embeddings"] += size
+        print(f"  recipes {offset + size:,}/{count:,}")
+
+    return {"first_id": first_id, **counts}
+
+def ensure_partitions(days: int) -> None:
+    """Create the monthly interaction partitions the generated timestamps fall into."""
+    if not interactions_partitioned():
+        return
+    now = datetime.now()
+    month = datetime((now - timedelta(days=days)).year, (now - timedelta(days=days)).month, 1)
+    while month <= now:
+        create_interaction_partition(month)
+        month = next_month(month)
+
+def load_interactions(conn, rng: np.random.Generator, recipe_ids: np.ndarray, count: int, users: int,
+                      days: int, skew: float) -> int:
+    """
+    Generate and copy interactions, user by user.
+
+    Args:
+        conn: Database connection
+        rng: Random generator
+        recipe_ids: Recipes to interact with
+        count: Approximate number of interactions drawn, before duplicates are dropped
+        users: Number of users
+        days: How far back interactions go
+        skew: Zipf exponent of recipe popularity
+
+    Returns:
+        Number of interactions copied
+    """
+    # Log-normal history lengths, scaled so they add up to about count
+    lengths = rng.lognormal(0.0, 1.3, users)
+    lengths = np.maximum(1, np.round(lengths * count / lengths.sum())).astype(np.int64)
+    ends = np.cumsum(lengths)
+
+    # Popularity rank is independent of recipe ID
+    ranked = rng.permutation(recipe_ids)
+    weights = popularity_weights(len(ranked), skew)
+    now = np.datetime64(datetime.now().replace(microsecond=0), "s")
+    span_seconds = days * 86400
+
+    drawn = 0
+    copied = 0
+    first_user = 0
+    while first_user < users:
+        # Whole users per chunk, so each user's history is copied together
+        last_user = max(first_user + 1, int(np.searchsorted(ends, drawn + CHUNK_ROWS, side="right")))
+        last_user = min(last_user, users)
+        size = int(ends[last_user - 1] - drawn)
+        drawn += size
+
+        user_ids = np.repeat(np.arange(first_user, last_user), lengths[first_user:last_user])
+        ranks = rng.choice(len(ranked), size, p=weights)
+        types = rng.choice(len(INTERACTION_TYPES), size, p=INTERACTION_WEIGHTS)
+
+        # Popular recipes are drawn repeatedly for long histories; keep the first
+        # draw of each (user, recipe, type), since the table holds one row per key
+        keys = (user_ids * len(ranked) + ranks) * len(INTERACTION_TYPES) + types
+        keep = np.sort(np.unique(keys, return_index=True)[1])
+        user_ids, ranks, types = user_ids[keep], ranks[keep], types[keep]
+        size = len(keep)
+
+        recipes = ranked[ranks]
+        ratings = np.clip(np.round(rng.normal(4.0, 1.0, size)), 1, 5)
+        rating_texts = [text(rating) for rating in ratings.tolist()]
+        # Squaring a uniform draw puts more events in recent days
+        ages = (rng.random(size) ** 2 * span_seconds).astype("timedelta64[s]")
+        timestamps = (now - ages).astype(str)
+
+        lines = [
+            f"{SYNTHETIC_USER_PREFIX}{user_ids[i]}\t{recipes[i]}\t{recipes[i]}\t{INTERACTION_TYPES[types[i]]}\t"
+            f"{rating_texts[i] if types[i] == RATING_TYPE else NULL}\t{timestamps[i].replace('T', ' ')}"
+            for i in range(size)
+        ]
+        with conn.cursor() as cursor:
+            copy_rows(cursor, "user_interactions",
+                      ["user_id", "recipe_id", "recipe_key", "interaction_type", "rating", '"timestamp"'], lines)
+        conn.commit()
+
+        copied += size
+        first_user = last_user
+        print(f"  interactions drawn {drawn:,}/{int(ends[-1]):,}, copied {copied:,} without duplicates")
+
+    return copied
+
+def finish(conn) -> None:
+    """Rebuild the vector index and analyze the tables."""
+    with conn.cursor() as cursor:
+        # ivfflat picks its list centroids when built, so an index built on a small table searches badly
+        cursor.execute("REINDEX INDEX recipe_embedding_idx")
+        conn.commit()
+
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            for table in ["recipes", "recipe_ingredients", "recipe_diet_attributes", "recipe_embeddings",
+                          "user_interactions", "recipe_rating_stats"]:
+                cursor.execute(f"ANALYZE {table}")
+    finally:
+        conn.autocommit = False
+
+def rating_stats_trigger_exists() -> bool:
+    """Check whether migrations/007_rating_stats_trigger.sql has been applied."""
+    return bool(execute_query(
+        "SELECT 1 FROM pg_trigger WHERE tgname = 'user_interactions_rating_stats' AND NOT tgisinternal"
+    ))
+
+def clean() -> None:
+    """Delete the generated users' interactions and the generated recipes with their child rows."""
+    with statement_timeout(0):
+        execute_query("DELETE FROM user_interactions WHERE user_id LIKE %(prefix)s", {"prefix": f"{SYNTHETIC_USER_PREFIX}%"})
+        execute_query("DELETE FROM recipes WHERE source = %(source)s", {"source": SYNTHETIC_SOURCE})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small", help="Preset recipe and interaction counts")
+    parser.add_argument("--recipes", type=int, help="Recipes to generate, overriding the scale")
+    parser.add_argument("--interactions", type=int, help="Interactions to generate, overriding the scale")
+    parser.add_argument("--users", type=int, help="Distinct users (default: one per 40 interactions)")
+    parser.add_argument("--days", type=int, default=180, help="How far back interactions go")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of recipe and ingredient popularity")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--clean", action="store_true", help="Delete previously generated data and exit")
+    args = parser.parse_args()
+
+    setup()
+    if args.clean:
+        clean()
+        print("Deleted generated recipes and interactions")
+        return
+
+    # Interactions are copied with recipe_key, and their ratings counted into recipe_rating_stats by a trigger
+    if not rating_stats_trigger_exists():
+        print("user_interactions_rating_stats trigger not found, apply migrations/002 and 007 first")
+        return
+    if not typed_recipe_key_available():
+        print("user_interactions.recipe_key not found, apply migrations/004 first")
+        return
+
+    recipes, interactions = SCALES[args.scale]
+    recipes = args.recipes or recipes
+    interactions = args.interactions if args.interactions is not None else interactions
+    users = args.users or max(1, interactions // 40)
+    days = min(args.days, INTERACTION_RETENTION_DAYS) if INTERACTION_RETENTION_DAYS > 0 else args.days
+    rng = np.random.default_rng(args.seed)
+
+    ensure_partitions(days)
+    start_time = time.perf_counter()
+    with statement_timeout(0), get_connection() as conn:
+        print(f"Generating {recipes:,} recipes")
+        loaded = load_recipes(conn, rng, recipes, args.skew)
+        recipe_ids = np.arange(loaded["first_id"], loaded["first_id"] + recipes)
+
+        print(f"Generating about {interactions:,} interactions for {users:,} users over {days} days")
+        loaded["user_interactions"] = load_interactions(conn, rng, recipe_ids, interactions, users, days, args.skew) if interactions else 0
+
+        print("Analyzing tables and rebuilding the vector index")
+        finish(conn)
+
+    elapsed = time.perf_counter() - start_time
+    for table, rows in loaded.items():
+        if table != "first_id":
+            print(f"{table:<28} {rows:,} rows")
+    print(f"Done in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark the MinHash/LSH ingredient index against the exact SQL query.
+
+Reports build time, query latency for both paths and recall@k of the index,
+taking the exact Jaccard ranking from SQL as ground truth.
+
+    python -m benchmarks.ingredient_similarity --samples 200 --limit 10
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import setup, summarize, timer, print_summary
+from config.db import execute_query
+from indexes.minhash import MinHashLSHIndex
+from models.queries_search import get_recipe_ingredient_sets, get_similar_by_ingredients
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=200, help="Number of query recipes")
+    parser.add_argument("--limit", type=int, default=10, help="Neighbours per query (k)")
+    parser.add_argument("--num-perm", type=int, default=None, help="Override MINHASH_NUM_PERM")
+    parser.add_argument("--bands", type=int, default=None, help="Override MINHASH_BANDS")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    setup()
+    random.seed(args.seed)
+
+    index_kwargs = {}
+    if args.num_perm:
+        index_kwargs["num_perm"] = args.num_perm
+    if args.bands:
+        index_kwargs["bands"] = args.bands
+
+    # Build
+    start_time = time.perf_counter()
+    rows = get_recipe_ingredient_sets()
+    load_seconds = time.perf_counter() - start_time
+
+    index = MinHashLSHIndex(**index_kwargs)
+    start_time = time.perf_counter()
+    for row in rows:
+        index.add(row["recipe_id"], row["ingredient_ids"])
+    build_seconds = time.perf_counter() - start_time
+
+    print(f"Indexed {len(index)} recipes: load {load_seconds:.2f}s, build {build_seconds:.2f}s")
+    print(f"Index stats: {index.stats()}")
+
+    recipe_ids = [row["recipe_id"] for row in rows]
+    sample = random.sample(recipe_ids, min(args.samples, len(recipe_ids)))
+
+    sql_latencies, index_latencies = [], []
+    hits = expected = 0
+
+    for recipe_id in sample:
+        with timer(sql_latencies):
+            exact = get_similar_by_ingredients(recipe_id, args.limit)
+        with timer(index_latencies):
+            approximate = index.query(recipe_id, args.limit) or []
+
+        if not exact:
+            continue
+
+        # Count a hit for any returned neighbour at least as similar as the k-th exact one,
+        # so ties at the cut-off are not penalized
+        cutoff = float(exact[-1]["score"])
+        approximate_ids = {neighbour_id for neighbour_id, jaccard, _ in approximate if jaccard >= cutoff - 1e-9}
+        exact_ids = {int(item["id"]) for item in exact}
+        hits += min(len(exact_ids), len(approximate_ids))
+        expected += len(exact_ids)
+
+    print_summary("exact SQL", summarize(sql_latencies))
+    print_summary("MinHash/LSH index", summarize(index_latencies))
+    recall = hits / expected if expected else 0.0
+    print(f"recall@{args.limit}: {recall:.4f} over {len(sample)} queries")
+
+if __name__ == "__main__":
+    main()
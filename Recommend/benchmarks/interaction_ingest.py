@@ -0,0 +1,88 @@
+"""
+Benchmark interaction ingestion throughput in events per second.
+
+Replays synthetic view/like/save events for benchmark users against real recipe
+IDs, first through record_interaction one event at a time (the previous
+POST /interactions path) and then through record_interactions_batch in batches
+of each given size (what the interaction buffer flushes). The benchmark users'
+rows are deleted afterwards.
+
+    python -m benchmarks.interaction_ingest --events 5000 --batch-sizes 100,500,1000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import setup, summarize, timer, print_summary
+from config.db import execute_query
+from models.queries_recommend import record_interaction, record_interactions_batch
+
+BENCH_USER_PREFIX = "bench-ingest-"
+EVENT_TYPES = ["view", "view", "view", "like", "save"]
+
+def make_events(count: int, recipe_ids, users: int):
+    """Generate a burst of events, mostly views, with repeats like a mobile client."""
+    return [
+        {
+            "user_id": f"{BENCH_USER_PREFIX}{random.randrange(users)}",
+            "recipe_id": str(random.choice(recipe_ids)),
+            "interaction_type": random.choice(EVENT_TYPES),
+            "rating": None
+        }
+        for _ in range(count)
+    ]
+
+def coalesce(events):
+    """Keep the last event per (user, recipe, type), as the interaction buffer does."""
+    latest = {}
+    for event in events:
+        latest[(event["user_id"], event["recipe_id"], event["interaction_type"])] = event
+    return list(latest.values())
+
+def cleanup():
+    """Delete the benchmark users' interactions."""
+    execute_query("DELETE FROM user_interactions WHERE user_id LIKE %(prefix)s", {"prefix": f"{BENCH_USER_PREFIX}%"})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000, help="Events per strategy")
+    parser.add_argument("--users", type=int, default=200, help="Distinct benchmark users")
+    parser.add_argument("--batch-sizes", default="100,500,1000", help="Comma-separated batch sizes")
+    args = parser.parse_args()
+
+    setup()
+    recipe_ids = [row["recipe_id"] for row in execute_query("SELECT recipe_id FROM recipes ORDER BY random() LIMIT 2000")]
+    if not recipe_ids:
+        print("No recipes found")
+        return
+
+    cleanup()
+    try:
+        events = make_events(args.events, recipe_ids, args.users)
+        latencies = []
+        start_time = time.perf_counter()
+        for event in events:
+            with timer(latencies):
+                record_interaction(event["user_id"], event["recipe_id"], event["interaction_type"])
+        elapsed = time.perf_counter() - start_time
+        summary = summarize(latencies)
+        summary["events_per_sec"] = round(len(events) / elapsed, 1)
+        print_summary("one event per call", summary)
+
+        for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+            events = make_events(args.events, recipe_ids, args.users)
+            latencies = []
+            start_time = time.perf_counter()
+            for offset in range(0, len(events), batch_size):
+                batch = coalesce(events[offset:offset + batch_size])
+                with timer(latencies):
+                    record_interactions_batch(batch)
+            elapsed = time.perf_counter() - start_time
+            summary = summarize(latencies)
+            summary["events_per_sec"] = round(len(events) / elapsed, 1)
+            print_summary(f"batches of {batch_size}", summary)
+    finally:
+        cleanup()
+
+if __name__ == "__main__":
+    main()
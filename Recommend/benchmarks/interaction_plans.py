@@ -0,0 +1,84 @@
+"""
+Print query plans for the interaction queries with and without recipe_key.
+
+Runs the recent-interactions, similar-users, similar-users content and trending
+queries for one user twice: first as they were written before
+migrations/004 (joining recipes on recipe_id::integer) and then through the
+typed recipe_key column. Each statement is run under EXPLAIN (ANALYZE, BUFFERS),
+so check that the second set uses the (recipe_key, "timestamp") and
+(user_id, "timestamp") indexes instead of sequential scans. Needs migrations/004
+to be applied.
+
+    python -m benchmarks.interaction_plans --user-id 42
+"""
+import argparse
+
+import config.db
+import models.queries_recommend as queries_recommend
+from benchmarks.common import setup
+from config.db import execute_query, column_exists
+
+RECIPE_KEY = ("user_interactions", "recipe_key")
+
+def explain_query(query, params=None):
+    """Print the plan of a statement instead of returning its rows."""
+    rows = execute_query(f"EXPLAIN (ANALYZE, BUFFERS) {query}", params)
+    print("\n".join(row["QUERY PLAN"] for row in rows))
+    print()
+    return []
+
+def run_queries(user_id: str):
+    """Run each interaction query once."""
+    print("-- recent interactions")
+    queries_recommend.get_user_recent_interactions(user_id)
+
+    print("-- similar users")
+    queries_recommend.find_similar_users(user_id)
+
+    # Plans only, so any user other than the sample one will do as a neighbour
+    others = execute_query(
+        "SELECT DISTINCT user_id FROM user_interactions WHERE user_id <> %(user_id)s LIMIT 10",
+        {"user_id": user_id}
+    )
+    print("-- content from similar users")
+    queries_recommend.get_content_from_similar_users(
+        [{"user_id": row["user_id"], "similarity_score": 1.0} for row in others], user_id
+    )
+
+    print("-- trending")
+    queries_recommend.get_trending_recipes("week")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", help="User to plan for (default: the most active user)")
+    args = parser.parse_args()
+
+    setup()
+    if not column_exists(*RECIPE_KEY):
+        print("user_interactions.recipe_key not found, apply migrations/004 first")
+        return
+
+    user_id = args.user_id
+    if not user_id:
+        row = execute_query(
+            "SELECT user_id FROM user_interactions GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1"
+        )
+        if not row:
+            print("No interactions found")
+            return
+        user_id = row[0]["user_id"]
+
+    original_execute = queries_recommend.execute_query
+    queries_recommend.execute_query = explain_query
+    try:
+        for label, typed in (("recipe_id::integer", False), ("recipe_key", True)):
+            print(f"===== {label} =====")
+            # Checked "in the future", so column_exists keeps the forced answer
+            config.db._schema_columns[RECIPE_KEY] = (typed, float("inf"))
+            run_queries(user_id)
+    finally:
+        queries_recommend.execute_query = original_execute
+        config.db._schema_columns.pop(RECIPE_KEY, None)
+
+if __name__ == "__main__":
+    main()
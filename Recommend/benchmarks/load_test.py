@@ -0,0 +1,76 @@
+"""
+Load test the running service with many concurrent clients.
+
+Each client sends requests back to back until the duration is over, against one
+endpoint at a time, and the throughput in successful requests per second is reported
+with the latency distribution and error count. Run it against a build before
+and after a change to compare, e.g. with the service started by main.py:
+
+    python -m benchmarks.load_test --clients 500 --duration 30 --user-id 42
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import summarize, timer, print_summary
+
+def endpoints(user_id: str, query: str):
+    """Get the hot endpoints as (name, path, params)."""
+    return [
+        ("trending", "/trending", {"time_window": "week"}),
+        ("user recommendations", f"/recommend/user/{user_id}", {}),
+        ("vector search", "/search/vector", {"query": query}),
+        ("hybrid search", "/search/hybrid", {"query": query})
+    ]
+
+async def run_client(client: httpx.AsyncClient, path: str, params, deadline: float, latencies, errors):
+    """Send requests until the deadline, recording latencies and failures."""
+    while time.perf_counter() < deadline:
+        try:
+            with timer(latencies):
+                response = await client.get(path, params=params)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+
+async def load(base_url: str, path: str, params, clients: int, duration: float):
+    """Run one endpoint under load and summarize it."""
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        start_time = time.perf_counter()
+        deadline = start_time + duration
+        await asyncio.gather(*[
+            run_client(client, path, params, deadline, latencies, errors)
+            for _ in range(clients)
+        ])
+        elapsed = time.perf_counter() - start_time
+
+    summary = summarize(latencies)
+    # Failed requests count towards latency but not throughput
+    summary["requests_per_sec"] = round((len(latencies) - len(errors)) / elapsed, 1)
+    summary["errors"] = len(errors)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:9999/api/v1", help="Service URL")
+    parser.add_argument("--clients", type=int, default=500, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per endpoint")
+    parser.add_argument("--user-id", default="default_user", help="User for personalized recommendations")
+    parser.add_argument("--query", default="chicken soup", help="Search query text")
+    parser.add_argument("--only", help="Run only the endpoint with this name")
+    args = parser.parse_args()
+
+    for name, path, params in endpoints(args.user_id, args.query):
+        if args.only and name != args.only:
+            continue
+        summary = asyncio.run(load(args.base_url, path, params, args.clients, args.duration))
+        print_summary(name, summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark the cost metrics instrumentation adds to each instrumented call.
+
+Times an empty function with and without the timed decorator, and an empty
+block inside Histogram.time(), and reports the difference per call. The
+instrumented hot paths are expected to pay no more than a few microseconds.
+No database is needed.
+
+    python -m benchmarks.metrics_overhead --calls 200000
+"""
+import argparse
+import time
+
+from monitoring.metrics import Histogram, timed
+
+def per_call_us(func, calls: int) -> float:
+    """Get the mean time of one call in microseconds."""
+    start_time = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start_time) / calls * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000, help="Calls per variant")
+    args = parser.parse_args()
+
+    histogram = Histogram("benchmark_duration_seconds", "Benchmark histogram.", ("function",))
+
+    def plain():
+        return None
+
+    decorated = timed(histogram, "plain")(plain)
+
+    def block():
+        with histogram.time("block"):
+            return None
+
+    baseline = per_call_us(plain, args.calls)
+    print(f"{'plain call':<28} {baseline:.3f} us")
+    for name, func in (("timed decorator", decorated), ("Histogram.time block", block)):
+        cost = per_call_us(func, args.calls)
+        print(f"{name:<28} {cost:.3f} us  overhead={cost - baseline:.3f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark per-request response overhead for JSON payloads of 1-100 KB.
+
+Serves a search-like payload of each size from two in-process apps, driven
+directly through ASGI so that no network or client cost is included:
+
+- before: the default JSONResponse behind the previous @app.middleware("http")
+  timing middleware
+- after: ORJSONResponse behind TimingMiddleware, which only adds headers
+
+No database is needed.
+
+    python -m benchmarks.response_serialization --requests 2000 --sizes 1,10,50,100
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from benchmarks.common import summarize, timer, print_summary
+from endpoints.middleware import TimingMiddleware
+
+def make_payload(size_kb: int):
+    """Build a search response of roughly size_kb kilobytes of JSON."""
+    recipe = {
+        "id": 1234,
+        "title": "Slow-cooked lamb with apricots and almonds",
+        "region": "Middle Eastern",
+        "sub_region": "Lebanese",
+        "image_url": "https://example.com/images/recipes/1234.jpg",
+        "total_time": 95,
+        "calories": 612.5,
+        "score": 0.8731
+    }
+    per_item = len(json.dumps(recipe))
+    results = [dict(recipe, id=index) for index in range(max(1, size_kb * 1024 // per_item))]
+    return {"query": "lamb", "results": results, "count": len(results), "execution_time_ms": 1.23}
+
+def before_app(payload) -> FastAPI:
+    """App with the default response class and the previous timing middleware."""
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def add_process_time_header(request: Request, call_next):
+        start_time = time.time()
+        request_id = f"req-{int(start_time * 1000)}"
+        request.state.request_id = request_id
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        response.headers["X-Process-Time"] = str(round(process_time * 1000, 2))
+        response.headers["X-Request-ID"] = request_id
+        if response.headers.get("content-type") == "application/json" and isinstance(response, JSONResponse):
+            data = json.loads(response.body.decode())
+            if isinstance(data, dict):
+                data["execution_time_ms"] = round(process_time * 1000, 2)
+                data["request_id"] = request_id
+                response.body = json.dumps(data).encode()
+        return response
+
+    @app.get("/payload")
+    def get_payload():
+        return payload
+
+    return app
+
+def after_app(payload) -> FastAPI:
+    """App with ORJSONResponse and the header-only timing middleware."""
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(TimingMiddleware)
+
+    @app.get("/payload")
+    def get_payload():
+        return payload
+
+    return app
+
+async def request(app: FastAPI) -> int:
+    """Send one GET /payload through the app and return the body size."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/payload", "raw_path": b"/payload", "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80)
+    }
+    body = bytearray()
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Like a server, report the disconnect only once the response is complete
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    return len(body)
+
+async def measure(app: FastAPI, requests: int):
+    """Time requests sequentially after a short warm-up."""
+    for _ in range(20):
+        await request(app)
+    latencies = []
+    size = 0
+    for _ in range(requests):
+        with timer(latencies):
+            size = await request(app)
+    return latencies, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per app and size")
+    parser.add_argument("--sizes", default="1,10,50,100", help="Comma-separated payload sizes in KB")
+    args = parser.parse_args()
+
+    for size_kb in [int(size) for size in args.sizes.split(",")]:
+        payload = make_payload(size_kb)
+        means = {}
+        for name, build in (("before", before_app), ("after", after_app)):
+            latencies, body_size = asyncio.run(measure(build(payload), args.requests))
+            summary = summarize(latencies)
+            summary["body_kb"] = round(body_size / 1024, 1)
+            means[name] = summary["mean_ms"]
+            print_summary(f"{size_kb} KB {name}", summary)
+        print(f"{size_kb} KB saved per request: {means['before'] - means['after']:.3f} ms")
+
+if __name__ == "__main__":
+    main()
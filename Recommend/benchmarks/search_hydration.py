@@ -0,0 +1,86 @@
+"""
+Benchmark search result hydration: per-recipe queries against one set-based query.
+
+For each page size, reports database round trips and latency of a recipe search
+page hydrated the old way (two queries per recipe) and with hydrate_recipes,
+with and without instructions.
+
+    python -m benchmarks.search_hydration --page-sizes 10,20,50,100 --repeat 20
+"""
+import argparse
+import copy
+
+import models.queries_recipe as queries_recipe
+from benchmarks.common import setup, summarize, timer, print_summary
+from config.db import execute_query, execute_query_single
+
+class RoundTripCounter:
+    """Counts calls to the query helpers used by models.queries_recipe."""
+
+    def __init__(self):
+        self.count = 0
+
+    def install(self):
+        def counted(function):
+            def wrapper(*args, **kwargs):
+                self.count += 1
+                return function(*args, **kwargs)
+            return wrapper
+
+        queries_recipe.execute_query = counted(execute_query)
+        queries_recipe.execute_query_single = counted(execute_query_single)
+
+def hydrate_per_recipe(recipes):
+    """The previous hydration loop, kept here as the baseline."""
+    for recipe in recipes:
+        recipe_id = recipe["recipe_id"]
+        recipe["ingredients"] = queries_recipe.execute_query("""
+            SELECT
+                i.ingredient_id, i.ingredient_name,
+                ri.quantity, ri.unit, ri.ingredient_state
+            FROM recipe_ingredients ri
+            JOIN ingredients i ON ri.ingredient_id = i.ingredient_id
+            WHERE ri.recipe_id = %(recipe_id)s
+            """, {"recipe_id": recipe_id}) or []
+        instructions = queries_recipe.execute_query_single("""
+            SELECT instructions
+            FROM recipe_instructions
+            WHERE recipe_id = %(recipe_id)s
+            """, {"recipe_id": recipe_id})
+        recipe["instructions"] = instructions["instructions"] if instructions else None
+    return recipes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-sizes", default="10,20,50,100", help="Comma-separated page sizes")
+    parser.add_argument("--repeat", type=int, default=20, help="Pages per page size and strategy")
+    args = parser.parse_args()
+
+    setup()
+    counter = RoundTripCounter()
+    counter.install()
+
+    strategies = {
+        "per-recipe queries": hydrate_per_recipe,
+        "set-based, all fields": lambda recipes: queries_recipe.hydrate_recipes(recipes),
+        "set-based, ingredients": lambda recipes: queries_recipe.hydrate_recipes(recipes, ["ingredients"])
+    }
+
+    for page_size in [int(size) for size in args.page_sizes.split(",")]:
+        page = queries_recipe.search_recipes(limit=page_size, fields=[])["results"]
+        print(f"\nPage size {page_size} ({len(page)} recipes)")
+
+        for name, hydrate in strategies.items():
+            latencies = []
+            counter.count = 0
+            for _ in range(args.repeat):
+                recipes = copy.deepcopy(page)
+                with timer(latencies):
+                    hydrate(recipes)
+
+            summary = summarize(latencies)
+            summary["round_trips"] = counter.count // args.repeat
+            print_summary(name, summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark recipe text search: ILIKE scans against full-text and trigram indexes.
+
+Builds a synthetic catalog in its own table (bench_recipes, 1M rows by default)
+with the same search_vector column and indexes as the recipes table, then times
+the previous ILIKE predicate and CASE ranking against the tsvector/pg_trgm
+predicate ranked with ts_rank, for a set of sample queries.
+
+    python -m benchmarks.text_search --rows 1000000 --repeat 5
+    python -m benchmarks.text_search --reuse          # keep an existing catalog
+"""
+import argparse
+import time
+
+from benchmarks.common import setup, summarize, timer, print_summary
+from config.db import execute_query
+
+ADJECTIVES = ["spicy", "creamy", "roasted", "grilled", "smoky", "crispy", "braised", "zesty",
+              "garlic", "lemon", "honey", "herbed", "sweet", "tangy", "rustic", "quick"]
+MAINS = ["chicken", "salmon", "tofu", "lentil", "beef", "mushroom", "shrimp", "chickpea",
+         "pork", "eggplant", "potato", "cauliflower", "lamb", "spinach", "tomato", "pumpkin"]
+DISHES = ["curry", "pasta", "stew", "salad", "soup", "tacos", "risotto", "skillet",
+          "casserole", "bowl", "pie", "noodles", "burger", "wrap", "tagine", "lasagna"]
+SOURCES = ["Grandma's Kitchen", "Weeknight Meals", "Street Food Atlas", "Coastal Cooking",
+           "The Spice Route", "Farmhouse Table", "Quick Bites", "Slow Sunday"]
+
+QUERIES = ["chicken curry", "creamy mushroom", "lasagna", "lasagne", "spicy tofu bowl",
+           "coastal", "pumpkn soup", "grilled salmon salad"]
+
+def build_catalog(rows: int):
+    """Create bench_recipes with synthetic titles and sources, then index it."""
+    def array(words):
+        return "ARRAY[" + ", ".join(f"'{word}'" for word in words) + "]"
+
+    execute_query("DROP TABLE IF EXISTS bench_recipes")
+    execute_query(f"""
+    CREATE TABLE bench_recipes AS
+    SELECT
+        g AS recipe_id,
+        initcap(
+            ({array(ADJECTIVES)})[1 + (random() * {len(ADJECTIVES) - 1})::int] || ' ' ||
+            ({array(MAINS)})[1 + (random() * {len(MAINS) - 1})::int] || ' ' ||
+            ({array(DISHES)})[1 + (random() * {len(DISHES) - 1})::int]
+        ) || ' #' || g AS recipe_title,
+        ({array(SOURCES)})[1 + (random() * {len(SOURCES) - 1})::int] AS source
+    FROM generate_series(1, %(rows)s) AS g
+    """, {"rows": rows})
+
+    execute_query("""
+    ALTER TABLE bench_recipes ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(recipe_title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(source, '')), 'B')
+        ) STORED
+    """)
+    execute_query("CREATE INDEX bench_recipes_search_vector_idx ON bench_recipes USING gin (search_vector)")
+    execute_query("CREATE INDEX bench_recipes_title_trgm_idx ON bench_recipes USING gin (recipe_title gin_trgm_ops)")
+    execute_query("ANALYZE bench_recipes")
+
+ILIKE_QUERY = """
+SELECT recipe_id, recipe_title
+FROM bench_recipes r
+WHERE r.recipe_title ILIKE %(query)s OR r.source ILIKE %(query)s
+ORDER BY
+    CASE
+        WHEN r.recipe_title ILIKE %(exact_query)s THEN 3
+        WHEN r.recipe_title ILIKE %(start_query)s THEN 2
+        WHEN r.recipe_title ILIKE %(query)s THEN 1
+        ELSE 0
+    END DESC, r.recipe_id DESC
+LIMIT %(limit)s
+"""
+
+INDEXED_QUERY = """
+SELECT recipe_id, recipe_title
+FROM bench_recipes r
+WHERE r.search_vector @@ websearch_to_tsquery('english', %(text_query)s)
+   OR r.recipe_title ILIKE %(query)s
+   OR %(text_query)s <%% r.recipe_title
+ORDER BY
+    ts_rank(r.search_vector, websearch_to_tsquery('english', %(text_query)s))
+    + word_similarity(%(text_query)s, r.recipe_title) DESC, r.recipe_id DESC
+LIMIT %(limit)s
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="Synthetic catalog size")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query and strategy")
+    parser.add_argument("--limit", type=int, default=20, help="Page size")
+    parser.add_argument("--reuse", action="store_true", help="Reuse an existing bench_recipes table")
+    parser.add_argument("--drop", action="store_true", help="Drop bench_recipes when done")
+    args = parser.parse_args()
+
+    setup()
+
+    if not args.reuse:
+        start_time = time.perf_counter()
+        build_catalog(args.rows)
+        print(f"Built and indexed {args.rows} synthetic recipes in {time.perf_counter() - start_time:.1f}s")
+
+    for name, sql in (("ILIKE scan", ILIKE_QUERY), ("tsvector + pg_trgm", INDEXED_QUERY)):
+        latencies = []
+        matched = 0
+        for text in QUERIES:
+            params = {
+                "text_query": text,
+                "query": f"%{text}%",
+                "exact_query": text,
+                "start_query": f"{text}%",
+                "limit": args.limit
+            }
+            for _ in range(args.repeat):
+                with timer(latencies):
+                    rows = execute_query(sql, params)
+            matched += len(rows)
+        summary = summarize(latencies)
+        summary["results_per_query"] = round(matched / len(QUERIES), 1)
+        print_summary(name, summary)
+
+    if args.drop:
+        execute_query("DROP TABLE IF EXISTS bench_recipes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+In-memory candidate pools for cuisine and dietary browsing.
+
+Each pool holds the IDs and titles of every recipe matching one cuisine or
+dietary restriction. Recommendations are drawn from a pool in O(k) instead of
+sorting every matching recipe with ORDER BY RANDOM() on each request. Pools are
+loaded on first use and dropped after CANDIDATE_POOL_TTL seconds or when recipes
+change. An expired pool is served while reloading it fails, also when no
+database connection is free. Loads that fail or find no recipes are not kept,
+and at most CANDIDATE_POOL_MAX_POOLS pools are, least recently used first out.
+"""
+import bisect
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Any, Dict, List, Tuple
+
+from config.config import CANDIDATE_POOL_TTL, CANDIDATE_POOL_MIN_WEIGHT, CANDIDATE_POOL_MAX_POOLS
+from config.db import POOL_TIMEOUTS
+from models.queries_search import get_cuisine_recipes, get_dietary_recipes, get_dietary_column
+from cache.popularity import get_popularity_tracker
+
+logger = logging.getLogger(__name__)
+
+class CandidatePool:
+    """Recipe IDs and titles for one cuisine or dietary restriction."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.ids = [int(row["id"]) for row in rows]
+        self.titles = [row["title"] for row in rows]
+        self.loaded_at = time.time()
+        self._cum_weights = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def sample(self, limit: int) -> List[int]:
+        """Draw up to limit distinct positions uniformly at random."""
+        return random.sample(range(len(self.ids)), min(limit, len(self.ids)))
+
+    def sample_weighted(self, limit: int) -> List[int]:
+        """
+        Draw up to limit distinct positions with probability proportional to popularity.
+
+        Every recipe keeps a floor weight of CANDIDATE_POOL_MIN_WEIGHT so that
+        recipes nobody has interacted with yet can still be drawn.
+        """
+        size = len(self.ids)
+        limit = min(limit, size)
+        if self._cum_weights is None:
+            self._cum_weights = self._popularity_cum_weights()
+
+        total = self._cum_weights[-1] if self._cum_weights else 0
+        chosen = []
+        seen = set()
+
+        # Rejection sampling stays O(k log n) while k is small relative to the pool
+        attempts = 0
+        while len(chosen) < limit and attempts < limit * 10:
+            attempts += 1
+            position = bisect.bisect_right(self._cum_weights, random.random() * total)
+            position = min(position, size - 1)
+            if position not in seen:
+                seen.add(position)
+                chosen.append(position)
+
+        # Top up uniformly if the weights are very skewed
+        if len(chosen) < limit:
+            remaining = [position for position in range(size) if position not in seen]
+            chosen.extend(random.sample(remaining, limit - len(chosen)))
+
+        return chosen
+
+    def _popularity_cum_weights(self) -> List[float]:
+        tracker = get_popularity_tracker()
+        scores = [tracker.score(recipe_id) for recipe_id in self.ids]
+        max_score = max(scores) if scores else 0
+        if max_score > 0:
+            weights = [score / max_score + CANDIDATE_POOL_MIN_WEIGHT for score in scores]
+        else:
+            weights = [1.0] * len(scores)
+        return list(accumulate(weights))
+
+class CandidatePools:
+    """Lazily loaded candidate pools keyed by (kind, key)."""
+
+    def __init__(self, ttl: int = CANDIDATE_POOL_TTL, max_pools: int = CANDIDATE_POOL_MAX_POOLS):
+        """
+        Initialize an empty pool cache.
+
+        Args:
+            ttl: Seconds after which a pool is reloaded
+            max_pools: Pools kept; the least recently used is dropped beyond it
+        """
+        self.ttl = ttl
+        self.max_pools = max_pools
+        self._lock = threading.Lock()
+        self._pools: "OrderedDict[Tuple[str, str], CandidatePool]" = OrderedDict()
+
+    def sample_cuisine(self, cuisine_name: str, limit: int, weighted: bool = False) -> List[Dict[str, Any]]:
+        """Draw random recipes for a cuisine or region."""
+        pool = self._get_pool("cuisine", cuisine_name)
+        return self._sample(pool, limit, weighted)
+
+    def sample_dietary(self, dietary_restriction: str, limit: int, weighted: bool = False) -> List[Dict[str, Any]]:
+        """Draw random recipes for a dietary restriction."""
+        pool = self._get_pool("dietary", get_dietary_column(dietary_restriction))
+        return self._sample(pool, limit, weighted)
+
+    def invalidate(self) -> None:
+        """Drop every pool so that the next request reloads it."""
+        with self._lock:
+            self._pools.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the loaded pools and their sizes."""
+        with self._lock:
+            return {
+                f"{kind}:{key}": len(pool)
+                for (kind, key), pool in self._pools.items()
+            }
+
+    def _get_pool(self, kind: str, key: str) -> CandidatePool:
+        now = time.time()
+        with self._lock:
+            pool = self._pools.get((kind, key))
+            if pool is not None:
+                self._pools.move_to_end((kind, key))
+        if pool is not None and now - pool.loaded_at < self.ttl:
+            return pool
+
+        try:
+            rows = get_cuisine_recipes(key) if kind == "cuisine" else get_dietary_recipes(key)
+        except POOL_TIMEOUTS:
+            # With nothing to serve, let the request fail with a 503 rather than an empty list
+            if pool is None:
+                raise
+            rows = None
+        if rows is None:
+            # Keep serving the expired pool through a database error rather than nothing
+            logger.warning(f"Could not load {kind} candidate pool '{key}'")
+            return pool if pool is not None else CandidatePool([])
+
+        loaded = CandidatePool(rows)
+        if not len(loaded):
+            # Unknown keys would otherwise fill the cache with empty pools
+            with self._lock:
+                self._pools.pop((kind, key), None)
+            return loaded
+
+        with self._lock:
+            self._pools[(kind, key)] = loaded
+            self._pools.move_to_end((kind, key))
+            while len(self._pools) > self.max_pools:
+                self._pools.popitem(last=False)
+        logger.info(f"Loaded {kind} candidate pool '{key}' with {len(loaded)} recipes")
+        return loaded
+
+    def _sample(self, pool: CandidatePool, limit: int, weighted: bool) -> List[Dict[str, Any]]:
+        if not len(pool):
+            return []
+        positions = pool.sample_weighted(limit) if weighted else pool.sample(limit)
+        return [
+            {"id": pool.ids[position], "title": pool.titles[position]}
+            for position in positions
+        ]
+
+# Global candidate pools
+candidate_pools = CandidatePools()
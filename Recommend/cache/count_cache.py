@@ -0,0 +1,58 @@
+"""
+Short-lived cache of result counts keyed by filter signature.
+
+Paging through one search re-runs the same filters on every page; the total only
+needs to be counted once per COUNT_CACHE_TTL seconds.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config.config import COUNT_CACHE_TTL, COUNT_CACHE_SIZE
+
+class CountCache:
+    """Bounded TTL cache of integer counts."""
+
+    def __init__(self, max_size: int = COUNT_CACHE_SIZE, ttl: int = COUNT_CACHE_TTL):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_size: Maximum number of filter signatures held
+            ttl: Seconds a count stays valid
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def signature(query: str, params: Dict[str, Any]) -> str:
+        """Build the cache key of a count query and its parameters."""
+        return query + "|" + repr(sorted(params.items()))
+
+    def get(self, key: str) -> Optional[int]:
+        """Get a cached count, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] >= self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, count: int) -> None:
+        """Store a count."""
+        with self._lock:
+            self._entries[key] = (time.time(), count)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every count, e.g. after recipes are created or deleted."""
+        with self._lock:
+            self._entries.clear()
+
+# Global count cache
+count_cache = CountCache()
@@ -0,0 +1,250 @@
+"""
+In-process write buffer for batched interaction ingestion.
+
+Interactions are accepted into memory and written by a background thread with
+one set-based statement per batch, flushing when INTERACTION_FLUSH_SIZE events
+are pending or every INTERACTION_FLUSH_INTERVAL seconds. Repeated events for the
+same (user, recipe, interaction type) are coalesced while pending, since only the
+latest one is kept in user_interactions anyway. When INTERACTION_BUFFER_CAPACITY
+events are pending, new batches are refused so that callers back off instead of
+the process growing without bound while the database is slow.
+
+A batch that fails is retried with growing pauses, up to
+INTERACTION_FLUSH_MAX_BACKOFF seconds, and an interaction that has been in
+INTERACTION_FLUSH_MAX_ATTEMPTS failed flushes is dropped. A batch the database
+rejects for its contents is split in halves until the rejected rows are found
+and dropped, so one bad row cannot hold up the others.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Tuple
+
+from config.config import (
+    INTERACTION_BUFFER_CAPACITY, INTERACTION_FLUSH_SIZE, INTERACTION_FLUSH_INTERVAL,
+    INTERACTION_FLUSH_MAX_ATTEMPTS, INTERACTION_FLUSH_MAX_BACKOFF
+)
+from models.queries_recommend import record_interactions_batch, InteractionDataError
+
+logger = logging.getLogger(__name__)
+
+# Throughput is reported over this many most recent seconds
+RATE_WINDOW_SECONDS = 60
+
+class InteractionBuffer:
+    """Bounded buffer of pending interactions, flushed in batches."""
+
+    def __init__(self, capacity: int = INTERACTION_BUFFER_CAPACITY,
+                 flush_size: int = INTERACTION_FLUSH_SIZE,
+                 flush_interval: float = INTERACTION_FLUSH_INTERVAL,
+                 writer: Callable[[List[Dict[str, Any]]], bool] = record_interactions_batch,
+                 max_attempts: int = INTERACTION_FLUSH_MAX_ATTEMPTS,
+                 max_backoff: float = INTERACTION_FLUSH_MAX_BACKOFF):
+        """
+        Initialize an empty buffer.
+
+        Args:
+            capacity: Maximum number of pending interactions
+            flush_size: Number of pending interactions that triggers a flush
+            flush_interval: Maximum seconds an interaction waits before a flush
+            writer: Function writing a batch, returning True on success, False if
+                it may succeed later, and raising InteractionDataError if the
+                database rejects its contents
+            max_attempts: Failed flushes after which an interaction is dropped
+            max_backoff: Longest pause in seconds between flushes while they fail
+        """
+        self.capacity = capacity
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.writer = writer
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._pending: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._started = False
+        self._counts = {"accepted": 0, "coalesced": 0, "refused": 0, "written": 0, "flushes": 0, "failed_flushes": 0,
+                        "rejected_by_database": 0, "dropped_after_retries": 0}
+        self._consecutive_failures = 0
+        self._accepted_log = deque()
+        self._written_log = deque()
+        self._last_flush_ms = 0.0
+
+    def offer(self, interactions: List[Dict[str, Any]]) -> bool:
+        """
+        Add validated interactions to the buffer, all or none.
+
+        Args:
+            interactions: Dicts with user_id, recipe_id, interaction_type and rating
+
+        Returns:
+            True if the interactions were accepted, False if the buffer is full
+        """
+        now = time.time()
+        with self._condition:
+            new_keys = {self._key(item) for item in interactions} - self._pending.keys()
+            if len(self._pending) + len(new_keys) > self.capacity:
+                self._counts["refused"] += len(interactions)
+                return False
+
+            for item in interactions:
+                key = self._key(item)
+                if key in self._pending:
+                    self._counts["coalesced"] += 1
+                self._pending[key] = dict(item, received_at=now)
+                self._pending.move_to_end(key)
+
+            self._counts["accepted"] += len(interactions)
+            self._accepted_log.append((now, len(interactions)))
+            if len(self._pending) >= self.flush_size:
+                self._condition.notify()
+        return True
+
+    def flush(self) -> int:
+        """
+        Write every pending interaction.
+
+        Interactions of a failed write are put back in front of newer events for
+        the next flush, unless they have reached max_attempts. Rows the database
+        rejects are dropped.
+
+        Returns:
+            Number of interactions written
+        """
+        with self._flush_lock:
+            with self._condition:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                self._pending = OrderedDict()
+
+            start_time = time.time()
+            rows = [
+                {**item, "age_seconds": max(0.0, start_time - item["received_at"])}
+                for item in batch.values()
+            ]
+            written, failed, rejected = self._write(rows)
+            elapsed_ms = (time.time() - start_time) * 1000
+
+            with self._condition:
+                self._last_flush_ms = elapsed_ms
+                self._counts["rejected_by_database"] += rejected
+                if written:
+                    self._counts["written"] += written
+                    self._written_log.append((time.time(), written))
+
+                if not failed:
+                    self._counts["flushes"] += 1
+                    self._consecutive_failures = 0
+                else:
+                    self._counts["failed_flushes"] += 1
+                    self._consecutive_failures += 1
+                    self._requeue(failed)
+
+            logger.debug(f"Flushed {written} interactions in {elapsed_ms:.1f}ms")
+            return written
+
+    def _write(self, rows: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]], int]:
+        """
+        Write rows, splitting a batch the database rejects to drop only the bad rows.
+
+        Returns:
+            Number of rows written, rows whose write failed and may be retried,
+            and number of rows rejected
+        """
+        try:
+            return (len(rows), [], 0) if self.writer(rows) else (0, rows, 0)
+        except InteractionDataError as e:
+            if len(rows) == 1:
+                row = rows[0]
+                logger.error(f"Dropping interaction rejected by the database, user {str(row['user_id'])[:100]!r} "
+                             f"recipe {str(row['recipe_id'])[:100]!r}: {e}")
+                return 0, [], 1
+
+        middle = len(rows) // 2
+        first = self._write(rows[:middle])
+        second = self._write(rows[middle:])
+        return first[0] + second[0], first[1] + second[1], first[2] + second[2]
+
+    def _requeue(self, rows: List[Dict[str, Any]]) -> None:
+        """Put failed rows back in front of newer events. Caller must hold the lock."""
+        dropped = 0
+        for row in reversed(rows):
+            attempts = row.get("attempts", 0) + 1
+            if attempts >= self.max_attempts:
+                dropped += 1
+                continue
+            key = self._key(row)
+            # Newer events for the same key replace the failed ones
+            if key not in self._pending:
+                item = {name: value for name, value in row.items() if name != "age_seconds"}
+                self._pending[key] = dict(item, attempts=attempts)
+                self._pending.move_to_end(key, last=False)
+
+        if dropped:
+            self._counts["dropped_after_retries"] += dropped
+            logger.error(f"Dropped {dropped} interactions after {self.max_attempts} failed flushes")
+
+    def _backoff(self) -> float:
+        """Get the pause before the next flush: flush_interval, doubled for each consecutive failed flush."""
+        with self._condition:
+            failures = self._consecutive_failures
+        return min(self.max_backoff, self.flush_interval * 2 ** min(failures, 16))
+
+    def start(self) -> None:
+        """Start the background flush thread once."""
+        with self._condition:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._flush_task, daemon=True).start()
+        logger.info("Interaction buffer flushing started")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get buffer occupancy and ingestion throughput in events per second."""
+        now = time.time()
+        with self._condition:
+            counts = dict(self._counts)
+            pending = len(self._pending)
+            accepted_rate = self._rate(self._accepted_log, now)
+            written_rate = self._rate(self._written_log, now)
+            last_flush_ms = self._last_flush_ms
+
+        return {
+            **counts,
+            "pending": pending,
+            "capacity": self.capacity,
+            "accepted_per_second": accepted_rate,
+            "written_per_second": written_rate,
+            "last_flush_ms": round(last_flush_ms, 2)
+        }
+
+    def _flush_task(self) -> None:
+        """Flush whenever enough interactions are pending or the interval passes, backing off while flushes fail."""
+        while True:
+            if self._consecutive_failures:
+                # Pause while the database fails instead of retrying at full rate
+                time.sleep(self._backoff())
+            else:
+                with self._condition:
+                    self._condition.wait_for(lambda: len(self._pending) >= self.flush_size, timeout=self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing interactions: {e}")
+
+    @staticmethod
+    def _key(item: Dict[str, Any]) -> tuple:
+        """Get the row identity of an interaction."""
+        return (str(item["user_id"]), str(item["recipe_id"]), item["interaction_type"])
+
+    @staticmethod
+    def _rate(log: deque, now: float) -> float:
+        """Get events per second over the rate window. Caller must hold the lock."""
+        while log and now - log[0][0] > RATE_WINDOW_SECONDS:
+            log.popleft()
+        return round(sum(count for _, count in log) / RATE_WINDOW_SECONDS, 2)
+
+# Global interaction buffer
+interaction_buffer = InteractionBuffer()
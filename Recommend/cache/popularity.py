@@ -0,0 +1,234 @@
+"""
+Exponentially decayed recipe popularity maintained online.
+
+Every interaction updates a single recipe score in O(1):
+
+    score = score * exp(-decay_rate * elapsed) + weight
+
+Scores are held relative to a shared reference time, so an update never has to
+touch other recipes and ranking never needs a decay pass over the whole catalog.
+Local increments are flushed to the recipe_popularity table periodically and the
+merged scores of all processes are read back at the same time.
+"""
+import heapq
+import logging
+import math
+import threading
+import time
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from config.config import POPULARITY_HALF_LIFE_HOURS, POPULARITY_PERSIST_INTERVAL
+from models.queries_recommend import (
+    get_recipe_popularity_scores, add_recipe_popularity_scores,
+    seed_recipe_popularity_scores
+)
+
+logger = logging.getLogger(__name__)
+
+# Interaction weights, matching the weighted score used for trending recipes
+INTERACTION_WEIGHTS = {
+    "cook": 1.0,
+    "save": 0.8,
+    "like": 0.6,
+    "view": 0.2
+}
+DEFAULT_INTERACTION_WEIGHT = 0.1
+
+# Rebase the reference time before exp() of the stored scores grows too large
+MAX_REFERENCE_EXPONENT = 50.0
+
+# Interactions older than this many half-lives contribute less than 0.1% when seeding
+SEED_HALF_LIVES = 10
+
+def interaction_weight(interaction_type: str, rating: Optional[float] = None) -> float:
+    """Get the popularity weight of a single interaction."""
+    if interaction_type == "rating":
+        return (rating or 0) / 5.0
+    return INTERACTION_WEIGHTS.get(interaction_type, DEFAULT_INTERACTION_WEIGHT)
+
+class DecayedPopularity:
+    """Per-recipe popularity scores with exponential time decay."""
+
+    def __init__(self, half_life_hours: float = POPULARITY_HALF_LIFE_HOURS):
+        """
+        Initialize an empty score table.
+
+        Args:
+            half_life_hours: Time after which an interaction counts half as much
+        """
+        self.decay_rate = math.log(2) / (half_life_hours * 3600)
+        self.loaded = False
+
+        self._lock = threading.Lock()
+        self._reference_time = time.time()
+        # Scores and unflushed local increments, both relative to _reference_time
+        self._scores: Dict[int, float] = {}
+        self._pending: Dict[int, float] = {}
+
+    def record(self, recipe_id, weight: float, timestamp: Optional[float] = None) -> None:
+        """
+        Add an interaction to a recipe's score.
+
+        Args:
+            recipe_id: Recipe ID (interactions store it as a string)
+            weight: Interaction weight
+            timestamp: Interaction time in epoch seconds, defaults to now
+        """
+        try:
+            recipe_id = int(recipe_id)
+        except (ValueError, TypeError):
+            return
+
+        timestamp = timestamp or time.time()
+
+        with self._lock:
+            exponent = self.decay_rate * (timestamp - self._reference_time)
+            if exponent > MAX_REFERENCE_EXPONENT:
+                self._rebase(timestamp)
+                exponent = 0.0
+
+            increment = weight * math.exp(exponent)
+            self._scores[recipe_id] = self._scores.get(recipe_id, 0.0) + increment
+            self._pending[recipe_id] = self._pending.get(recipe_id, 0.0) + increment
+
+    def record_interaction(self, recipe_id, interaction_type: str, rating: Optional[float] = None) -> None:
+        """Add a user interaction to a recipe's score."""
+        self.record(recipe_id, interaction_weight(interaction_type, rating))
+
+    def score(self, recipe_id: int, now: Optional[float] = None) -> float:
+        """Get the current decayed score of a recipe."""
+        now = now or time.time()
+        with self._lock:
+            stored = self._scores.get(recipe_id, 0.0)
+            return stored * math.exp(-self.decay_rate * (now - self._reference_time))
+
+    def top(self, limit: int, now: Optional[float] = None) -> List[Tuple[int, float]]:
+        """
+        Get the most popular recipes.
+
+        Args:
+            limit: Maximum number of recipes
+            now: Time to decay the scores to, defaults to now
+
+        Returns:
+            List of (recipe_id, score) tuples, highest score first
+        """
+        now = now or time.time()
+        with self._lock:
+            ranked = heapq.nlargest(limit, self._scores.items(), key=itemgetter(1))
+            factor = math.exp(-self.decay_rate * (now - self._reference_time))
+
+        return [(recipe_id, score * factor) for recipe_id, score in ranked]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def load(self) -> bool:
+        """
+        Load persisted scores, seeding them from the interaction history if none exist.
+
+        Returns:
+            bool: True if scores were loaded
+        """
+        rows = get_recipe_popularity_scores()
+        if not rows:
+            logger.info("No persisted popularity scores found, seeding from interactions")
+            horizon = SEED_HALF_LIVES * math.log(2) / self.decay_rate
+            if not seed_recipe_popularity_scores(self.decay_rate, horizon):
+                return False
+            rows = get_recipe_popularity_scores()
+
+        self._replace_scores(rows)
+        self.loaded = True
+        logger.info(f"Loaded decayed popularity scores for {len(rows)} recipes")
+        return True
+
+    def persist(self) -> bool:
+        """
+        Flush local increments and reload the merged scores.
+
+        Returns:
+            bool: True if the increments were written
+        """
+        now = time.time()
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            reference_time = self._reference_time
+            factor = math.exp(-self.decay_rate * (now - reference_time))
+
+        recipe_ids = list(pending.keys())
+        scores = [pending[recipe_id] * factor for recipe_id in recipe_ids]
+
+        if not add_recipe_popularity_scores(recipe_ids, scores, self.decay_rate):
+            # Keep the increments for the next flush
+            with self._lock:
+                shift = math.exp(-self.decay_rate * (self._reference_time - reference_time))
+                for recipe_id, increment in pending.items():
+                    self._pending[recipe_id] = self._pending.get(recipe_id, 0.0) + increment * shift
+            return False
+
+        rows = get_recipe_popularity_scores()
+        if rows:
+            self._replace_scores(rows)
+
+        logger.info(f"Persisted popularity increments for {len(recipe_ids)} recipes")
+        return True
+
+    def _replace_scores(self, rows) -> None:
+        """Replace scores with persisted rows, keeping increments not yet flushed."""
+        now = time.time()
+        with self._lock:
+            shift = math.exp(-self.decay_rate * (now - self._reference_time))
+            self._pending = {recipe_id: increment * shift for recipe_id, increment in self._pending.items()}
+            self._reference_time = now
+
+            scores = {
+                int(row["recipe_id"]): float(row["score"]) * math.exp(-self.decay_rate * float(row["age_seconds"]))
+                for row in rows
+            }
+            for recipe_id, increment in self._pending.items():
+                scores[recipe_id] = scores.get(recipe_id, 0.0) + increment
+            self._scores = scores
+
+    def _rebase(self, timestamp: float) -> None:
+        """Move the reference time forward. Caller must hold the lock."""
+        factor = math.exp(-self.decay_rate * (timestamp - self._reference_time))
+        self._scores = {recipe_id: score * factor for recipe_id, score in self._scores.items()}
+        self._pending = {recipe_id: score * factor for recipe_id, score in self._pending.items()}
+        self._reference_time = timestamp
+
+# Global popularity tracker
+tracker = None
+_tracker_lock = threading.Lock()
+
+def get_popularity_tracker() -> DecayedPopularity:
+    """Get the process-wide popularity tracker, loading it on first use."""
+    global tracker
+    if tracker is None:
+        with _tracker_lock:
+            if tracker is None:
+                new_tracker = DecayedPopularity()
+                new_tracker.load()
+                tracker = new_tracker
+    return tracker
+
+def popularity_persistence_task():
+    """Background task to periodically flush popularity increments."""
+    while True:
+        time.sleep(POPULARITY_PERSIST_INTERVAL)
+        try:
+            current = get_popularity_tracker()
+            if not current.loaded:
+                current.load()
+            current.persist()
+        except Exception as e:
+            logger.error(f"Error in popularity persistence task: {e}")
+
+def start_popularity_persistence():
+    """Load popularity scores and start flushing them in a background thread."""
+    get_popularity_tracker()
+    persistence_thread = threading.Thread(target=popularity_persistence_task, daemon=True)
+    persistence_thread.start()
+    logger.info("Popularity persistence started")
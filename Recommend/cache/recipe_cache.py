@@ -0,0 +1,117 @@
+"""
+Bounded in-process cache of fully hydrated recipe details.
+
+Entries are evicted least-recently-used beyond RECIPE_CACHE_SIZE and expire after
+CACHE_EXPIRATION seconds, which bounds staleness when another worker changes a
+recipe. Every invalidation bumps a per-recipe version; a reader records the
+version before going to the database and its result is only stored if the
+version is unchanged, so a read racing with an update cannot cache the old row.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Tuple
+
+from config.config import RECIPE_CACHE_SIZE, CACHE_EXPIRATION
+
+class RecipeCache:
+    """Versioned LRU cache of recipe dicts keyed by recipe ID."""
+
+    def __init__(self, max_size: int = RECIPE_CACHE_SIZE, ttl: int = CACHE_EXPIRATION):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_size: Maximum number of recipes held; 0 disables caching
+            ttl: Seconds after which an entry is re-read from the database
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._generation = 0
+        self._counts = {"hit": 0, "miss": 0}
+
+    def get_many(self, recipe_ids: Iterable[int]) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, Tuple[int, int]]]:
+        """
+        Look up recipes.
+
+        Args:
+            recipe_ids: Recipe IDs to look up
+
+        Returns:
+            Tuple of (copies of the cached recipes by ID, read tokens for the
+            missing IDs to pass back to put())
+        """
+        found, missing = {}, {}
+        now = time.time()
+
+        with self._lock:
+            for recipe_id in recipe_ids:
+                entry = self._entries.get(recipe_id)
+                if entry is not None and now - entry[0] < self.ttl:
+                    self._entries.move_to_end(recipe_id)
+                    found[recipe_id] = entry[1]
+                else:
+                    missing[recipe_id] = (self._generation, self._versions.get(recipe_id, 0))
+
+            self._counts["hit"] += len(found)
+            self._counts["miss"] += len(missing)
+
+        # Callers get their own copies so they can modify them freely
+        return {recipe_id: copy.deepcopy(recipe) for recipe_id, recipe in found.items()}, missing
+
+    def put(self, recipe_id: int, recipe: Dict[str, Any], token: Tuple[int, int]) -> None:
+        """
+        Store a recipe read from the database.
+
+        Args:
+            recipe_id: Recipe ID
+            recipe: Hydrated recipe dict
+            token: Read token returned by get_many() before the database read
+        """
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            if token != (self._generation, self._versions.get(recipe_id, 0)):
+                # The recipe changed while it was being read
+                return
+
+            self._entries[recipe_id] = (time.time(), copy.deepcopy(recipe))
+            self._entries.move_to_end(recipe_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, recipe_id: int) -> None:
+        """Drop a recipe after it is updated or deleted."""
+        with self._lock:
+            self._entries.pop(recipe_id, None)
+            self._versions[recipe_id] = self._versions.get(recipe_id, 0) + 1
+
+    def clear(self) -> None:
+        """Drop every recipe."""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size and hit-rate statistics."""
+        with self._lock:
+            counts = dict(self._counts)
+            size = len(self._entries)
+
+        lookups = counts["hit"] + counts["miss"]
+        return {
+            **counts,
+            "size": size,
+            "max_size": self.max_size,
+            "hit_rate": round(counts["hit"] / lookups, 4) if lookups > 0 else 0,
+            "ttl_seconds": self.ttl
+        }
+
+# Global recipe cache
+recipe_cache = RecipeCache()
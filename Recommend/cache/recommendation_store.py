@@ -0,0 +1,96 @@
+"""
+Serving path for precomputed per-user recommendation lists.
+
+Lists are written by the batch job in recommenders/precompute.py and served while
+they are younger than PRECOMPUTE_TTL. Recipes the user has interacted with since a
+list was computed are filtered out at read time.
+"""
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from config.config import PRECOMPUTE_TTL
+from models.queries_recommend import get_user_recommendations, get_user_recommendations_async
+
+logger = logging.getLogger(__name__)
+
+class PrecomputedRecommendations:
+    """Read path and hit-rate counters for precomputed recommendation lists."""
+
+    def __init__(self, ttl: int = PRECOMPUTE_TTL):
+        """
+        Initialize the store.
+
+        Args:
+            ttl: Maximum age in seconds of a list that is still served
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = {"hit": 0, "miss": 0, "stale": 0, "short": 0}
+
+    def get(self, user_id: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get a fresh precomputed list for a user.
+
+        Args:
+            user_id: User ID
+            limit: Number of items needed
+
+        Returns:
+            List of recommended items, or None if the caller should compute them online
+        """
+        return self._serve(get_user_recommendations(user_id), limit)
+
+    async def get_async(self, user_id: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Async variant of get."""
+        return self._serve(await get_user_recommendations_async(user_id), limit)
+
+    def _serve(self, row: Optional[Dict[str, Any]], limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Get the items of a stored list if it can be served, counting the outcome."""
+        if not row:
+            self._count("miss")
+            return None
+
+        if float(row["age_seconds"]) > self.ttl:
+            self._count("stale")
+            return None
+
+        # Drop anything the user has interacted with since the list was computed
+        excluded = set(str(recipe_id) for recipe_id in (row["interacted_ids"] or []))
+        items = [
+            {
+                "id": str(recipe_id),
+                "title": title,
+                "content_type": "recipe",
+                "score": score
+            }
+            for recipe_id, title, score in row["items"]
+            if str(recipe_id) not in excluded
+        ]
+
+        if len(items) < limit:
+            self._count("short")
+            return None
+
+        self._count("hit")
+        return items[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get lookup counts and the hit rate."""
+        with self._lock:
+            counts = dict(self._counts)
+
+        lookups = sum(counts.values())
+        return {
+            **counts,
+            "lookups": lookups,
+            "hit_rate": round(counts["hit"] / lookups, 4) if lookups > 0 else 0,
+            "ttl_seconds": self.ttl
+        }
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self._counts[outcome] += 1
+
+# Global store
+store = PrecomputedRecommendations()
@@ -0,0 +1,221 @@
+"""
+Bounded in-process cache of each user's most recent interactions.
+
+Each cached user holds a ring buffer of their USER_HISTORY_LENGTH newest
+interactions, newest first. A user is loaded on their first history read and
+kept current by appending every interaction this process records, so repeated
+personalized requests for an active user skip the history query. Users are
+evicted least-recently-used once USER_HISTORY_MAX_ENTRIES interactions are held
+in total, and entries expire after CACHE_EXPIRATION seconds to pick up writes
+made by other workers. Appends bump a version for the user's stripe of
+VERSION_STRIPES; a history read from the database is only stored if its
+stripe did not change during the read, so it cannot miss a write made
+meanwhile.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.config import USER_HISTORY_LENGTH, USER_HISTORY_MAX_ENTRIES, CACHE_EXPIRATION
+
+# Users share write versions by hash so that tracking them stays bounded
+VERSION_STRIPES = 1024
+
+class _UserHistory:
+    """Newest-first interactions of one user."""
+
+    __slots__ = ("loaded_at", "items", "exhaustive")
+
+    def __init__(self, items: Iterable[Dict[str, Any]], length: int, exhaustive: bool):
+        self.loaded_at = time.time()
+        self.items = deque(items, maxlen=length)
+        # True while the buffer holds every interaction the user has
+        self.exhaustive = exhaustive
+
+class UserHistoryCache:
+    """LRU cache of per-user recent interaction ring buffers."""
+
+    def __init__(self, length: int = USER_HISTORY_LENGTH, max_entries: int = USER_HISTORY_MAX_ENTRIES,
+                 ttl: int = CACHE_EXPIRATION):
+        """
+        Initialize an empty cache.
+
+        Args:
+            length: Interactions kept per user, which is also the number loaded on a miss
+            max_entries: Maximum interactions held over all users; 0 disables caching
+            ttl: Seconds after which a user's history is re-read from the database
+        """
+        self.length = length
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._users: "OrderedDict[str, _UserHistory]" = OrderedDict()
+        self._size = 0
+        self._versions = [0] * VERSION_STRIPES
+        self._counts = {"hit": 0, "miss": 0, "appended": 0, "evicted": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether histories are cached at all."""
+        return self.max_entries > 0 and self.length > 0
+
+    def get(self, user_id: str, limit: int, exclude_types: Optional[List[str]] = None,
+            since: Optional[datetime] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get a user's most recent interactions from the cache.
+
+        Args:
+            user_id: User ID
+            limit: Maximum number of interactions
+            exclude_types: Optional list of interaction types to exclude
+            since: Optional oldest interaction time to include
+
+        Returns:
+            Copies of up to limit interactions, newest first, or None if the
+            cached history cannot answer the request
+        """
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        excluded = set(exclude_types or [])
+
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is None or now - history.loaded_at >= self.ttl:
+                self._counts["miss"] += 1
+                return None
+
+            rows = [
+                row for row in history.items
+                if row["interaction_type"] not in excluded and (since is None or row["timestamp"] >= since)
+            ][:limit]
+
+            # Filtered rows may run out before limit while older matches exist
+            if len(rows) < limit and not history.exhaustive:
+                self._counts["miss"] += 1
+                return None
+
+            self._users.move_to_end(user_id)
+            self._counts["hit"] += 1
+
+        return copy.deepcopy(rows)
+
+    def read_token(self, user_id: str) -> int:
+        """Get the token to pass to put() for a database read starting now."""
+        with self._lock:
+            return self._versions[self._stripe(user_id)]
+
+    def put(self, user_id: str, rows: List[Dict[str, Any]], token: int) -> None:
+        """
+        Store a user's history read from the database.
+
+        Args:
+            user_id: User ID
+            rows: The user's newest interactions, newest first, read with a limit of length
+            token: Token returned by read_token() before the database read
+        """
+        if not self.enabled:
+            return
+
+        history = _UserHistory(copy.deepcopy(rows), self.length, len(rows) < self.length)
+
+        with self._lock:
+            if token != self._versions[self._stripe(user_id)]:
+                # An interaction was recorded while the history was being read
+                return
+            previous = self._users.pop(user_id, None)
+            if previous is not None:
+                self._size -= len(previous.items)
+            self._users[user_id] = history
+            self._size += len(history.items)
+            self._evict()
+
+    def append(self, user_id: str, interaction: Dict[str, Any]) -> None:
+        """
+        Add a newly recorded interaction to a cached user.
+
+        Users who are not cached are left alone, since a partial history could
+        not answer reads. An earlier interaction with the same recipe and type
+        is replaced, as the database row is updated in place.
+
+        Args:
+            user_id: User ID
+            interaction: Interaction with at least recipe_id, interaction_type, rating and timestamp
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._versions[self._stripe(user_id)] += 1
+            history = self._users.get(user_id)
+            if history is None:
+                return
+
+            key = (str(interaction["recipe_id"]), interaction["interaction_type"])
+            row = dict(interaction)
+            for existing in history.items:
+                if (str(existing["recipe_id"]), existing["interaction_type"]) == key:
+                    # Keep the fields only the read query knows about
+                    row = {**existing, **{name: value for name, value in row.items() if value is not None}}
+                    row["rating"] = interaction.get("rating")
+                    history.items.remove(existing)
+                    self._size -= 1
+                    break
+
+            if len(history.items) == history.items.maxlen:
+                history.exhaustive = False
+                self._size -= 1
+            history.items.appendleft(row)
+            self._size += 1
+            self._counts["appended"] += 1
+            self._evict()
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's cached history."""
+        with self._lock:
+            history = self._users.pop(user_id, None)
+            if history is not None:
+                self._size -= len(history.items)
+
+    def clear(self) -> None:
+        """Drop every cached history."""
+        with self._lock:
+            self._users.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache occupancy and hit-rate statistics."""
+        with self._lock:
+            counts = dict(self._counts)
+            users = len(self._users)
+            size = self._size
+
+        lookups = counts["hit"] + counts["miss"]
+        return {
+            **counts,
+            "users": users,
+            "entries": size,
+            "max_entries": self.max_entries,
+            "history_length": self.length,
+            "hit_rate": round(counts["hit"] / lookups, 4) if lookups > 0 else 0,
+            "ttl_seconds": self.ttl
+        }
+
+    @staticmethod
+    def _stripe(user_id: str) -> int:
+        """Get the version stripe of a user."""
+        return hash(user_id) % VERSION_STRIPES
+
+    def _evict(self) -> None:
+        """Drop least recently used users until under the entry limit. Caller must hold the lock."""
+        while self._size > self.max_entries and self._users:
+            _, history = self._users.popitem(last=False)
+            self._size -= len(history.items)
+            self._counts["evicted"] += 1
+
+# Global user history cache
+user_history_cache = UserHistoryCache()
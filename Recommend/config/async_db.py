@@ -0,0 +1,207 @@
+"""
+Async database access for coroutine endpoints, using a psycopg 3 connection pool.
+
+The helpers mirror config/db.py. Connections bind parameters on the client and
+return dict rows as psycopg2 does, so SQL built for the sync helpers runs here
+unchanged. Read-only queries can go to a replica pool, routed by the same
+ReplicaRouter as the sync helpers, and hot templates run as the same named
+prepared statements, through config/statements.py.
+"""
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+import psycopg
+from psycopg import AsyncClientCursor
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from config.config import (
+    DATABASE_URL, DATABASE_REPLICA_URL, ASYNC_DB_POOL_MIN, ASYNC_DB_POOL_MAX,
+    DB_POOL_ACQUIRE_TIMEOUT, DB_STATEMENT_TIMEOUT_MS
+)
+from config.db import replica_router, DB_SPAN_ATTRIBUTES
+from config.slow_queries import slow_query_log
+from config.statements import statement_registry
+from monitoring.tracing import traced, set_span_attributes
+
+logger = logging.getLogger(__name__)
+
+# Global async connection pools; async_replica_pool stays None without DATABASE_REPLICA_URL
+async_pool = None
+async_replica_pool = None
+
+async def _open_pool(url: str, min_conn: int, max_conn: int) -> AsyncConnectionPool:
+    """Open an async pool with the connection settings shared by both pools."""
+    kwargs = {"row_factory": dict_row, "cursor_factory": AsyncClientCursor}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        kwargs["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    pool = AsyncConnectionPool(
+        url,
+        min_size=min_conn,
+        max_size=max_conn,
+        kwargs=kwargs,
+        timeout=DB_POOL_ACQUIRE_TIMEOUT,
+        open=False
+    )
+    await pool.open()
+    return pool
+
+async def initialize_async_pool(min_conn: int = ASYNC_DB_POOL_MIN, max_conn: int = ASYNC_DB_POOL_MAX):
+    """Open the async connection pool, and the replica pool if a replica is configured."""
+    global async_pool, async_replica_pool
+    if async_pool is not None:
+        return
+    try:
+        async_pool = await _open_pool(DATABASE_URL, min_conn, max_conn)
+        logger.info(f"Async connection pool initialized with {min_conn}-{max_conn} connections")
+    except Exception as e:
+        logger.error(f"Failed to initialize async connection pool: {e}")
+        raise
+
+    if DATABASE_REPLICA_URL:
+        try:
+            async_replica_pool = await _open_pool(DATABASE_REPLICA_URL, min_conn, max_conn)
+            logger.info(f"Async replica connection pool initialized with {min_conn}-{max_conn} connections")
+        except Exception as e:
+            logger.error(f"Failed to initialize async replica connection pool: {e}")
+
+async def close_async_pool():
+    """Close the async connection pools."""
+    global async_pool, async_replica_pool
+    if async_replica_pool is not None:
+        await async_replica_pool.close()
+        async_replica_pool = None
+    if async_pool is not None:
+        await async_pool.close()
+        async_pool = None
+
+async def _execute_async(conn, query: str, params: Optional[Dict[str, Any]], statement: Optional[str] = None):
+    """Execute a query on a connection, as the named prepared statement if given, record its duration and return the cursor."""
+    start_time = time.perf_counter()
+    if statement:
+        cursor = conn.cursor()
+        await statement_registry.execute_async(cursor, statement, query, params)
+    else:
+        cursor = await conn.execute(query, params or {})
+    fingerprint, normalized = slow_query_log.record(query, params, (time.perf_counter() - start_time) * 1000)
+    set_span_attributes({"db.statement": normalized, "db.fingerprint": fingerprint, "db.prepared_statement": statement or ""})
+    return cursor
+
+@asynccontextmanager
+async def get_async_connection(replica: bool = False):
+    """
+    Get a connection from the async pool, committed on success and rolled back on error.
+
+    Args:
+        replica: Take the connection from the replica pool, if there is one
+    """
+    if async_pool is None:
+        await initialize_async_pool()
+
+    source = async_replica_pool if replica and async_replica_pool is not None else async_pool
+    async with source.connection() as conn:
+        yield conn
+
+@traced("db.execute_query_async", DB_SPAN_ATTRIBUTES)
+async def execute_query_async(query: str, params: Optional[Dict[str, Any]] = None,
+                              statement: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Execute a query and return all results.
+
+    Args:
+        query: Query text
+        params: Query parameters
+        statement: Name to run a hot single-statement query under as a prepared statement
+    """
+    try:
+        async with get_async_connection() as conn:
+            cursor = await _execute_async(conn, query, params, statement)
+            if cursor.description:
+                return await cursor.fetchall()
+            return []
+    except Exception as e:
+        logger.error(f"Database error: {e}")
+        raise
+
+@traced("db.execute_query_single_async", DB_SPAN_ATTRIBUTES)
+async def execute_query_single_async(query: str, params: Optional[Dict[str, Any]] = None,
+                                     statement: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Execute a query like execute_query_async and return a single result."""
+    try:
+        async with get_async_connection() as conn:
+            cursor = await _execute_async(conn, query, params, statement)
+            if cursor.description:
+                return await cursor.fetchone()
+            return None
+    except Exception as e:
+        logger.error(f"Database error: {e}")
+        raise
+
+@traced("db.execute_transaction_async", DB_SPAN_ATTRIBUTES)
+async def execute_transaction_async(queries_params: List[tuple]):
+    """
+    Execute multiple queries in a transaction.
+
+    Args:
+        queries_params: List of (query, params) tuples to execute
+
+    Returns:
+        True if successful
+    """
+    try:
+        async with get_async_connection() as conn:
+            async with conn.cursor() as cursor:
+                for query, params in queries_params:
+                    await cursor.execute(query, params or {})
+        return True
+    except Exception as e:
+        logger.error(f"Transaction error: {e}")
+        raise
+
+@traced("db.execute_read_query_async", DB_SPAN_ATTRIBUTES)
+async def execute_read_query_async(query: str, params: Optional[Dict[str, Any]] = None,
+                                   user_id: Optional[str] = None,
+                                   statement: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Execute a read-only query on the replica when possible and return all results.
+
+    Args:
+        query: Query that does not write
+        params: Query parameters
+        user_id: User whose recent writes the result must include, if any
+        statement: Name to run the query under as a prepared statement
+    """
+    if async_replica_pool is not None and replica_router.use_replica(user_id):
+        set_span_attributes({"db.replica": True})
+        try:
+            async with get_async_connection(replica=True) as conn:
+                cursor = await _execute_async(conn, query, params, statement)
+                return await cursor.fetchall() if cursor.description else []
+        except psycopg.errors.QueryCanceled:
+            raise
+        except (psycopg.OperationalError, psycopg.InterfaceError, PoolTimeout) as e:
+            replica_router.mark_failed(e)
+
+    replica_router.count_primary()
+    return await execute_query_async(query, params, statement)
+
+@traced("db.execute_read_query_single_async", DB_SPAN_ATTRIBUTES)
+async def execute_read_query_single_async(query: str, params: Optional[Dict[str, Any]] = None,
+                                          user_id: Optional[str] = None,
+                                          statement: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Execute a read-only query like execute_read_query_async and return a single result."""
+    if async_replica_pool is not None and replica_router.use_replica(user_id):
+        set_span_attributes({"db.replica": True})
+        try:
+            async with get_async_connection(replica=True) as conn:
+                cursor = await _execute_async(conn, query, params, statement)
+                return await cursor.fetchone() if cursor.description else None
+        except psycopg.errors.QueryCanceled:
+            raise
+        except (psycopg.OperationalError, psycopg.InterfaceError, PoolTimeout) as e:
+            replica_router.mark_failed(e)
+
+    replica_router.count_primary()
+    return await execute_query_single_async(query, params, statement)
@@ -2,23 +2,203 @@
 Database connection handling with connection pooling and transaction management.
 """
 import logging
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
 from typing import Any, Dict, Optional, List
 from contextlib import contextmanager
 import psycopg2
+import psycopg2.errors
 import psycopg2.extras
 from psycopg2.pool import ThreadedConnectionPool
-from config.config import DATABASE_URL
+from psycopg_pool import PoolTimeout
+from config.statements import statement_registry
+from config.slow_queries import slow_query_log
+from monitoring.tracing import traced, set_span_attributes
+from config.config import (
+    DATABASE_URL, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_ACQUIRE_TIMEOUT,
+    DB_POOL_VALIDATE_IDLE, DB_STATEMENT_TIMEOUT_MS, DATABASE_REPLICA_URL,
+    REPLICA_MAX_LAG_SECONDS, REPLICA_CHECK_INTERVAL, READ_YOUR_WRITES_SECONDS
+)
 
 logger = logging.getLogger(__name__)
 
-# Global connection pool
+# Errors caused by the data itself, which retrying the same statement cannot fix;
+# psycopg2 raises ValueError for strings with NUL characters before sending them
+DATA_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError, ValueError)
+
+class PoolTimeoutError(Exception):
+    """No database connection became free within the acquisition timeout."""
+
+# Raised by the sync and the async pool when every connection stayed busy. Request
+# path query functions re-raise them past their generic error handling, so the
+# client gets a 503 with Retry-After instead of an empty result.
+POOL_TIMEOUTS = (PoolTimeoutError, PoolTimeout)
+
+class BlockingConnectionPool:
+    """
+    ThreadedConnectionPool that makes callers wait for a free connection.
+
+    psycopg2 raises as soon as every connection is taken; here callers queue for
+    up to acquire_timeout seconds instead. Connections idle for longer than
+    validate_idle seconds are checked with a trivial query before reuse and
+    replaced if the server dropped them. Returned connections stay open up to
+    max_conn, so they keep their prepared statements instead of being closed
+    and reopened under load.
+    """
+
+    def __init__(self, min_conn: int, max_conn: int, dsn: str, acquire_timeout: float = DB_POOL_ACQUIRE_TIMEOUT,
+                 validate_idle: float = DB_POOL_VALIDATE_IDLE, statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS,
+                 **kwargs):
+        """
+        Open the pool.
+
+        Args:
+            min_conn: Connections opened up front
+            max_conn: Maximum open connections
+            dsn: Database URL
+            acquire_timeout: Seconds to wait for a free connection
+            validate_idle: Idle seconds after which a connection is checked before reuse
+            statement_timeout_ms: Server-side statement timeout per connection; 0 disables it
+            kwargs: Passed on to psycopg2.connect
+        """
+        if statement_timeout_ms > 0:
+            kwargs["options"] = f"-c statement_timeout={statement_timeout_ms}"
+
+        self.min_conn = min_conn
+        self.max_conn = max_conn
+        self.acquire_timeout = acquire_timeout
+        self.validate_idle = validate_idle
+        self.statement_timeout_ms = statement_timeout_ms
+        self._pool = ThreadedConnectionPool(min_conn, max_conn, dsn, **kwargs)
+        # psycopg2 closes returned connections once minconn are idle; only the
+        # initial connections are opened from minconn, so raise it to keep them all
+        self._pool.minconn = max_conn
+        self._slots = threading.BoundedSemaphore(max_conn)
+        self._lock = threading.Lock()
+        self._returned_at = weakref.WeakKeyDictionary()
+        self._in_use = 0
+        self._waiting = 0
+        self._counts = {"acquired": 0, "waited": 0, "timeouts": 0, "validation_failures": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def getconn(self):
+        """
+        Take a connection, waiting while all of them are in use.
+
+        Raises:
+            PoolTimeoutError: If no connection is free within acquire_timeout
+        """
+        start_time = time.perf_counter()
+        acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.acquire_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        waited = time.perf_counter() - start_time
+
+        with self._lock:
+            if not acquired:
+                self._counts["timeouts"] += 1
+            else:
+                self._counts["acquired"] += 1
+                self._in_use += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+                if waited > 0.001:
+                    self._counts["waited"] += 1
+        if not acquired:
+            raise PoolTimeoutError(f"No database connection free after {self.acquire_timeout}s")
+
+        try:
+            return self._checkout()
+        except Exception:
+            self._release()
+            raise
+
+    def putconn(self, conn, close: bool = False):
+        """Return a connection taken with getconn."""
+        try:
+            if not close and not conn.closed:
+                self._returned_at[conn] = time.monotonic()
+            self._pool.putconn(conn, close=close)
+        finally:
+            self._release()
+
+    def closeall(self):
+        """Close every connection."""
+        self._pool.closeall()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get connection usage and acquisition wait statistics."""
+        with self._lock:
+            counts = dict(self._counts)
+            in_use, waiting = self._in_use, self._waiting
+            wait_total, wait_max = self._wait_total, self._wait_max
+            # ThreadedConnectionPool keeps its idle connections in _pool
+            idle = len(self._pool._pool)
+
+        return {
+            **counts,
+            "in_use": in_use,
+            "idle": idle,
+            "waiting": waiting,
+            "min_connections": self.min_conn,
+            "max_connections": self.max_conn,
+            "mean_wait_ms": round(wait_total / counts["acquired"] * 1000, 3) if counts["acquired"] else 0,
+            "max_wait_ms": round(wait_max * 1000, 3),
+            "acquire_timeout_seconds": self.acquire_timeout,
+            "statement_timeout_ms": self.statement_timeout_ms
+        }
+
+    def _checkout(self):
+        """Take a usable connection from the underlying pool. Caller holds a slot."""
+        # Each failed check closes a connection, so this ends with a new one at the latest
+        for _ in range(self.max_conn + 1):
+            conn = self._pool.getconn()
+            returned_at = self._returned_at.pop(conn, None)
+            if returned_at is None or time.monotonic() - returned_at < self.validate_idle:
+                return conn
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+                return conn
+            except psycopg2.Error as e:
+                logger.warning(f"Replacing stale database connection: {e}")
+                with self._lock:
+                    self._counts["validation_failures"] += 1
+                self._pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("Could not get a working database connection")
+
+    def _release(self):
+        """Give a slot back to waiting callers."""
+        with self._lock:
+            self._in_use -= 1
+        self._slots.release()
+
+# Attributes of every database helper span
+DB_SPAN_ATTRIBUTES = {"db.system": "postgresql"}
+
+# Global connection pools; replica_pool stays None without DATABASE_REPLICA_URL
 pool = None
+replica_pool = None
 
-def initialize_pool(min_conn=5, max_conn=20):
-    """Initialize the connection pool."""
-    global pool
+# Per-thread statement timeout overrides, see statement_timeout()
+_local = threading.local()
+
+def initialize_pool(min_conn: int = DB_POOL_MIN, max_conn: int = DB_POOL_MAX):
+    """Initialize the connection pool, and the replica pool if a replica is configured."""
+    global pool, replica_pool
     try:
-        pool = ThreadedConnectionPool(
+        pool = BlockingConnectionPool(
             min_conn, 
             max_conn, 
             DATABASE_URL,
@@ -28,26 +208,77 @@ def initialize_pool(min_conn=5, max_conn=20):
     except Exception as e:
         logger.error(f"Failed to initialize connection pool: {e}")
         raise
+    
+    if DATABASE_REPLICA_URL and replica_pool is None:
+        try:
+            replica_pool = BlockingConnectionPool(
+                min_conn,
+                max_conn,
+                DATABASE_REPLICA_URL,
+                cursor_factory=psycopg2.extras.RealDictCursor
+            )
+            logger.info(f"Replica connection pool initialized with {min_conn}-{max_conn} connections")
+        except Exception as e:
+            # Reads keep going to the primary until the replica can be reached
+            logger.error(f"Failed to initialize replica connection pool: {e}")
 
 @contextmanager
-def get_connection():
-    """Get a connection from the pool."""
+def statement_timeout(timeout_ms: int):
+    """
+    Override the pool's statement timeout for queries run by this thread.
+
+    Args:
+        timeout_ms: Statement timeout in milliseconds; 0 disables it, e.g. for
+            maintenance jobs whose statements legitimately run long
+    """
+    previous = getattr(_local, "statement_timeout", None)
+    _local.statement_timeout = timeout_ms
+    try:
+        yield
+    finally:
+        _local.statement_timeout = previous
+
+@contextmanager
+def get_connection(replica: bool = False):
+    """
+    Get a connection from the pool.
+    
+    Args:
+        replica: Take the connection from the replica pool, if there is one
+    """
     global pool
     if pool is None:
         initialize_pool()
     
+    source = replica_pool if replica and replica_pool is not None else pool
     conn = None
+    override = getattr(_local, "statement_timeout", None)
     try:
-        conn = pool.getconn()
+        conn = source.getconn()
+        if override is not None:
+            with conn.cursor() as cursor:
+                cursor.execute("SET statement_timeout = %(timeout)s", {"timeout": override})
+            conn.commit()
         yield conn
     finally:
         if conn:
-            pool.putconn(conn)
+            close = False
+            if override is not None and not conn.closed:
+                try:
+                    conn.rollback()
+                    with conn.cursor() as cursor:
+                        cursor.execute("RESET statement_timeout")
+                    conn.commit()
+                except psycopg2.Error as e:
+                    # Never hand out a connection still carrying the override
+                    logger.warning(f"Could not reset statement timeout: {e}")
+                    close = True
+            source.putconn(conn, close=close)
 
 @contextmanager
-def get_cursor():
-    """Get a cursor using a connection from the pool."""
-    with get_connection() as conn:
+def get_cursor(replica: bool = False):
+    """Get a cursor using a connection from the pool, or from the replica pool if replica is set."""
+    with get_connection(replica) as conn:
         cursor = conn.cursor()
         try:
             yield cursor
@@ -59,23 +290,45 @@ def get_cursor():
         finally:
             cursor.close()
 
-def execute_query(query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-    """Execute a query and return all results."""
-    with get_cursor() as cursor:
+def _execute(cursor, query: str, params: Optional[Dict[str, Any]], statement: Optional[str]) -> None:
+    """Execute a query, as the named prepared statement if statement is given, and record its duration."""
+    start_time = time.perf_counter()
+    if statement:
+        statement_registry.execute(cursor, statement, query, params)
+    else:
         cursor.execute(query, params or {})
+    fingerprint, normalized = slow_query_log.record(query, params, (time.perf_counter() - start_time) * 1000)
+    set_span_attributes({"db.statement": normalized, "db.fingerprint": fingerprint, "db.prepared_statement": statement or ""})
+
+@traced("db.execute_query", DB_SPAN_ATTRIBUTES)
+def execute_query(query: str, params: Optional[Dict[str, Any]] = None,
+                  statement: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Execute a query and return all results.
+    
+    Args:
+        query: Query text
+        params: Query parameters
+        statement: Name to run a hot single-statement query under as a prepared statement
+    """
+    with get_cursor() as cursor:
+        _execute(cursor, query, params, statement)
         if cursor.description:
             return cursor.fetchall()
         return []
 
-def execute_query_single(query: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
-    """Execute a query and return a single result."""
+@traced("db.execute_query_single", DB_SPAN_ATTRIBUTES)
+def execute_query_single(query: str, params: Optional[Dict[str, Any]] = None,
+                         statement: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Execute a query like execute_query and return a single result."""
     with get_cursor() as cursor:
-        cursor.execute(query, params or {})
+        _execute(cursor, query, params, statement)
         if cursor.description:
             result = cursor.fetchone()
             return result
         return None
 
+@traced("db.execute_transaction", DB_SPAN_ATTRIBUTES)
 def execute_transaction(queries_params: List[tuple]):
     """
     Execute multiple queries in a transaction.
@@ -90,7 +343,7 @@ def execute_transaction(queries_params: List[tuple]):
         try:
             with conn.cursor() as cursor:
                 for query, params in queries_params:
-                    cursor.execute(query, params or {})
+                    _execute(cursor, query, params, None)
             conn.commit()
             return True
         except Exception as e:
@@ -98,6 +351,293 @@ def execute_transaction(queries_params: List[tuple]):
             logger.error(f"Transaction error: {e}")
             raise
 
+def execute_on_cursor(cursor, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Execute a query on a cursor from get_cursor, timed like the other helpers.
+    
+    For statements that depend on earlier results in the same transaction.
+    
+    Returns:
+        The rows of the query, or an empty list if it returns none
+    """
+    _execute(cursor, query, params, None)
+    return cursor.fetchall() if cursor.description else []
+
+class ReplicaRouter:
+    """
+    Decides whether a read-only query may go to the replica.
+    
+    Reads go to the primary while the replica is unreachable or more than
+    REPLICA_MAX_LAG_SECONDS behind, and for READ_YOUR_WRITES_SECONDS after this
+    process records a write for the user the read is for, so users see their own
+    interactions straight away. The window should exceed the maximum lag.
+    """
+    
+    def __init__(self, max_lag: float = REPLICA_MAX_LAG_SECONDS, sticky_seconds: float = READ_YOUR_WRITES_SECONDS):
+        """
+        Initialize the router.
+        
+        Args:
+            max_lag: Replication lag in seconds above which reads avoid the replica
+            sticky_seconds: Seconds after a user's write during which their reads use the primary
+        """
+        self.max_lag = max_lag
+        self.sticky_seconds = sticky_seconds
+        self._lock = threading.Lock()
+        self._writes: "OrderedDict[str, float]" = OrderedDict()
+        self._healthy = False
+        self._lag_seconds = None
+        self._checked_at = None
+        self._counts = {"replica": 0, "primary": 0, "sticky": 0, "unhealthy": 0, "fallbacks": 0}
+    
+    def record_write(self, user_id: str) -> None:
+        """Send the user's reads to the primary for the stickiness window."""
+        now = time.monotonic()
+        with self._lock:
+            self._writes[str(user_id)] = now
+            self._writes.move_to_end(str(user_id))
+            # Entries are in write order, so expired ones are at the front
+            while self._writes and now - next(iter(self._writes.values())) > self.sticky_seconds:
+                self._writes.popitem(last=False)
+    
+    def use_replica(self, user_id: Optional[str] = None) -> bool:
+        """
+        Check whether a read may go to the replica.
+        
+        Args:
+            user_id: User the read is for, if it depends on their recent writes
+        """
+        if replica_pool is None:
+            return False
+        
+        with self._lock:
+            if not self._healthy:
+                self._counts["unhealthy"] += 1
+                return False
+            written_at = self._writes.get(str(user_id)) if user_id is not None else None
+            if written_at is not None and time.monotonic() - written_at <= self.sticky_seconds:
+                self._counts["sticky"] += 1
+                return False
+            self._counts["replica"] += 1
+            return True
+    
+    @property
+    def available(self) -> bool:
+        """Whether the replica is configured and healthy, without counting a routing decision."""
+        with self._lock:
+            return replica_pool is not None and self._healthy
+    
+    def mark_failed(self, error: Exception) -> None:
+        """Stop using the replica until the next lag check succeeds."""
+        logger.warning(f"Replica read failed, using the primary: {error}")
+        with self._lock:
+            self._healthy = False
+            self._counts["fallbacks"] += 1
+    
+    def count_primary(self) -> None:
+        """Count a read that went to the primary."""
+        with self._lock:
+            self._counts["primary"] += 1
+    
+    def check_lag(self) -> Optional[float]:
+        """
+        Measure the replica's lag and update whether reads may use it.
+        
+        Returns:
+            Lag in seconds, or None if the replica could not be reached
+        """
+        lag = None
+        try:
+            with get_cursor(replica=True) as cursor:
+                # Zero when everything received is replayed, so an idle primary does not look like lag
+                cursor.execute("""
+                SELECT CASE
+                    WHEN NOT pg_is_in_recovery() THEN 0
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE COALESCE(EXTRACT(EPOCH FROM (NOW() - pg_last_xact_replay_timestamp())), 0)
+                END as lag_seconds
+                """)
+                lag = float(cursor.fetchone()["lag_seconds"])
+        except Exception as e:
+            logger.warning(f"Replica lag check failed: {e}")
+        
+        with self._lock:
+            self._lag_seconds = lag
+            self._checked_at = time.time()
+            self._healthy = lag is not None and lag <= self.max_lag
+        return lag
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get routing counts and the last measured replica lag."""
+        with self._lock:
+            return {
+                **self._counts,
+                "configured": replica_pool is not None,
+                "healthy": self._healthy,
+                "lag_seconds": self._lag_seconds,
+                "checked_at": self._checked_at,
+                "max_lag_seconds": self.max_lag,
+                "sticky_users": len(self._writes),
+                "sticky_seconds": self.sticky_seconds
+            }
+
+# Global replica router
+replica_router = ReplicaRouter()
+
+def replica_monitor_task():
+    """Background task to periodically measure replica lag."""
+    while True:
+        replica_router.check_lag()
+        time.sleep(REPLICA_CHECK_INTERVAL)
+
+def start_replica_monitor():
+    """Start measuring replica lag in a background thread, if a replica is configured."""
+    if replica_pool is None:
+        return
+    
+    replica_router.check_lag()
+    monitor_thread = threading.Thread(target=replica_monitor_task, daemon=True)
+    monitor_thread.start()
+    logger.info("Replica lag monitor started")
+
+@traced("db.execute_read_query", DB_SPAN_ATTRIBUTES)
+def execute_read_query(query: str, params: Optional[Dict[str, Any]] = None,
+                       user_id: Optional[str] = None, statement: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Execute a read-only query on the replica when possible and return all results.
+    
+    Args:
+        query: Query that does not write
+        params: Query parameters
+        user_id: User whose recent writes the result must include, if any
+        statement: Name to run the query under as a prepared statement
+    """
+    if replica_router.use_replica(user_id):
+        set_span_attributes({"db.replica": True})
+        try:
+            with get_cursor(replica=True) as cursor:
+                _execute(cursor, query, params, statement)
+                return cursor.fetchall() if cursor.description else []
+        except psycopg2.errors.QueryCanceled:
+            # A statement timeout says nothing about the replica's health
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError, PoolTimeoutError) as e:
+            replica_router.mark_failed(e)
+    
+    replica_router.count_primary()
+    return execute_query(query, params, statement)
+
+@traced("db.execute_read_query_single", DB_SPAN_ATTRIBUTES)
+def execute_read_query_single(query: str, params: Optional[Dict[str, Any]] = None,
+                              user_id: Optional[str] = None, statement: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Execute a read-only query like execute_read_query and return a single result."""
+    if replica_router.use_replica(user_id):
+        set_span_attributes({"db.replica": True})
+        try:
+            with get_cursor(replica=True) as cursor:
+                _execute(cursor, query, params, statement)
+                return cursor.fetchone() if cursor.description else None
+        except psycopg2.errors.QueryCanceled:
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError, PoolTimeoutError) as e:
+            replica_router.mark_failed(e)
+    
+    replica_router.count_primary()
+    return execute_query_single(query, params, statement)
+
+# Statements EXPLAIN ANALYZE may run: reads without data-modifying CTEs or locking clauses
+_READ_ONLY_QUERY = re.compile(r"^\s*(?:SELECT|WITH)\b", re.I)
+_WRITING_QUERY = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE)\b|\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE)\b", re.I)
+
+def explain_query(query: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Get the plan of a query, on the replica while it is healthy and otherwise on
+    a primary connection of its own.
+    
+    Read-only queries run under EXPLAIN (ANALYZE, BUFFERS), which executes them
+    again; other statements are only planned, since ANALYZE would perform their
+    writes. Either way the transaction is rolled back.
+    
+    Args:
+        query: Query text with placeholders
+        params: Query parameters
+    
+    Returns:
+        Dict with the JSON plan, whether it was analyzed and where it ran
+    """
+    analyze = bool(_READ_ONLY_QUERY.match(query)) and not _WRITING_QUERY.search(query)
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    replica = replica_router.available
+    
+    with get_connection(replica=replica) as conn:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"EXPLAIN ({options}) {query}", params or {})
+                row = cursor.fetchone()
+        finally:
+            conn.rollback()
+    
+    return {
+        "plan": row["QUERY PLAN"],
+        "analyzed": analyze,
+        "source": "replica" if replica else "primary"
+    }
+
+@contextmanager
+def advisory_lock(name: str):
+    """
+    Hold a session-level advisory lock for the block, unless another session has it.
+    
+    Background jobs run in every worker process; taking the lock first lets only
+    one of them do the work. Yields True if the lock was taken. The lock holds
+    one pool connection until the block ends.
+    
+    Args:
+        name: Lock name, hashed to the lock key
+    """
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(hashtext(%(name)s)) as locked", {"name": name})
+            locked = cursor.fetchone()["locked"]
+        conn.commit()
+        try:
+            yield locked
+        finally:
+            if locked and not conn.closed:
+                try:
+                    conn.rollback()
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT pg_advisory_unlock(hashtext(%(name)s))", {"name": name})
+                    conn.commit()
+                except psycopg2.Error as e:
+                    # The lock goes away with the session if the connection is broken
+                    logger.warning(f"Could not release advisory lock {name}: {e}")
+
+# Results of column_exists, keyed by (table, column), with the time they were checked
+_schema_columns = {}
+
+# Seconds after which a missing column is looked up again, so a migration
+# applied to a running service is picked up without a restart
+SCHEMA_RECHECK_SECONDS = 60
+
+def column_exists(table: str, column: str) -> bool:
+    """
+    Check whether a column exists, so code can keep working before the
+    migration adding it has been applied. A column that exists is remembered
+    for the life of the process; a missing one is checked again after
+    SCHEMA_RECHECK_SECONDS.
+    """
+    key = (table, column)
+    cached = _schema_columns.get(key)
+    if cached is None or (not cached[0] and time.monotonic() - cached[1] >= SCHEMA_RECHECK_SECONDS):
+        row = execute_query_single("""
+        SELECT 1 as present
+        FROM information_schema.columns
+        WHERE table_name = %(table)s AND column_name = %(column)s
+        """, {"table": table, "column": column})
+        cached = _schema_columns[key] = (row is not None, time.monotonic())
+    return cached[0]
+
 def check_connection() -> bool:
     """Test database connection."""
     try:
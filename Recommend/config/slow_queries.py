@@ -0,0 +1,256 @@
+"""
+Per-query latency by fingerprint, with sampled plans of slow queries.
+
+Every query the database helpers run is reduced to a fingerprint: its text
+with literals, placeholders and value lists replaced, so calls of one query
+template group together however its values were bound. Calls, total and
+maximum time are kept per fingerprint. A call slower than SLOW_QUERY_MS also
+records the shape of its parameters, such as "ids=list[40], limit=int", and at
+most once per SLOW_QUERY_EXPLAIN_INTERVAL seconds per fingerprint the query is
+queued for a background thread, which runs it again under EXPLAIN on its own
+connection and keeps the newest SLOW_QUERY_PLANS_KEPT plans. The request that
+was slow never waits for the plan.
+"""
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config.config import (
+    SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN_INTERVAL, SLOW_QUERY_PLANS_KEPT, SLOW_QUERY_MAX_FINGERPRINTS
+)
+
+logger = logging.getLogger(__name__)
+
+# Distinct parameter shapes kept per fingerprint
+MAX_SHAPES = 10
+# Slow queries waiting for a plan; more are dropped rather than queued
+EXPLAIN_QUEUE_SIZE = 32
+
+# Statements EXPLAIN accepts; DDL and maintenance commands are timed but not explained
+_EXPLAINABLE = re.compile(r"^\s*(?:SELECT|WITH|INSERT|UPDATE|DELETE|VALUES)\b", re.I)
+
+_NORMALIZE = [
+    (re.compile(r"--[^\n]*|/\*.*?\*/", re.S), " "),
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|%s"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?+)"),
+    (re.compile(r"\s+"), " ")
+]
+
+def normalize_query(query: str) -> str:
+    """Strip comments and replace literals, placeholders and value lists with ?."""
+    for pattern, replacement in _NORMALIZE:
+        query = pattern.sub(replacement, query)
+    return query.strip()
+
+def _shape(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (list, tuple)):
+        return f"list[{len(value)}]"
+    return type(value).__name__
+
+def param_shape(params: Optional[Dict[str, Any]]) -> str:
+    """Describe parameters by name and type, and length for lists, without their values."""
+    if not params:
+        return ""
+    if not isinstance(params, dict):
+        return ", ".join(_shape(value) for value in params)
+    return ", ".join(f"{name}={_shape(value)}" for name, value in sorted(params.items()))
+
+class _QueryStats:
+    """Counters, parameter shapes and plans of one fingerprint."""
+
+    __slots__ = ("fingerprint", "query", "calls", "total_ms", "max_ms", "slow_calls",
+                 "shapes", "plans", "explained_at", "last_seen")
+
+    def __init__(self, fingerprint: str, query: str, plans_kept: int):
+        self.fingerprint = fingerprint
+        self.query = query
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow_calls = 0
+        self.shapes: Dict[str, int] = {}
+        self.plans = deque(maxlen=plans_kept)
+        self.explained_at = None
+        self.last_seen = None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "query": self.query,
+            "calls": self.calls,
+            "slow_calls": self.slow_calls,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0,
+            "max_ms": round(self.max_ms, 3),
+            "plans": len(self.plans),
+            "last_seen": datetime.fromtimestamp(self.last_seen).isoformat(timespec="seconds") if self.last_seen else None
+        }
+
+class SlowQueryLog:
+    """Query latency by fingerprint and a background EXPLAIN sampler for slow queries."""
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, explain_interval: float = SLOW_QUERY_EXPLAIN_INTERVAL,
+                 plans_kept: int = SLOW_QUERY_PLANS_KEPT, max_fingerprints: int = SLOW_QUERY_MAX_FINGERPRINTS):
+        """
+        Initialize an empty log.
+
+        Args:
+            threshold_ms: Duration from which a call counts as slow; 0 disables plan sampling
+            explain_interval: Minimum seconds between two plans of one fingerprint
+            plans_kept: Plans kept per fingerprint, newest first
+            max_fingerprints: Fingerprints tracked; the least recently seen are dropped beyond it
+        """
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self.plans_kept = plans_kept
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._queries: "OrderedDict[str, _QueryStats]" = OrderedDict()
+        # Fingerprints by raw query text, so each text is normalized once
+        self._fingerprints: Dict[str, tuple] = {}
+        self._pending: "queue.Queue[tuple]" = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        self._worker = None
+        self._counts = {"explained": 0, "explain_failures": 0, "explain_dropped": 0}
+
+    def fingerprint(self, query: str) -> tuple:
+        """Get the fingerprint ID and normalized text of a query."""
+        known = self._fingerprints.get(query)
+        if known is None:
+            normalized = normalize_query(query)
+            known = (hashlib.md5(normalized.encode()).hexdigest()[:12], normalized)
+            if len(self._fingerprints) >= self.max_fingerprints * 4:
+                # Texts with inlined values can be endless; start over rather than grow
+                self._fingerprints.clear()
+            self._fingerprints[query] = known
+        return known
+
+    def record(self, query: str, params: Optional[Dict[str, Any]], elapsed_ms: float) -> tuple:
+        """
+        Record one executed query.
+
+        Args:
+            query: Query text as executed, with placeholders
+            params: Query parameters, only kept until a sampled plan is taken
+            elapsed_ms: Execution time in milliseconds
+
+        Returns:
+            The fingerprint ID and normalized text of the query
+        """
+        fingerprint, normalized = self.fingerprint(query)
+        slow = 0 < self.threshold_ms <= elapsed_ms
+        explain = False
+
+        with self._lock:
+            stats = self._queries.get(fingerprint)
+            if stats is None:
+                stats = self._queries[fingerprint] = _QueryStats(fingerprint, normalized, self.plans_kept)
+                while len(self._queries) > self.max_fingerprints:
+                    self._queries.popitem(last=False)
+            else:
+                self._queries.move_to_end(fingerprint)
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.last_seen = time.time()
+
+            if slow:
+                stats.slow_calls += 1
+                shape = param_shape(params)
+                if shape in stats.shapes or len(stats.shapes) < MAX_SHAPES:
+                    stats.shapes[shape] = stats.shapes.get(shape, 0) + 1
+                now = time.monotonic()
+                due = stats.explained_at is None or now - stats.explained_at >= self.explain_interval
+                if due and _EXPLAINABLE.match(query):
+                    stats.explained_at = now
+                    explain = True
+
+        if explain:
+            logger.warning(f"Slow query {fingerprint} took {elapsed_ms:.1f} ms: {normalized[:200]}")
+            self._queue_explain(fingerprint, query, params, elapsed_ms)
+        return fingerprint, normalized
+
+    def stats(self, limit: int = 50, slow_only: bool = False) -> Dict[str, Any]:
+        """
+        Get the fingerprints with the most total time.
+
+        Args:
+            limit: Maximum number of fingerprints
+            slow_only: Only include fingerprints with at least one slow call
+        """
+        with self._lock:
+            queries = [stats.summary() for stats in self._queries.values() if stats.slow_calls or not slow_only]
+            counts = dict(self._counts)
+
+        queries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return {
+            **counts,
+            "threshold_ms": self.threshold_ms,
+            "explain_interval_seconds": self.explain_interval,
+            "fingerprints": len(queries),
+            "queries": queries[:limit]
+        }
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Get one fingerprint with its parameter shapes and sampled plans, or None if unknown."""
+        with self._lock:
+            stats = self._queries.get(fingerprint)
+            if stats is None:
+                return None
+            return {
+                **stats.summary(),
+                "param_shapes": dict(stats.shapes),
+                "plans": list(stats.plans)
+            }
+
+    def clear(self) -> None:
+        """Forget every fingerprint and plan."""
+        with self._lock:
+            self._queries.clear()
+
+    def _queue_explain(self, fingerprint: str, query: str, params: Optional[Dict[str, Any]], elapsed_ms: float) -> None:
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._explain_task, daemon=True)
+                self._worker.start()
+        try:
+            self._pending.put_nowait((fingerprint, query, params, elapsed_ms))
+        except queue.Full:
+            with self._lock:
+                self._counts["explain_dropped"] += 1
+
+    def _explain_task(self) -> None:
+        """Take plans of queued slow queries, one at a time."""
+        # Import here to avoid circular import
+        from config.db import explain_query
+
+        while True:
+            fingerprint, query, params, elapsed_ms = self._pending.get()
+            try:
+                plan = explain_query(query, params)
+                plan["elapsed_ms"] = round(elapsed_ms, 3)
+                plan["param_shape"] = param_shape(params)
+                plan["captured_at"] = datetime.now().isoformat(timespec="seconds")
+            except Exception as e:
+                logger.error(f"Error explaining slow query {fingerprint}: {e}")
+                with self._lock:
+                    self._counts["explain_failures"] += 1
+                continue
+
+            with self._lock:
+                self._counts["explained"] += 1
+                stats = self._queries.get(fingerprint)
+                if stats is not None:
+                    stats.plans.appendleft(plan)
+
+# Global slow query log
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,192 @@
+"""
+Server-side prepared statements for hot query templates.
+
+A query run through the registry is prepared once per database connection
+with PREPARE and afterwards executed by name, so Postgres parses and plans it
+once per connection instead of on every request. Queries keep their
+%(name)s placeholders; each distinct query text gets its own server-side
+name, so templates assembled from optional filters prepare one statement per
+variant. Connections are tracked weakly, so connections the pool replaces are
+prepared again when first used. A statement the server no longer knows, for
+example after DISCARD ALL, is prepared again and retried once. The same
+statements run on psycopg2 cursors through execute() and on psycopg 3 client
+cursors of the async pool through execute_async().
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+
+import psycopg
+import psycopg2
+import psycopg2.errors
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s")
+
+class PreparedStatement:
+    """One query text, converted to PREPARE syntax, with its execution counters."""
+
+    def __init__(self, name: str, query: str):
+        """
+        Convert a query with %(name)s placeholders.
+
+        Args:
+            name: Registry name the statement reports under
+            query: Query text
+        """
+        self.name = name
+        self.server_name = f"{name}_{hashlib.md5(query.encode()).hexdigest()[:10]}"
+        self.param_names: List[str] = []
+
+        def number(match):
+            if match.group(1) not in self.param_names:
+                self.param_names.append(match.group(1))
+            return f"${self.param_names.index(match.group(1)) + 1}"
+
+        body = _PLACEHOLDER.sub(number, query).replace("%%", "%")
+        self.prepare_sql = f"PREPARE {self.server_name} AS {body}"
+        arguments = ", ".join(["%s"] * len(self.param_names))
+        self.execute_sql = f"EXECUTE {self.server_name}({arguments})" if self.param_names else f"EXECUTE {self.server_name}"
+        self.calls = 0
+        self.prepares = 0
+        self.total_ms = 0.0
+
+    def values(self, params: Optional[Dict[str, Any]]) -> List[Any]:
+        """Get the EXECUTE arguments for a parameter dict, in placeholder order."""
+        return [(params or {})[param] for param in self.param_names]
+
+class StatementRegistry:
+    """Prepared statements by name and query text, and the connections they are prepared on."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._statements: Dict[tuple, PreparedStatement] = {}
+        self._prepared: "weakref.WeakKeyDictionary[Any, set]" = weakref.WeakKeyDictionary()
+
+    def execute(self, cursor, name: str, query: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Execute a query as a prepared statement on the cursor's connection.
+
+        Args:
+            cursor: psycopg2 cursor; results are fetched from it as usual
+            name: Name of the query template, e.g. "trending"
+            query: Query text with %(name)s placeholders
+            params: Query parameters
+        """
+        statement = self._statement(name, query)
+        values = statement.values(params)
+        conn = cursor.connection
+
+        start_time = time.perf_counter()
+        prepared = self._prepare(cursor, conn, statement)
+        try:
+            cursor.execute(statement.execute_sql, values)
+        except psycopg2.errors.InvalidSqlStatementName:
+            # The server dropped the statement, or the transaction that prepared it rolled back
+            logger.info(f"Re-preparing statement {statement.server_name}")
+            conn.rollback()
+            self._forget(conn, statement)
+            prepared = self._prepare(cursor, conn, statement) or prepared
+            cursor.execute(statement.execute_sql, values)
+        self._record(statement, prepared, start_time)
+
+    async def execute_async(self, cursor, name: str, query: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Execute a query as a prepared statement on an async cursor's connection.
+
+        Args:
+            cursor: psycopg 3 AsyncClientCursor; results are fetched from it as usual
+            name: Name of the query template, e.g. "trending"
+            query: Query text with %(name)s placeholders
+            params: Query parameters
+        """
+        statement = self._statement(name, query)
+        values = statement.values(params)
+        conn = cursor.connection
+
+        start_time = time.perf_counter()
+        prepared = await self._prepare_async(cursor, conn, statement)
+        try:
+            await cursor.execute(statement.execute_sql, values)
+        except psycopg.errors.InvalidSqlStatementName:
+            logger.info(f"Re-preparing statement {statement.server_name}")
+            await conn.rollback()
+            self._forget(conn, statement)
+            prepared = await self._prepare_async(cursor, conn, statement) or prepared
+            await cursor.execute(statement.execute_sql, values)
+        self._record(statement, prepared, start_time)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get execution counts and mean latency per statement name.
+
+        prepares_per_call is the share of executions that had to PREPARE first;
+        it falls toward 0 as pooled connections keep their statements.
+        """
+        by_name: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for statement in self._statements.values():
+                entry = by_name.setdefault(statement.name, {"variants": 0, "calls": 0, "prepares": 0, "total_ms": 0.0})
+                entry["variants"] += 1
+                entry["calls"] += statement.calls
+                entry["prepares"] += statement.prepares
+                entry["total_ms"] += statement.total_ms
+
+        for entry in by_name.values():
+            entry["mean_ms"] = round(entry["total_ms"] / entry["calls"], 3) if entry["calls"] else 0
+            entry["prepares_per_call"] = round(entry["prepares"] / entry["calls"], 3) if entry["calls"] else 0
+            entry["total_ms"] = round(entry["total_ms"], 3)
+        return by_name
+
+    def _statement(self, name: str, query: str) -> PreparedStatement:
+        """Get or create the statement for a query text."""
+        key = (name, query)
+        with self._lock:
+            statement = self._statements.get(key)
+            if statement is None:
+                statement = self._statements[key] = PreparedStatement(name, query)
+            return statement
+
+    def _prepare(self, cursor, conn, statement: PreparedStatement) -> bool:
+        """Prepare a statement on a connection unless it already is. Returns True if it was prepared now."""
+        with self._lock:
+            names = self._prepared.setdefault(conn, set())
+            if statement.server_name in names:
+                return False
+        cursor.execute(statement.prepare_sql)
+        with self._lock:
+            names.add(statement.server_name)
+        return True
+
+    async def _prepare_async(self, cursor, conn, statement: PreparedStatement) -> bool:
+        """Prepare a statement on an async connection unless it already is, like _prepare."""
+        with self._lock:
+            names = self._prepared.setdefault(conn, set())
+            if statement.server_name in names:
+                return False
+        await cursor.execute(statement.prepare_sql)
+        with self._lock:
+            names.add(statement.server_name)
+        return True
+
+    def _record(self, statement: PreparedStatement, prepared: bool, start_time: float) -> None:
+        """Count one execution of a statement."""
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        with self._lock:
+            statement.calls += 1
+            statement.prepares += 1 if prepared else 0
+            statement.total_ms += elapsed_ms
+
+    def _forget(self, conn, statement: PreparedStatement) -> None:
+        """Mark a statement as not prepared on a connection."""
+        with self._lock:
+            self._prepared.get(conn, set()).discard(statement.server_name)
+
+# Global statement registry
+statement_registry = StatementRegistry()
@@ -8,7 +8,9 @@ import numpy as np
 
 from config.db import execute_query, execute_query_single
 from config.config import EMBEDDING_MODEL, EMBEDDING_DIMENSION
-from models.queries_recipe import get_recipe, get_recipes_without_embeddings
+from models.queries_recipe import get_recipe, get_recipes_by_ids, get_recipes_without_embeddings
+from monitoring.metrics import EMBEDDING_ENCODE_LATENCY
+from monitoring.tracing import start_span
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +56,8 @@ class EmbeddingGenerator:
             text_for_embedding = text_for_embedding.strip()
             
             # Generate embedding
-            embedding = self.model.encode(text_for_embedding)
+            with EMBEDDING_ENCODE_LATENCY.time("recipe"), start_span("embedding.encode", {"embedding.source": "recipe"}):
+                embedding = self.model.encode(text_for_embedding)
             
             # Ensure it's a list of floats
             if isinstance(embedding, np.ndarray):
@@ -132,14 +135,12 @@ class EmbeddingGenerator:
             
             logger.info(f"Generating embeddings for {len(recipes)} recipes")
             
+            # Get complete recipe data for the whole batch
+            recipe_details = get_recipes_by_ids([recipe["recipe_id"] for recipe in recipes])
+            
             # Process recipes
-            for recipe in recipes:
-                recipe_id = recipe["recipe_id"]
-                
-                # Get complete recipe data
-                recipe_data = get_recipe(recipe_id)
-                if not recipe_data:
-                    continue
+            for recipe_data in recipe_details:
+                recipe_id = recipe_data["recipe_id"]
                 
                 # Generate embedding
                 embedding = self.generate_recipe_embedding(recipe_data)
@@ -206,7 +207,8 @@ class EmbeddingGenerator:
         """Generate an embedding directly from text."""
         try:
             # Generate embedding
-            embedding = self.model.encode(text)
+            with EMBEDDING_ENCODE_LATENCY.time("text"), start_span("embedding.encode", {"embedding.source": "text"}):
+                embedding = self.model.encode(text)
             
             # Ensure it's a list of floats
             if isinstance(embedding, np.ndarray):
@@ -2,14 +2,16 @@
 API middleware for the meal recommendation service.
 Includes CORS, request timing, and error handling middleware.
 """
-from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import MutableHeaders
+import itertools
 import time
-import json
 import logging
-from typing import Callable
+
+from monitoring.metrics import REQUEST_LATENCY
+from monitoring.tracing import request_span, finish_request_span
 
 logger = logging.getLogger(__name__)
 
@@ -33,53 +35,75 @@ def setup_middleware(app):
     app.add_middleware(GZipMiddleware, minimum_size=1000)
     
     # Add request timing middleware
-    @app.middleware("http")
-    async def add_process_time_header(request: Request, call_next: Callable):
-        start_time = time.time()
+    app.add_middleware(TimingMiddleware)
+
+class TimingMiddleware:
+    """
+    Add X-Process-Time and X-Request-ID headers, log each request and record its latency and root span.
+    
+    Works on the ASGI messages directly and never touches the body, so
+    responses are serialized exactly once, by their response class.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+        self._ids = itertools.count()
+        self._route_paths = {}
+    
+    def _route(self, scope) -> str:
+        """Get the path template of the route that handled a request, e.g. /api/v1/recipes/{recipe_id}."""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            # Unmatched paths share one label so that scanners cannot grow the metrics
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            path = next(
+                (route.path for route in scope["app"].routes if getattr(route, "endpoint", None) is endpoint),
+                "unmatched"
+            )
+            self._route_paths[endpoint] = path
+        return path
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = time.perf_counter()
         
         # Add request ID for tracking
-        request_id = f"req-{int(start_time * 1000)}"
-        request.state.request_id = request_id
+        request_id = f"req-{int(time.time() * 1000)}-{next(self._ids)}"
+        scope.setdefault("state", {})["request_id"] = request_id
+        status = {"code": None}
         
-        # Process the request
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Process-Time"] = str(round((time.perf_counter() - start_time) * 1000, 2))
+                headers["X-Request-ID"] = request_id
+            await send(message)
+        
+        with request_span(scope, request_id) as span:
+            await self._respond(scope, receive, send_with_headers, request_id, start_time, status, span)
+    
+    async def _respond(self, scope, receive, send_with_headers, request_id, start_time, status, span):
+        """Run the app, record the request's latency and turn unhandled errors into a 500 response."""
         try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            
-            # Add timing headers
-            response.headers["X-Process-Time"] = str(round(process_time * 1000, 2))
-            response.headers["X-Request-ID"] = request_id
-            
-            # Add timing to JSON response
-            if (
-                response.headers.get("content-type") == "application/json" 
-                and isinstance(response, JSONResponse)
-            ):
-                content = response.body.decode()
-                try:
-                    data = json.loads(content)
-                    if isinstance(data, dict):
-                        data["execution_time_ms"] = round(process_time * 1000, 2)
-                        data["request_id"] = request_id
-                        response.body = json.dumps(data).encode()
-                except Exception as e:
-                    logger.error(f"Error updating response: {e}")
-            
-            # Log request completion
-            logger.info(
-                f"Request {request_id} completed: {request.method} {request.url.path} "
-                f"- {response.status_code} in {process_time:.3f}s"
-            )
-            
-            return response
-            
+            await self.app(scope, receive, send_with_headers)
         except Exception as e:
             # Log any unhandled exceptions
-            process_time = time.time() - start_time
+            process_time = time.perf_counter() - start_time
             logger.error(
-                f"Request {request_id} error: {request.method} {request.url.path} "
+                f"Request {request_id} error: {scope['method']} {scope['path']} "
                 f"- {str(e)} in {process_time:.3f}s"
             )
+            route = self._route(scope)
+            REQUEST_LATENCY.observe(process_time, scope["method"], route, 500)
+            finish_request_span(span, scope["method"], route, 500)
+            if status["code"] is not None:
+                raise
             
             # Create error response
             error_response = JSONResponse(
@@ -90,4 +114,15 @@ def setup_middleware(app):
                     "execution_time_ms": round(process_time * 1000, 2)
                 }
             )
-            return error_response
\ No newline at end of file
+            await error_response(scope, receive, send_with_headers)
+            return
+        
+        # Log request completion
+        process_time = time.perf_counter() - start_time
+        route = self._route(scope)
+        REQUEST_LATENCY.observe(process_time, scope["method"], route, status["code"])
+        finish_request_span(span, scope["method"], route, status["code"])
+        logger.info(
+            f"Request {request_id} completed: {scope['method']} {scope['path']} "
+            f"- {status['code']} in {process_time:.3f}s"
+        )
@@ -1,7 +1,7 @@
 """
 API endpoints for recipe management.
 """
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
 from typing import Dict, Optional, List, Any
 import time
 import math
@@ -9,12 +9,80 @@ import math
 from models.models import RecipeCreate, RecipeUpdate, RecipeBase, RecipeDetail
 from models.queries_recipe import (
     get_recipe, get_recipes, create_recipe, update_recipe, delete_recipe,
-    filter_recipes_by_calories, search_recipes
+    filter_recipes_by_calories, search_recipes, HYDRATION_FIELDS
 )
+from models.pagination import InvalidCursorError, ID_SORT, next_cursor
 from embedding.embeddings import EmbeddingGenerator
+from indexes.minhash import refresh_recipe_ingredients, remove_recipe_ingredients
+from cache.candidate_pools import candidate_pools
+from indexes.facets import mark_facets_dirty
+from cache.count_cache import count_cache
 
 router = APIRouter(prefix="/api/v1", tags=["recipes"])
 
+def _set_next_cursor(response: Response, recipes: List[Dict[str, Any]], limit: int):
+    """Expose the cursor of the next page of a recipe listing in the X-Next-Cursor header."""
+    cursor = next_cursor(recipes, limit, ID_SORT, key_field="recipe_id")
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+
+@router.get("/recipes/search", response_model=Dict[str, Any])
+def search_recipes_endpoint(
+    query: Optional[str] = None,
+    cuisines: Optional[str] = None,
+    dietary: Optional[str] = None,
+    include_ingredients: Optional[str] = None,
+    exclude_ingredients: Optional[str] = None,
+    min_calories: Optional[float] = None,
+    max_calories: Optional[float] = None,
+    max_prep_time: Optional[int] = None,
+    max_cook_time: Optional[int] = None,
+    max_total_time: Optional[int] = None,
+    sort_by: str = "relevance",
+    sort_order: str = "desc",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated related data to include: ingredients, instructions (default: both, empty for none)"),
+    cursor: Optional[str] = Query(None, description="pagination.next_cursor of the previous page"),
+    count_mode: str = Query("exact", regex="^(exact|estimate|none)$", description="How to count total_items")
+):
+    """
+    Advanced search for recipes with multiple criteria.
+    
+    Declared before /recipes/{recipe_id} so that "search" is not parsed as an ID.
+    """
+    start_time = time.time()
+    
+    # Search recipes
+    try:
+        results = search_recipes(
+            query=query,
+            cuisines=cuisines,
+            dietary=dietary,
+            include_ingredients=include_ingredients,
+            exclude_ingredients=exclude_ingredients,
+            min_calories=min_calories,
+            max_calories=max_calories,
+            max_prep_time=max_prep_time,
+            max_cook_time=max_cook_time,
+            max_total_time=max_total_time,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            limit=limit,
+            offset=offset,
+            fields=HYDRATION_FIELDS if fields is None else [field.strip() for field in fields.split(",")],
+            cursor=cursor,
+            count_mode=count_mode
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Add execution time
+    execution_time = (time.time() - start_time) * 1000
+    results["execution_time_ms"] = round(execution_time, 2)
+    
+    return results
+
 @router.get("/recipes/{recipe_id}", response_model=RecipeDetail)
 def get_recipe_endpoint(recipe_id: int):
     """Get a recipe by ID."""
@@ -26,12 +94,14 @@ def get_recipe_endpoint(recipe_id: int):
 
 @router.get("/recipes", response_model=List[RecipeBase])
 def get_recipes_endpoint(
+    response: Response,
     offset: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     region: Optional[str] = None,
     sub_region: Optional[str] = None,
     min_calories: Optional[int] = None,
-    max_calories: Optional[int] = None
+    max_calories: Optional[int] = None,
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page")
     ):
     """Get a list of recipes with optional filtering."""
     # Prepare filters
@@ -48,7 +118,13 @@ def get_recipes_endpoint(
     if max_calories is not None:
         calories_filter["max_calories"] = max_calories
     
-    recipes = get_recipes(limit=limit, offset=offset, filters=filters, calories_filter=calories_filter)
+    try:
+        recipes = get_recipes(limit=limit, offset=offset, filters=filters, 
+                              calories_filter=calories_filter, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    _set_next_cursor(response, recipes, limit)
     return recipes
 
 @router.post("/recipes", response_model=RecipeDetail, status_code=status.HTTP_201_CREATED)
@@ -62,6 +138,12 @@ def create_recipe_endpoint(recipe: RecipeCreate):
     generator = EmbeddingGenerator()
     generator.update_recipe_embedding(recipe_id)
     
+    # Add the recipe's ingredients to the similarity index
+    refresh_recipe_ingredients(recipe_id)
+    candidate_pools.invalidate()
+    mark_facets_dirty()
+    count_cache.clear()
+    
     return get_recipe(recipe_id)
 
 @router.put("/recipes/{recipe_id}", response_model=RecipeDetail)
@@ -82,6 +164,12 @@ def update_recipe_endpoint(recipe_id: int, recipe: RecipeUpdate):
         generator = EmbeddingGenerator()
         generator.update_recipe_embedding(recipe_id)
     
+    # Keep the ingredient similarity index, browsing pools and facets in sync
+    refresh_recipe_ingredients(recipe_id)
+    candidate_pools.invalidate()
+    mark_facets_dirty()
+    count_cache.clear()
+    
     return get_recipe(recipe_id)
 
 @router.delete("/recipes/{recipe_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -97,61 +185,28 @@ def delete_recipe_endpoint(recipe_id: int):
     if not success:
         raise HTTPException(status_code=500, detail="Failed to delete recipe")
     
+    remove_recipe_ingredients(recipe_id)
+    candidate_pools.invalidate()
+    mark_facets_dirty()
+    count_cache.clear()
+    
     return None
 
 
 @router.get("/recipes/filter/calories", response_model=List[RecipeBase])
 def filter_recipes_by_calories_endpoint(
+    response: Response,
     min: float = Query(0, ge=0),
     max: float = Query(1000, ge=0),
     offset: int = Query(0, ge=0),
-    limit: int = Query(20, ge=1, le=100)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page")
     ):
     """Filter recipes by calorie range."""
-    return filter_recipes_by_calories(min, max, limit, offset)
-
-@router.get("/recipes/search", response_model=Dict[str, Any])
-def search_recipes_endpoint(
-    query: Optional[str] = None,
-    cuisines: Optional[str] = None,
-    dietary: Optional[str] = None,
-    include_ingredients: Optional[str] = None,
-    exclude_ingredients: Optional[str] = None,
-    min_calories: Optional[float] = None,
-    max_calories: Optional[float] = None,
-    max_prep_time: Optional[int] = None,
-    max_cook_time: Optional[int] = None,
-    max_total_time: Optional[int] = None,
-    sort_by: str = "relevance",
-    sort_order: str = "desc",
-    offset: int = Query(0, ge=0),
-    limit: int = Query(20, ge=1, le=100)
-):
-    """
-    Advanced search for recipes with multiple criteria.
-    """
-    start_time = time.time()
-    
-    # Search recipes
-    results = search_recipes(
-        query=query,
-        cuisines=cuisines,
-        dietary=dietary,
-        include_ingredients=include_ingredients,
-        exclude_ingredients=exclude_ingredients,
-        min_calories=min_calories,
-        max_calories=max_calories,
-        max_prep_time=max_prep_time,
-        max_cook_time=max_cook_time,
-        max_total_time=max_total_time,
-        sort_by=sort_by,
-        sort_order=sort_order,
-        limit=limit,
-        offset=offset
-    )
-    
-    # Add execution time
-    execution_time = (time.time() - start_time) * 1000
-    results["execution_time_ms"] = round(execution_time, 2)
+    try:
+        recipes = filter_recipes_by_calories(min, max, limit, offset, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return results
\ No newline at end of file
+    _set_next_cursor(response, recipes, limit)
+    return recipes
@@ -4,18 +4,28 @@ API endpoints for recommendation features.
 import time
 import logging
 from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from typing import Dict, List, Optional, Any
 
-from config.config import DEFAULT_RECOMMENDATION_LIMIT, ALLOWED_TRENDING_WINDOWS
-from models.models import RecommendationResponse, RecommendationItem, InteractionCreate
+from config.config import (
+    DEFAULT_RECOMMENDATION_LIMIT, ALLOWED_TRENDING_WINDOWS,
+    INTERACTION_BATCH_MAX, INTERACTION_FLUSH_INTERVAL
+)
+from models.models import RecommendationResponse, RecommendationItem, InteractionCreate, InteractionBatch
 from recommenders.recommender_factory import get_recommender
-from models.queries_recommend import record_interaction
+from models.queries_recommend import (
+    record_interaction, validate_interaction, validate_interaction_ids, INTERACTION_ID_MAX_LENGTH
+)
+from cache.popularity import get_popularity_tracker
+from cache.interaction_buffer import interaction_buffer
+from cache.recommendation_store import store as precomputed_store
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1", tags=["recommendations"])
 
 @router.get("/recommend/user/{user_id}", response_model=RecommendationResponse)
-def get_user_recommendations(
+async def get_user_recommendations(
     user_id: str,
     content_type: Optional[str] = None,
     limit: int = Query(DEFAULT_RECOMMENDATION_LIMIT, description="Maximum number of items"),
@@ -26,17 +36,24 @@ def get_user_recommendations(
     """Get personalized recommendations for a user."""
     start_time = time.time()
     
-    # Get the appropriate recommender
-    recommender = get_recommender(recommendation_type)
-    
-    # Get recommendations
-    recommended_items = recommender.get_recommendations(
-        user_id=user_id,
-        content_type=content_type,
-        limit=limit,
-        cuisine=cuisine,
-        dietary_restriction=dietary_restriction
-    )
+    # Serve the precomputed hybrid list when it is fresh; it is built without filters
+    recommended_items = None
+    if recommendation_type == "hybrid" and not (content_type or cuisine or dietary_restriction):
+        recommended_items = await precomputed_store.get_async(user_id, limit)
+    
+    if recommended_items is None:
+        # Get the appropriate recommender
+        recommender = get_recommender(recommendation_type)
+        
+        # Online recommenders combine several queries and in-memory models, so run them off the event loop
+        recommended_items = await run_in_threadpool(
+            recommender.get_recommendations,
+            user_id=user_id,
+            content_type=content_type,
+            limit=limit,
+            cuisine=cuisine,
+            dietary_restriction=dietary_restriction
+        )
     
     # Format the items
     items = []
@@ -104,6 +121,11 @@ def create_interaction_endpoint(interaction: InteractionCreate):
             status_code=400,
             detail="Missing recipe_id parameter"
         )
+    if not validate_interaction_ids(interaction.user_id, recipe_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"user_id and meal_id must be at most {INTERACTION_ID_MAX_LENGTH} characters without NUL"
+        )
     
     success = record_interaction(
         user_id=interaction.user_id,
@@ -112,6 +134,13 @@ def create_interaction_endpoint(interaction: InteractionCreate):
         rating=interaction.rating if interaction.interaction_type == 'rating' else None
     )
     
+    if success:
+        get_popularity_tracker().record_interaction(
+            recipe_id,
+            interaction.interaction_type,
+            interaction.rating
+        )
+    
     execution_time = (time.time() - start_time) * 1000
     
     if success:
@@ -125,10 +154,64 @@ def create_interaction_endpoint(interaction: InteractionCreate):
             detail="Failed to record interaction"
         )
 
+@router.post("/interactions/batch", status_code=202)
+def create_interactions_batch_endpoint(batch: InteractionBatch):
+    """
+    Queue a batch of user interactions for recording.
+    
+    Interactions are written asynchronously within a second or so. Invalid
+    entries are skipped and reported by index. Responds with 429 and a
+    Retry-After header when the write buffer is full.
+    """
+    start_time = time.time()
+    
+    if len(batch.interactions) > INTERACTION_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {INTERACTION_BATCH_MAX} interactions can be sent per batch"
+        )
+    
+    accepted = []
+    rejected = []
+    for index, interaction in enumerate(batch.interactions):
+        rating = interaction.rating if interaction.interaction_type == 'rating' else None
+        # Entries the database would reject must not reach the buffer, where they would fail whole flushes
+        if (not validate_interaction_ids(interaction.user_id, interaction.meal_id)
+                or not validate_interaction(interaction.interaction_type, rating)):
+            rejected.append(index)
+            continue
+        accepted.append({
+            "user_id": interaction.user_id,
+            "recipe_id": interaction.meal_id,
+            "interaction_type": interaction.interaction_type,
+            "rating": rating
+        })
+    
+    if accepted and not interaction_buffer.offer(accepted):
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Interaction buffer is full, retry later"},
+            headers={"Retry-After": str(max(1, round(INTERACTION_FLUSH_INTERVAL)))}
+        )
+    
+    tracker = get_popularity_tracker()
+    for item in accepted:
+        tracker.record_interaction(item["recipe_id"], item["interaction_type"], item["rating"])
+    
+    execution_time = (time.time() - start_time) * 1000
+    
+    return {
+        "status": "accepted",
+        "accepted": len(accepted),
+        "rejected": rejected,
+        "execution_time_ms": round(execution_time, 2)
+    }
+
 @router.get("/recommend/cuisine/{cuisine_id}", response_model=RecommendationResponse)
 def get_cuisine_recommendations_endpoint(
     cuisine_id: str,
-    limit: int = Query(DEFAULT_RECOMMENDATION_LIMIT, description="Maximum number of items")
+    limit: int = Query(DEFAULT_RECOMMENDATION_LIMIT, description="Maximum number of items"),
+    weighted: bool = Query(False, description="Favour popular recipes when sampling")
 ):
     """Get recipe recommendations for a specific cuisine or region."""
     start_time = time.time()
@@ -138,7 +221,8 @@ def get_cuisine_recommendations_endpoint(
     
     cuisine_items = recommender.get_cuisine_recommendations(
         cuisine_name=cuisine_id, 
-        limit=limit
+        limit=limit,
+        weighted=weighted
     )
     
     # Format the items
@@ -162,7 +246,8 @@ def get_cuisine_recommendations_endpoint(
 @router.get("/recommend/dietary/{dietary_restriction}", response_model=RecommendationResponse)
 def get_dietary_recommendations_endpoint(
     dietary_restriction: str,
-    limit: int = Query(DEFAULT_RECOMMENDATION_LIMIT, description="Maximum number of items")
+    limit: int = Query(DEFAULT_RECOMMENDATION_LIMIT, description="Maximum number of items"),
+    weighted: bool = Query(False, description="Favour popular recipes when sampling")
 ):
     """Get recipe recommendations based on dietary restrictions."""
     start_time = time.time()
@@ -172,7 +257,8 @@ def get_dietary_recommendations_endpoint(
     
     dietary_items = recommender.get_dietary_recommendations(
         dietary_restriction=dietary_restriction,
-        limit=limit
+        limit=limit,
+        weighted=weighted
     )
     
     # Format the items
@@ -232,7 +318,7 @@ def get_quick_recipes(
     )
 
 @router.get("/trending", response_model=RecommendationResponse)
-def get_trending_content(
+async def get_trending_content(
     time_window: str = Query("day", description="Time window for trending items"),
     limit: int = Query(DEFAULT_RECOMMENDATION_LIMIT, description="Maximum number of items"),
     cuisine: Optional[str] = None,
@@ -250,7 +336,7 @@ def get_trending_content(
     # Get popularity-based recommender
     recommender = get_recommender("popularity")
     
-    trending_items = recommender.get_trending_recommendations(
+    trending_items = await recommender.get_trending_recommendations_async(
         time_window=time_window,
         limit=limit,
         cuisine=cuisine,
@@ -4,21 +4,24 @@ API endpoints for vector-based recipe search.
 import time
 import logging
 from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, List, Optional, Any
 
 from models.models import RecipeDetail, RecipeBase
 from models.queries_search import (
-    search_by_text_embedding, 
+    search_by_text_embedding_async,
     find_similar_content,
-    get_similar_by_ingredients
+    hybrid_search
 )
+from models.queries_recipe import HYDRATION_FIELDS
+from indexes.minhash import find_similar_by_ingredients
 from embedding.embeddings import EmbeddingGenerator
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1", tags=["search"])
 
 @router.get("/search/vector")
-def vector_search_endpoint(
+async def vector_search_endpoint(
     query: str,
     limit: int = Query(20, ge=1, le=100),
     cuisine: Optional[str] = None,
@@ -62,7 +65,7 @@ def vector_search_endpoint(
             filters["calories"]["max"] = max_calories
     
     # Perform vector search
-    results = search_by_text_embedding(
+    results = await search_by_text_embedding_async(
         query_text=query,
         limit=limit,
         filters=filters
@@ -79,6 +82,77 @@ def vector_search_endpoint(
         "execution_time_ms": round(execution_time * 1000, 2)
     }
 
+@router.get("/search/hybrid")
+async def hybrid_search_endpoint(
+    query: str,
+    limit: int = Query(20, ge=1, le=100),
+    cuisine: Optional[str] = None,
+    dietary: Optional[str] = None,
+    max_time: Optional[int] = None,
+    min_calories: Optional[float] = None,
+    max_calories: Optional[float] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated related data to include: ingredients, instructions")
+):
+    """
+    Search recipes by text relevance and embedding similarity in one request.
+    
+    Args:
+        query: Search query text
+        limit: Maximum number of results
+        cuisine: Optional cuisine filter
+        dietary: Optional dietary restriction
+        max_time: Maximum recipe time in minutes
+        min_calories: Minimum calories
+        max_calories: Maximum calories
+        fields: Related data to include; all of it if omitted
+        
+    Returns:
+        Recipes ranked by reciprocal-rank fusion of both retrievals
+    """
+    start_time = time.time()
+    
+    # Prepare filters
+    filters = {}
+    if cuisine:
+        filters["cuisine"] = cuisine
+    if dietary:
+        filters["dietary"] = dietary
+    if max_time:
+        filters["max_time"] = max_time
+    
+    # Add calorie filters
+    if min_calories is not None or max_calories is not None:
+        filters["calories"] = {}
+        if min_calories is not None:
+            filters["calories"]["min"] = min_calories
+        if max_calories is not None:
+            filters["calories"]["max"] = max_calories
+    
+    selected_fields = HYDRATION_FIELDS if fields is None else [
+        field.strip() for field in fields.split(",") if field.strip() in HYDRATION_FIELDS
+    ]
+    
+    # The retrievals already run side by side on the search executor
+    search = await run_in_threadpool(
+        hybrid_search,
+        query_text=query,
+        limit=limit,
+        filters=filters,
+        fields=selected_fields
+    )
+    
+    # Calculate execution time
+    execution_time = time.time() - start_time
+    
+    return {
+        "query": query,
+        "results": search["results"],
+        "count": len(search["results"]),
+        "candidates": search["candidates"],
+        "filters": filters,
+        "execution_time_ms": round(execution_time * 1000, 2)
+    }
+
 @router.get("/search/similar/{recipe_id}")
 def similar_recipes_endpoint(
     recipe_id: int,
@@ -100,7 +174,7 @@ def similar_recipes_endpoint(
     
     if method == "ingredients":
         # Use ingredient-based similarity
-        similar_recipes = get_similar_by_ingredients(recipe_id, limit)
+        similar_recipes = find_similar_by_ingredients(recipe_id, limit)
     else:
         # Use embedding-based similarity
         # Get recipe embedding
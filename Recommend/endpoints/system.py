@@ -2,12 +2,31 @@
 API endpoints for system management and monitoring.
 """
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
 from typing import Dict, Any
 
 from embedding.embeddings import EmbeddingGenerator
 from models.models import HealthResponse
+from cache.recommendation_store import store as precomputed_store
+from cache.recipe_cache import recipe_cache
+from cache.interaction_buffer import interaction_buffer
+from cache.user_history import user_history_cache
+from config import db
+from config.statements import statement_registry
+from config.slow_queries import slow_query_log
+from config.config import PROFILER_ENABLED, PROFILER_MAX_SECONDS, PROFILER_INTERVAL_MS
+from monitoring.metrics import registry as metrics_registry
+from monitoring.profiler import stack_sampler, ProfilerBusyError
+import monitoring.collectors  # registers the pool and cache collectors
 
 router = APIRouter(prefix="/api/v1", tags=["system"])
+# Served at the root, where Prometheus scrapes by default
+metrics_router = APIRouter(tags=["system"])
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Get latency histograms, pool and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 @router.get("/embeddings/stats")
 def get_embedding_stats():
@@ -26,4 +45,76 @@ def generate_embeddings(batch_size: int = 50):
         "success": True,
         "generated_embeddings": count,
         "message": f"Successfully generated {count} embeddings"
-    }
\ No newline at end of file
+    }
+
+@router.get("/recommendations/precomputed/stats")
+def get_precomputed_recommendation_stats():
+    """Get hit-rate statistics for precomputed recommendation lists."""
+    return precomputed_store.stats()
+
+@router.get("/recipes/cache/stats")
+def get_recipe_cache_stats():
+    """Get size and hit-rate statistics for the recipe detail cache."""
+    return recipe_cache.stats()
+
+@router.get("/interactions/buffer/stats")
+def get_interaction_buffer_stats():
+    """Get occupancy and events-per-second throughput of the interaction write buffer."""
+    return interaction_buffer.stats()
+
+@router.get("/users/history/cache/stats")
+def get_user_history_cache_stats():
+    """Get size, eviction and hit-rate statistics for the per-user recent history cache."""
+    return user_history_cache.stats()
+
+@router.get("/db/pool/stats")
+def get_db_pool_stats():
+    """Get in-use, idle and waiting connection counts and acquisition wait times of the database pool."""
+    if db.pool is None:
+        raise HTTPException(status_code=503, detail="Connection pool not initialized")
+    return db.pool.stats()
+
+@router.get("/db/replica/stats")
+def get_db_replica_stats():
+    """Get read routing counts, replica lag and replica pool statistics."""
+    stats = db.replica_router.stats()
+    stats["pool"] = db.replica_pool.stats() if db.replica_pool is not None else None
+    return stats
+
+@router.get("/db/statements/stats")
+def get_prepared_statement_stats():
+    """Get execution counts and mean latency of the prepared query templates."""
+    return statement_registry.stats()
+
+@router.get("/db/queries/stats")
+def get_query_stats(limit: int = 50, slow_only: bool = False):
+    """Get call counts and total, mean and maximum time per query fingerprint, most total time first."""
+    return slow_query_log.stats(limit=limit, slow_only=slow_only)
+
+@router.get("/db/queries/{fingerprint}")
+def get_query_plans(fingerprint: str):
+    """Get a query fingerprint with the parameter shapes of its slow calls and its sampled plans."""
+    query = slow_query_log.get(fingerprint)
+    if query is None:
+        raise HTTPException(status_code=404, detail="Query fingerprint not found")
+    return query
+
+@router.get("/debug/profile")
+def get_profile(seconds: float = 10, interval_ms: float = PROFILER_INTERVAL_MS,
+                format: str = "collapsed", include_idle: bool = False):
+    """Sample the stacks of every thread in this worker for a while and return them for a flamegraph."""
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiler is disabled; set PROFILER_ENABLED to enable it")
+    if format not in ("collapsed", "json"):
+        raise HTTPException(status_code=400, detail="Format must be 'collapsed' or 'json'")
+    if seconds <= 0 or interval_ms < 1:
+        raise HTTPException(status_code=400, detail="Seconds must be positive and interval_ms at least 1")
+
+    try:
+        profile = stack_sampler.profile(min(seconds, PROFILER_MAX_SECONDS), interval_ms, include_idle)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if format == "json":
+        return profile.summary()
+    return PlainTextResponse(profile.collapsed())
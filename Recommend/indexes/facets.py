@@ -0,0 +1,343 @@
+"""
+In-memory facet index for recipe filters.
+
+Recipes are assigned dense positions in recipe_id order. Each cuisine value and
+diet attribute is held as a packed bitmap over those positions, and numeric fields
+(time, calories) as arrays sorted by value, so any combination of filters resolves
+to a candidate bitmap with a few vectorized AND/OR operations. Candidates can then
+be intersected with vector or popularity results before any recipe rows are read.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config.config import FACET_INDEX_TTL, FACET_INLINE_LIMIT
+from config.db import statement_timeout
+from models.queries_recipe import get_recipe_facet_rows
+
+logger = logging.getLogger(__name__)
+
+# Numeric fields indexed as sorted arrays
+RANGE_FIELDS = ("effective_time", "total_time", "prep_time", "cook_time", "calories")
+
+# Number of set bits in each byte value
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+class FacetIndex:
+    """Packed bitmaps and sorted arrays over recipe filter attributes."""
+
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        """
+        Build the index from recipe facet rows.
+
+        Args:
+            rows: Rows from get_recipe_facet_rows; a recipe may appear more than
+                once if it has several diet attribute rows
+        """
+        recipes: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            recipe_id = int(row["recipe_id"])
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                recipe = recipes[recipe_id] = dict(row, diets=set())
+            recipe["diets"].update(row["diets"] or [])
+
+        self.ids = np.array(sorted(recipes), dtype=np.int64)
+        self.size = len(self.ids)
+        self.built_at = time.time()
+
+        cuisine_positions: Dict[str, List[int]] = {}
+        diet_positions: Dict[str, List[int]] = {}
+        values = {field: np.full(self.size, np.nan) for field in RANGE_FIELDS}
+
+        for position, recipe_id in enumerate(self.ids.tolist()):
+            recipe = recipes[recipe_id]
+            for cuisine in {recipe["region"], recipe["sub_region"]}:
+                if cuisine:
+                    cuisine_positions.setdefault(cuisine, []).append(position)
+            for diet in recipe["diets"]:
+                diet_positions.setdefault(diet, []).append(position)
+            for field in RANGE_FIELDS:
+                if recipe[field] is not None:
+                    values[field][position] = float(recipe[field])
+
+        self._cuisines = {key: self._from_positions(positions) for key, positions in cuisine_positions.items()}
+        self._diets = {key: self._from_positions(positions) for key, positions in diet_positions.items()}
+
+        # Per field: values sorted ascending, the positions in that order, and missing values
+        self._ranges = {}
+        for field, field_values in values.items():
+            present = np.flatnonzero(~np.isnan(field_values))
+            order = present[np.argsort(field_values[present], kind="stable")]
+            self._ranges[field] = (field_values[order], order, self._from_mask(np.isnan(field_values)))
+
+    def all(self) -> np.ndarray:
+        """Get a bitmap with every recipe set."""
+        return self._from_mask(np.ones(self.size, dtype=bool))
+
+    def cuisine(self, names: Iterable[str], partial: bool = False) -> np.ndarray:
+        """
+        Get recipes whose region or sub-region matches any of the names.
+
+        Args:
+            names: Cuisine or region names
+            partial: Match case-insensitive substrings (like ILIKE '%name%')
+                instead of exact values
+        """
+        names = [name for name in names if name]
+        if partial:
+            lowered = [name.lower() for name in names]
+            keys = [key for key in self._cuisines if any(name in key.lower() for name in lowered)]
+        else:
+            keys = [name for name in names if name in self._cuisines]
+        return self._union(self._cuisines[key] for key in keys)
+
+    def diet(self, columns: Iterable[str]) -> np.ndarray:
+        """Get recipes with any of the given recipe_diet_attributes columns set."""
+        return self._union(self._diets[column] for column in columns if column in self._diets)
+
+    def range(self, field: str, low: Optional[float] = None, high: Optional[float] = None,
+              include_missing: bool = False) -> np.ndarray:
+        """
+        Get recipes whose field lies within [low, high].
+
+        Args:
+            field: One of RANGE_FIELDS
+            low: Inclusive lower bound, unbounded if None
+            high: Inclusive upper bound, unbounded if None
+            include_missing: Whether recipes with no value match
+        """
+        sorted_values, order, missing = self._ranges[field]
+        start = np.searchsorted(sorted_values, low, side="left") if low is not None else 0
+        end = np.searchsorted(sorted_values, high, side="right") if high is not None else len(order)
+
+        mask = np.zeros(self.size, dtype=bool)
+        mask[order[start:end]] = True
+        bitmap = self._from_mask(mask)
+        return np.bitwise_or(bitmap, missing) if include_missing else bitmap
+
+    def match(self, cuisines: Optional[List[str]] = None, partial_cuisine: bool = False,
+              diets: Optional[List[str]] = None, max_time: Optional[float] = None,
+              min_calories: Optional[float] = None, max_calories: Optional[float] = None,
+              max_prep_time: Optional[float] = None, max_cook_time: Optional[float] = None,
+              max_total_time: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Resolve a combination of filters to a candidate bitmap.
+
+        Cuisines and diets each match any of their values; all filters given must
+        match. max_time applies to the total time, falling back to prep plus cook
+        time, and excludes recipes without one; the individual prep, cook and total
+        time limits let recipes without a value through.
+
+        Returns:
+            Candidate bitmap, or None if no filters were given
+        """
+        bitmaps = []
+        if cuisines:
+            bitmaps.append(self.cuisine(cuisines, partial_cuisine))
+        if diets:
+            bitmaps.append(self.diet(diets))
+        if max_time is not None:
+            bitmaps.append(self.range("effective_time", high=max_time))
+        if min_calories is not None or max_calories is not None:
+            bitmaps.append(self.range("calories", min_calories, max_calories))
+        if max_prep_time is not None:
+            bitmaps.append(self.range("prep_time", high=max_prep_time, include_missing=True))
+        if max_cook_time is not None:
+            bitmaps.append(self.range("cook_time", high=max_cook_time, include_missing=True))
+        if max_total_time is not None:
+            bitmaps.append(self.range("total_time", high=max_total_time, include_missing=True))
+
+        if not bitmaps:
+            return None
+
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            result = np.bitwise_and(result, bitmap)
+        return result
+
+    def to_ids(self, bitmap: np.ndarray) -> np.ndarray:
+        """Get the recipe IDs set in a bitmap, in ascending order."""
+        return self.ids[np.flatnonzero(np.unpackbits(bitmap, count=self.size))]
+
+    def count(self, bitmap: np.ndarray) -> int:
+        """Count the recipes set in a bitmap."""
+        return int(POPCOUNT[bitmap].sum())
+
+    def contains(self, bitmap: np.ndarray, recipe_ids: Iterable[int]) -> List[int]:
+        """
+        Keep the recipe IDs that are set in a bitmap, preserving their order.
+
+        Args:
+            bitmap: Candidate bitmap
+            recipe_ids: Recipe IDs to test, e.g. vector or popularity candidates
+
+        Returns:
+            The recipe IDs that match
+        """
+        recipe_ids = [int(recipe_id) for recipe_id in recipe_ids]
+        if not recipe_ids or not self.size:
+            return []
+
+        query = np.array(recipe_ids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.ids, query), self.size - 1)
+        known = self.ids[positions] == query
+        # np.packbits stores the first position in the most significant bit
+        bits = (bitmap[positions >> 3] >> (7 - (positions & 7))) & 1
+        keep = known & (bits == 1)
+        return [recipe_id for recipe_id, matched in zip(recipe_ids, keep.tolist()) if matched]
+
+    def first_by(self, field: str, bitmap: np.ndarray, limit: int) -> List[int]:
+        """
+        Get the recipes in a bitmap with the smallest values of a field.
+
+        Recipes without a value are never returned.
+
+        Args:
+            field: One of RANGE_FIELDS
+            bitmap: Candidate bitmap
+            limit: Maximum number of recipes
+
+        Returns:
+            Recipe IDs ordered by the field ascending
+        """
+        _, order, _ = self._ranges[field]
+        selected = np.unpackbits(bitmap, count=self.size).astype(bool)
+        return self.ids[order[selected[order]][:limit]].tolist()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index size statistics."""
+        bitmap_bytes = sum(bitmap.nbytes for bitmap in self._cuisines.values())
+        bitmap_bytes += sum(bitmap.nbytes for bitmap in self._diets.values())
+        return {
+            "recipes": self.size,
+            "cuisines": len(self._cuisines),
+            "diets": sorted(self._diets),
+            "bitmap_bytes": bitmap_bytes,
+            "age_seconds": round(time.time() - self.built_at, 1)
+        }
+
+    def _from_positions(self, positions: List[int]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[positions] = True
+        return self._from_mask(mask)
+
+    def _from_mask(self, mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask)
+
+    def _union(self, bitmaps: Iterable[np.ndarray]) -> np.ndarray:
+        result = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        for bitmap in bitmaps:
+            result = np.bitwise_or(result, bitmap)
+        return result
+
+# Global facet index, built in the background on startup and rebuilt when stale
+facet_index = None
+_dirty = False
+_building = False
+_build_lock = threading.Lock()
+# No build starts before this time; pushed back after a failed build
+_next_build_at = 0.0
+
+# Seconds before a failed build is retried
+BUILD_RETRY_SECONDS = 30
+
+def build_facet_index() -> Optional[FacetIndex]:
+    """
+    Build a new index from the recipes table and make it the global index.
+
+    If the recipes cannot be read, or none are found, the current index is
+    kept, which is None before the first build so that callers filter in SQL,
+    and the build is retried after BUILD_RETRY_SECONDS.
+
+    Returns:
+        The new index, or None if the build failed
+    """
+    global facet_index, _dirty, _next_build_at
+    start_time = time.time()
+    _dirty = False
+    # Reads every recipe, which may take longer than a request query is allowed to
+    with statement_timeout(0):
+        rows = get_recipe_facet_rows()
+    if not rows:
+        # An empty index would make every filtered search match nothing
+        _next_build_at = time.time() + BUILD_RETRY_SECONDS
+        logger.warning(f"Facet index not rebuilt ({'no recipes found' if rows is not None else 'query failed'}), "
+                       f"retrying in {BUILD_RETRY_SECONDS}s")
+        return None
+
+    index = FacetIndex(rows)
+    facet_index = index
+    logger.info(f"Built facet index for {len(index)} recipes in {time.time() - start_time:.3f}s")
+    return index
+
+def start_facet_index_build():
+    """Build the facet index in a background thread unless a build is running."""
+    global _building
+    with _build_lock:
+        if _building:
+            return
+        _building = True
+
+    def build():
+        global _building, _next_build_at
+        try:
+            build_facet_index()
+        except Exception as e:
+            _next_build_at = time.time() + BUILD_RETRY_SECONDS
+            logger.error(f"Error building facet index: {e}")
+        finally:
+            with _build_lock:
+                _building = False
+
+    threading.Thread(target=build, daemon=True).start()
+
+def mark_facets_dirty():
+    """Schedule a rebuild after recipes are created, updated or deleted."""
+    global _dirty
+    _dirty = True
+
+def get_facet_index() -> Optional[FacetIndex]:
+    """
+    Get the current facet index, starting a background rebuild if it is stale.
+
+    The previous index keeps serving until the rebuild finishes, and also if
+    it fails. Without an index, a build is started here as well, so a failed
+    first build is retried.
+
+    Returns:
+        The facet index, or None if it has not been built yet
+    """
+    index = facet_index
+    now = time.time()
+    stale = index is None or _dirty or now - index.built_at > FACET_INDEX_TTL
+    if stale and now >= _next_build_at:
+        start_facet_index_build()
+    return index
+
+def inline_candidate_ids(**filters) -> Optional[List[int]]:
+    """
+    Resolve filters to a list of recipe IDs small enough to pass to SQL.
+
+    Args:
+        filters: Keyword arguments for FacetIndex.match
+
+    Returns:
+        Matching recipe IDs, or None if the caller should apply the filters in SQL
+        (no index yet, no filters, or more than FACET_INLINE_LIMIT matches)
+    """
+    index = get_facet_index()
+    if index is None:
+        return None
+
+    bitmap = index.match(**filters)
+    if bitmap is None or index.count(bitmap) > FACET_INLINE_LIMIT:
+        return None
+
+    return index.to_ids(bitmap).tolist()
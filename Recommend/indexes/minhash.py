@@ -0,0 +1,254 @@
+"""
+MinHash signatures with an LSH bucket index for ingredient-based recipe similarity.
+
+Each recipe's ingredient set is summarized by a MinHash signature. The signature is
+split into bands, and recipes sharing any band land in the same bucket, so likely
+neighbours are found by a handful of dict lookups instead of a scan over
+recipe_ingredients. Candidates are then ranked by exact Jaccard similarity on the
+ingredient sets held in memory.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config.config import MINHASH_NUM_PERM, MINHASH_BANDS, MIN_COMMON_ITEMS
+from config.db import statement_timeout
+from models.queries_search import get_recipe_ingredient_sets, get_similar_by_ingredients
+from models.queries_recommend import get_recipe_titles
+
+logger = logging.getLogger(__name__)
+
+# Hash functions are h(x) = (a * x + b) mod p; ingredient IDs and a stay below 2^31
+# so a * x never overflows int64
+MERSENNE_PRIME = (1 << 31) - 1
+
+class MinHashLSHIndex:
+    """In-memory MinHash/LSH index over recipe ingredient sets."""
+
+    def __init__(self, num_perm: int = MINHASH_NUM_PERM, bands: int = MINHASH_BANDS, seed: int = 1):
+        """
+        Initialize an empty index.
+
+        Args:
+            num_perm: Number of hash functions in a signature
+            bands: Number of LSH bands; must divide num_perm
+            seed: Seed for the hash function coefficients
+        """
+        if num_perm % bands != 0:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, MERSENNE_PRIME, size=num_perm).astype(np.int64)
+        self._b = rng.randint(0, MERSENNE_PRIME, size=num_perm).astype(np.int64)
+
+        self._lock = threading.RLock()
+        self._sets: Dict[int, frozenset] = {}
+        self._band_keys: Dict[int, List[bytes]] = {}
+        self._buckets: List[Dict[bytes, Set[int]]] = [{} for _ in range(bands)]
+
+    def signature(self, ingredient_ids: Iterable[int]) -> np.ndarray:
+        """Compute the MinHash signature of an ingredient set."""
+        ids = np.fromiter(ingredient_ids, dtype=np.int64)
+        hashes = (np.outer(ids, self._a) + self._b) % MERSENNE_PRIME
+        return hashes.min(axis=0).astype(np.uint32)
+
+    def add(self, recipe_id: int, ingredient_ids: Iterable[int]) -> None:
+        """Add or replace a recipe's ingredient set."""
+        ingredient_set = frozenset(int(ingredient_id) for ingredient_id in ingredient_ids)
+
+        with self._lock:
+            self.remove(recipe_id)
+            if not ingredient_set:
+                return
+
+            band_keys = self._band_keys_for(ingredient_set)
+            for band, key in enumerate(band_keys):
+                self._buckets[band].setdefault(key, set()).add(recipe_id)
+
+            self._sets[recipe_id] = ingredient_set
+            self._band_keys[recipe_id] = band_keys
+
+    def remove(self, recipe_id: int) -> None:
+        """Remove a recipe from the index if present."""
+        with self._lock:
+            band_keys = self._band_keys.pop(recipe_id, None)
+            self._sets.pop(recipe_id, None)
+            if not band_keys:
+                return
+
+            for band, key in enumerate(band_keys):
+                bucket = self._buckets[band].get(key)
+                if bucket is not None:
+                    bucket.discard(recipe_id)
+                    if not bucket:
+                        del self._buckets[band][key]
+
+    def query(self, recipe_id: int, limit: int = 10,
+              min_common: int = MIN_COMMON_ITEMS) -> Optional[List[Tuple[int, float, int]]]:
+        """
+        Find the recipes whose ingredients are most similar to a recipe in the index.
+
+        Args:
+            recipe_id: ID of the reference recipe
+            limit: Maximum number of results
+            min_common: Minimum number of shared ingredients
+
+        Returns:
+            List of (recipe_id, jaccard, common_ingredients), most similar first,
+            or None if the recipe is not in the index
+        """
+        with self._lock:
+            ingredient_set = self._sets.get(recipe_id)
+            if ingredient_set is None:
+                return None
+
+            candidates = set()
+            for band, key in enumerate(self._band_keys[recipe_id]):
+                candidates.update(self._buckets[band].get(key, ()))
+            candidates.discard(recipe_id)
+
+            return self._rank(ingredient_set, candidates, limit, min_common)
+
+    def query_set(self, ingredient_ids: Iterable[int], limit: int = 10,
+                  min_common: int = MIN_COMMON_ITEMS) -> List[Tuple[int, float, int]]:
+        """Find the recipes most similar to an arbitrary ingredient set."""
+        ingredient_set = frozenset(int(ingredient_id) for ingredient_id in ingredient_ids)
+        if not ingredient_set:
+            return []
+
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys_for(ingredient_set)):
+                candidates.update(self._buckets[band].get(key, ()))
+
+            return self._rank(ingredient_set, candidates, limit, min_common)
+
+    def ingredient_count(self, recipe_id: int) -> int:
+        """Get the number of distinct ingredients indexed for a recipe."""
+        return len(self._sets.get(recipe_id, ()))
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+    def __contains__(self, recipe_id: int) -> bool:
+        return recipe_id in self._sets
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index size statistics."""
+        with self._lock:
+            bucket_sizes = [len(bucket) for buckets in self._buckets for bucket in buckets.values()]
+            return {
+                "recipes": len(self._sets),
+                "num_perm": self.num_perm,
+                "bands": self.bands,
+                "buckets": len(bucket_sizes),
+                "max_bucket_size": max(bucket_sizes) if bucket_sizes else 0
+            }
+
+    def _band_keys_for(self, ingredient_set: frozenset) -> List[bytes]:
+        signature = self.signature(ingredient_set)
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def _rank(self, ingredient_set: frozenset, candidates: Set[int], limit: int,
+              min_common: int) -> List[Tuple[int, float, int]]:
+        """Rank candidates by exact Jaccard similarity. Caller must hold the lock."""
+        scored = []
+        for candidate_id in candidates:
+            candidate_set = self._sets[candidate_id]
+            common = len(ingredient_set & candidate_set)
+            if common < min_common:
+                continue
+            jaccard = common / (len(ingredient_set) + len(candidate_set) - common)
+            scored.append((candidate_id, jaccard, common))
+
+        scored.sort(key=lambda item: (item[1], item[2]), reverse=True)
+        return scored[:limit]
+
+# Global ingredient index, built in the background on startup
+ingredient_index = None
+_build_lock = threading.Lock()
+
+def build_ingredient_index() -> MinHashLSHIndex:
+    """Build a new index from recipe_ingredients and make it the global index."""
+    global ingredient_index
+    with _build_lock:
+        start_time = time.time()
+        index = MinHashLSHIndex()
+        with statement_timeout(0):
+            rows = get_recipe_ingredient_sets()
+        for row in rows:
+            index.add(row["recipe_id"], row["ingredient_ids"])
+
+        ingredient_index = index
+        logger.info(f"Built ingredient MinHash index for {len(index)} recipes in {time.time() - start_time:.3f}s")
+        return index
+
+def start_ingredient_index_build():
+    """Build the ingredient index in a background thread."""
+    def build():
+        try:
+            build_ingredient_index()
+        except Exception as e:
+            logger.error(f"Error building ingredient index: {e}")
+
+    threading.Thread(target=build, daemon=True).start()
+
+def refresh_recipe_ingredients(recipe_id: int) -> None:
+    """Re-read one recipe's ingredients into the index after it is created or updated."""
+    if ingredient_index is None:
+        return
+
+    rows = get_recipe_ingredient_sets([recipe_id])
+    ingredient_index.add(recipe_id, rows[0]["ingredient_ids"] if rows else [])
+
+def remove_recipe_ingredients(recipe_id: int) -> None:
+    """Drop a deleted recipe from the index."""
+    if ingredient_index is not None:
+        ingredient_index.remove(recipe_id)
+
+def find_similar_by_ingredients(recipe_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Find recipes with similar ingredients, using the index when it is available.
+
+    Falls back to the exact SQL query while the index is being built or if the
+    recipe is not indexed yet.
+
+    Args:
+        recipe_id: ID of the reference recipe
+        limit: Maximum number of results
+
+    Returns:
+        List of recipes with id, title, common_ingredients, total_ingredients and
+        Jaccard similarity score
+    """
+    index = ingredient_index
+    neighbours = index.query(recipe_id, limit) if index is not None else None
+    if neighbours is None:
+        return get_similar_by_ingredients(recipe_id, limit)
+
+    titles = {
+        int(item["id"]): item["title"]
+        for item in get_recipe_titles([neighbour_id for neighbour_id, _, _ in neighbours])
+    }
+
+    return [
+        {
+            "id": neighbour_id,
+            "title": titles[neighbour_id],
+            "common_ingredients": common,
+            "total_ingredients": index.ingredient_count(neighbour_id),
+            "score": round(jaccard, 4)
+        }
+        for neighbour_id, jaccard, common in neighbours
+        if neighbour_id in titles
+    ]
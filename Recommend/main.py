@@ -5,18 +5,27 @@ Sets up FastAPI app, routes, middleware, and database connection.
 import uvicorn
 import logging
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, RedirectResponse
+from psycopg_pool import PoolTimeout
 import time
 
 from config.config import API_HOST, API_PORT, RELOAD, LOG_LEVEL, LOG_FORMAT
-from config.db import check_connection, initialize_pool
+from config.db import check_connection, initialize_pool, start_replica_monitor, PoolTimeoutError
+from config.async_db import initialize_async_pool, close_async_pool
 from endpoints.middleware import setup_middleware
 from endpoints.recipes import router as recipe_router
 from endpoints.recommendations import router as recommendation_router
-from endpoints.system import router as system_router
+from endpoints.system import router as system_router, metrics_router
 from endpoints.search import router as search_router  # Import the new search router
 from models.models import HealthResponse
 from embedding.scheduler import start_embedding_scheduler
+from cache.popularity import start_popularity_persistence, get_popularity_tracker
+from recommenders.precompute import start_precompute_scheduler
+from indexes.minhash import start_ingredient_index_build
+from indexes.facets import start_facet_index_build
+from cache.interaction_buffer import interaction_buffer
+from maintenance.interaction_retention import start_interaction_maintenance
+from monitoring.tracing import configure_tracing, shutdown_tracing
 
 # Configure logging
 logging.basicConfig(
@@ -29,7 +38,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="MealFlow Recommendation Service",
     description="API for personalized meal recommendations",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Set up middleware
@@ -39,6 +49,7 @@ setup_middleware(app)
 app.include_router(recipe_router)
 app.include_router(recommendation_router)
 app.include_router(system_router)
+app.include_router(metrics_router)
 app.include_router(search_router)  # Add the search router
 
 # Add error handling for 500 errors
@@ -55,6 +66,17 @@ async def general_exception_handler(request: Request, exc: Exception):
         }
     )
 
+@app.exception_handler(PoolTimeoutError)
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: Exception):
+    """Ask clients to retry when every database connection stayed busy."""
+    logger.warning(f"Database pool exhausted for {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "The service is busy. Please retry shortly."},
+        headers={"Retry-After": "1"}
+    )
+
 # Add health check endpoint
 @app.get("/api/v1/health", response_model=HealthResponse)
 async def health_check():
@@ -86,11 +108,36 @@ async def redirect_to_docs():
 async def startup_event():
     """Initialize resources on startup."""
     logger.info("Initializing application...")
+    # Export spans if TRACING_EXPORTER is set
+    configure_tracing()
     initialize_pool()
+    await initialize_async_pool()
+    # Track replica lag so reads only go to a replica that is close enough behind
+    start_replica_monitor()
     # Start the background embedding generation scheduler
     start_embedding_scheduler()
+    # Load decayed popularity scores and flush them periodically
+    start_popularity_persistence()
+    # Start the background recommendation precompute job
+    start_precompute_scheduler()
+    # Build the ingredient similarity index in the background
+    start_ingredient_index_build()
+    # Build the recipe filter facet index in the background
+    start_facet_index_build()
+    # Flush batched interactions in the background
+    interaction_buffer.start()
+    # Create interaction partitions ahead and roll up expired interactions
+    start_interaction_maintenance()
     logger.info("Application initialization complete")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush in-memory state on shutdown."""
+    interaction_buffer.flush()
+    get_popularity_tracker().persist()
+    await close_async_pool()
+    shutdown_tracing()
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app", 
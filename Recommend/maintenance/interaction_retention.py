@@ -0,0 +1,118 @@
+"""
+Partition upkeep and retention for user_interactions.
+
+Once user_interactions is partitioned by month (migrations/003), this job keeps
+INTERACTION_PARTITION_MONTHS_AHEAD future partitions ready so that new events
+never land in the default partition. Interactions older than
+INTERACTION_RETENTION_DAYS are summarised into user_interaction_daily: months
+that have expired completely are rolled up and dropped as whole partitions, and
+the remaining expired rows are rolled up and deleted.
+
+Expired ratings leave recipe_rating_stats along with their rows: deleted rows
+through the trigger of migrations/007, dropped partitions by subtracting their
+ratings before the drop. The stats therefore always match the ratings still in
+user_interactions, and a user rating the same recipe again after theirs expired
+counts once.
+
+The job starts in every worker process; an advisory lock lets one of them run
+it at a time.
+
+    python -m maintenance.interaction_retention     # run once
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from config.config import (
+    INTERACTION_RETENTION_DAYS, INTERACTION_PARTITION_MONTHS_AHEAD, INTERACTION_MAINTENANCE_INTERVAL
+)
+from config.db import statement_timeout, advisory_lock
+from models.queries_recommend import (
+    interactions_partitioned, get_interaction_partitions, create_interaction_partition,
+    rollup_interaction_partition, rollup_interactions_before
+)
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock held while maintenance runs
+MAINTENANCE_LOCK = "recommend.interaction_maintenance"
+
+def next_month(month: datetime) -> datetime:
+    """Get the first day of the month after month."""
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def run_interaction_maintenance() -> Optional[Dict[str, Any]]:
+    """
+    Create upcoming partitions and apply the retention policy.
+
+    Rollups of a whole month can outlast the statement timeout of request
+    queries, so it does not apply here.
+
+    Returns:
+        Counts of partitions created and dropped, and whether the remaining
+        expired rows were rolled up, or None if another process is running it
+    """
+    with advisory_lock(MAINTENANCE_LOCK) as locked:
+        if not locked:
+            logger.info("Interaction maintenance already running in another process")
+            return None
+        with statement_timeout(0):
+            return _run_interaction_maintenance()
+
+def _run_interaction_maintenance() -> Dict[str, Any]:
+    """Run the maintenance steps of run_interaction_maintenance."""
+    result = {"partitions_created": 0, "partitions_dropped": 0, "expired_rows_rolled_up": False}
+    partitioned = interactions_partitioned()
+
+    if partitioned:
+        existing = {partition["month"] for partition in get_interaction_partitions()}
+        month = datetime(datetime.now().year, datetime.now().month, 1)
+        for _ in range(INTERACTION_PARTITION_MONTHS_AHEAD + 1):
+            if month not in existing and create_interaction_partition(month):
+                result["partitions_created"] += 1
+            month = next_month(month)
+
+    if INTERACTION_RETENTION_DAYS <= 0:
+        return result
+
+    cutoff = datetime.now() - timedelta(days=INTERACTION_RETENTION_DAYS)
+
+    if partitioned:
+        # Whole months before the cutoff are dropped without touching other partitions
+        for partition in get_interaction_partitions():
+            if next_month(partition["month"]) <= cutoff and rollup_interaction_partition(partition["name"]):
+                result["partitions_dropped"] += 1
+
+    result["expired_rows_rolled_up"] = rollup_interactions_before(cutoff)
+
+    logger.info(f"Interaction maintenance: {result}")
+    return result
+
+def interaction_maintenance_task():
+    """Background task to periodically maintain interaction partitions."""
+    while True:
+        try:
+            run_interaction_maintenance()
+        except Exception as e:
+            logger.error(f"Error in interaction maintenance task: {e}")
+        time.sleep(INTERACTION_MAINTENANCE_INTERVAL)
+
+def start_interaction_maintenance():
+    """Start the interaction maintenance job in a background thread."""
+    if INTERACTION_MAINTENANCE_INTERVAL <= 0:
+        logger.info("Interaction maintenance disabled")
+        return
+
+    maintenance_thread = threading.Thread(target=interaction_maintenance_task, daemon=True)
+    maintenance_thread.start()
+    logger.info("Interaction maintenance started")
+
+if __name__ == "__main__":
+    from config.config import LOG_LEVEL, LOG_FORMAT
+    from config.db import initialize_pool
+
+    logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+    initialize_pool()
+    run_interaction_maintenance()
@@ -0,0 +1,20 @@
+-- Full-text and trigram search over recipes, replacing ILIKE scans in search_recipes
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Title words rank above source words; kept up to date by PostgreSQL
+ALTER TABLE recipes ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(recipe_title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(source, '')), 'B')
+    ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS recipes_search_vector_idx ON recipes USING gin (search_vector);
+
+-- Substring (ILIKE) and fuzzy (word_similarity) matching on titles and ingredient names
+CREATE INDEX CONCURRENTLY IF NOT EXISTS recipes_title_trgm_idx ON recipes USING gin (recipe_title gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ingredients_name_trgm_idx ON ingredients USING gin (ingredient_name gin_trgm_ops);
+
+-- Joins from matching ingredients back to recipes for include/exclude filters
+CREATE INDEX CONCURRENTLY IF NOT EXISTS recipe_ingredients_recipe_idx ON recipe_ingredients(recipe_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS recipe_ingredients_ingredient_idx ON recipe_ingredients(ingredient_id);
@@ -0,0 +1,24 @@
+-- Per-recipe rating aggregates, maintained by record_interaction, replacing the
+-- AVG(rating) over all of user_interactions in rating-sorted search
+
+CREATE TABLE IF NOT EXISTS recipe_rating_stats (
+    recipe_id INTEGER PRIMARY KEY REFERENCES recipes(recipe_id) ON DELETE CASCADE,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum FLOAT NOT NULL DEFAULT 0,
+    avg_rating FLOAT GENERATED ALWAYS AS (rating_sum / NULLIF(rating_count, 0)) STORED,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS recipe_rating_stats_avg_idx ON recipe_rating_stats(avg_rating, recipe_id);
+
+-- Backfill from existing ratings; the counters are recomputed if this is re-run
+INSERT INTO recipe_rating_stats (recipe_id, rating_count, rating_sum)
+SELECT r.recipe_id, COUNT(*), SUM(ui.rating)
+FROM user_interactions ui
+JOIN recipes r ON r.recipe_id::text = ui.recipe_id
+WHERE ui.interaction_type = 'rating' AND ui.rating IS NOT NULL
+GROUP BY r.recipe_id
+ON CONFLICT (recipe_id) DO UPDATE
+SET rating_count = EXCLUDED.rating_count,
+    rating_sum = EXCLUDED.rating_sum,
+    updated_at = CURRENT_TIMESTAMP;
@@ -0,0 +1,86 @@
+-- Convert user_interactions to monthly range partitions on "timestamp" and add the
+-- daily rollup that expired interactions are summarised into before they are
+-- dropped (maintenance/interaction_retention.py)
+
+CREATE TABLE IF NOT EXISTS user_interaction_daily (
+    day DATE NOT NULL,
+    user_id VARCHAR(100) NOT NULL,
+    recipe_id VARCHAR(100) NOT NULL,
+    interaction_type VARCHAR(50) NOT NULL,
+    interaction_count INTEGER NOT NULL,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum FLOAT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, user_id, recipe_id, interaction_type)
+);
+
+CREATE INDEX IF NOT EXISTS user_interaction_daily_user_idx ON user_interaction_daily(user_id, day);
+CREATE INDEX IF NOT EXISTS user_interaction_daily_recipe_idx ON user_interaction_daily(recipe_id, day);
+
+-- The conversion runs as one statement, so it either completes or leaves the
+-- table untouched. Writers wait on the lock while rows are copied. The original
+-- table is kept as user_interactions_unpartitioned; drop it once verified.
+DO $$
+DECLARE
+    month_start DATE;
+    last_month DATE;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'user_interactions'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    LOCK TABLE user_interactions IN EXCLUSIVE MODE;
+    ALTER TABLE user_interactions RENAME TO user_interactions_unpartitioned;
+    UPDATE user_interactions_unpartitioned SET "timestamp" = CURRENT_TIMESTAMP WHERE "timestamp" IS NULL;
+
+    CREATE TABLE user_interactions (LIKE user_interactions_unpartitioned INCLUDING DEFAULTS)
+        PARTITION BY RANGE ("timestamp");
+    ALTER TABLE user_interactions ALTER COLUMN "timestamp" SET NOT NULL;
+    ALTER TABLE user_interactions ADD PRIMARY KEY (interaction_id, "timestamp");
+    EXECUTE format(
+        'ALTER SEQUENCE %s OWNED BY user_interactions.interaction_id',
+        pg_get_serial_sequence('user_interactions_unpartitioned', 'interaction_id')
+    );
+
+    SELECT COALESCE(date_trunc('month', MIN("timestamp")), date_trunc('month', CURRENT_TIMESTAMP))::date
+    INTO month_start
+    FROM user_interactions_unpartitioned;
+    last_month := (date_trunc('month', CURRENT_TIMESTAMP) + INTERVAL '2 months')::date;
+
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF user_interactions FOR VALUES FROM (%L) TO (%L)',
+            'user_interactions_p' || to_char(month_start, 'YYYYMM'),
+            month_start,
+            (month_start + INTERVAL '1 month')::date
+        );
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+    CREATE TABLE user_interactions_default PARTITION OF user_interactions DEFAULT;
+
+    CREATE INDEX user_interactions_user_time_idx ON user_interactions(user_id, "timestamp");
+    CREATE INDEX user_interactions_recipe_time_idx ON user_interactions(recipe_id, "timestamp");
+    CREATE INDEX user_interactions_lookup_idx ON user_interactions(user_id, recipe_id, interaction_type);
+    CREATE INDEX user_interactions_type_time_idx ON user_interactions(interaction_type, "timestamp");
+
+    INSERT INTO user_interactions SELECT * FROM user_interactions_unpartitioned;
+
+    -- Views keep pointing at the renamed table unless they are redefined
+    IF to_regclass('trending_recipes') IS NOT NULL THEN
+        CREATE OR REPLACE VIEW trending_recipes AS
+        SELECT
+            r.recipe_id as id,
+            r.recipe_title as title,
+            COUNT(ui.interaction_id) as interaction_count,
+            AVG(CASE WHEN ui.interaction_type = 'rating' THEN ui.rating ELSE NULL END) as avg_rating,
+            COUNT(CASE WHEN ui.interaction_type = 'like' THEN 1 ELSE NULL END) as like_count,
+            COUNT(CASE WHEN ui.interaction_type = 'save' THEN 1 ELSE NULL END) as save_count,
+            COUNT(CASE WHEN ui.interaction_type = 'cook' THEN 1 ELSE NULL END) as cook_count,
+            MAX(ui."timestamp") as last_interaction
+        FROM recipes r
+        JOIN user_interactions ui ON r.recipe_id::text = ui.recipe_id
+        WHERE ui."timestamp" > (CURRENT_TIMESTAMP - INTERVAL '7 days')
+        GROUP BY r.recipe_id, r.recipe_title
+        ORDER BY interaction_count DESC;
+    END IF;
+END
+$$;
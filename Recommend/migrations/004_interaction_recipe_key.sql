@@ -0,0 +1,29 @@
+-- Integer recipe key on user_interactions, so joins with recipes use the primary
+-- key and an index instead of casting every recipe_id. The text recipe_id is
+-- still written alongside it (models/queries_recommend.py) until every reader
+-- has moved over.
+
+ALTER TABLE user_interactions ADD COLUMN IF NOT EXISTS recipe_key INTEGER;
+
+-- Interactions with IDs that are not numeric, or whose recipe no longer exists,
+-- keep a NULL key; the CASE keeps the cast away from non-numeric IDs
+UPDATE user_interactions ui
+SET recipe_key = r.recipe_id
+FROM recipes r
+WHERE ui.recipe_key IS NULL
+AND r.recipe_id = CASE WHEN ui.recipe_id ~ '^[0-9]+$' THEN ui.recipe_id::integer END;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'user_interactions_recipe_key_fkey') THEN
+        ALTER TABLE user_interactions
+            ADD CONSTRAINT user_interactions_recipe_key_fkey
+            FOREIGN KEY (recipe_key) REFERENCES recipes(recipe_id) ON DELETE SET NULL;
+    END IF;
+END
+$$;
+
+CREATE INDEX IF NOT EXISTS user_interactions_recipe_key_time_idx ON user_interactions(recipe_key, "timestamp");
+CREATE INDEX IF NOT EXISTS user_interactions_user_time_idx ON user_interactions(user_id, "timestamp");
+
+ANALYZE user_interactions;
@@ -0,0 +1,19 @@
+-- Join the trending_recipes view on the integer recipe key added by migration
+-- 004, so it uses the (recipe_key, timestamp) index and the recipes primary key
+-- instead of casting every recipe_id to text
+
+CREATE OR REPLACE VIEW trending_recipes AS
+SELECT
+    r.recipe_id as id,
+    r.recipe_title as title,
+    COUNT(ui.interaction_id) as interaction_count,
+    AVG(CASE WHEN ui.interaction_type = 'rating' THEN ui.rating ELSE NULL END) as avg_rating,
+    COUNT(CASE WHEN ui.interaction_type = 'like' THEN 1 ELSE NULL END) as like_count,
+    COUNT(CASE WHEN ui.interaction_type = 'save' THEN 1 ELSE NULL END) as save_count,
+    COUNT(CASE WHEN ui.interaction_type = 'cook' THEN 1 ELSE NULL END) as cook_count,
+    MAX(ui."timestamp") as last_interaction
+FROM recipes r
+JOIN user_interactions ui ON ui.recipe_key = r.recipe_id
+WHERE ui."timestamp" > (CURRENT_TIMESTAMP - INTERVAL '7 days')
+GROUP BY r.recipe_id, r.recipe_title
+ORDER BY interaction_count DESC;
@@ -0,0 +1,35 @@
+-- Let the database derive user_interactions.recipe_key from recipe_id. Workers
+-- started before migration 004 still insert rows without a key, and readers join
+-- on recipe_key since migration 005, so those rows would otherwise be missing
+-- from trending, history and similar-user queries until every worker restarts.
+-- Row triggers on a partitioned table need PostgreSQL 13 or later.
+
+CREATE OR REPLACE FUNCTION set_interaction_recipe_key() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW.recipe_key IS NOT NULL THEN
+        RETURN NEW;
+    END IF;
+    IF TG_OP = 'UPDATE' AND NEW.recipe_id IS NOT DISTINCT FROM OLD.recipe_id THEN
+        RETURN NEW;
+    END IF;
+    -- Non-numeric IDs and recipes that do not exist keep a NULL key, as in 004
+    SELECT r.recipe_id INTO NEW.recipe_key
+    FROM recipes r
+    WHERE r.recipe_id = CASE WHEN NEW.recipe_id ~ '^[0-9]+$' THEN NEW.recipe_id::integer END;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_interactions_recipe_key ON user_interactions;
+
+CREATE TRIGGER user_interactions_recipe_key
+    BEFORE INSERT OR UPDATE OF recipe_id ON user_interactions
+    FOR EACH ROW EXECUTE FUNCTION set_interaction_recipe_key();
+
+-- Rows inserted between 004 and the trigger above; the trigger is already in
+-- place, so nothing written from here on can be missed
+UPDATE user_interactions ui
+SET recipe_key = r.recipe_id
+FROM recipes r
+WHERE ui.recipe_key IS NULL
+AND r.recipe_id = CASE WHEN ui.recipe_id ~ '^[0-9]+$' THEN ui.recipe_id::integer END;
@@ -0,0 +1,56 @@
+-- Maintain recipe_rating_stats with a trigger on user_interactions instead of in
+-- the service. Workers that cached "no recipe_rating_stats" before migration 002
+-- skipped their updates until they restarted, and 002's backfill runs only once,
+-- so those ratings were never counted. The stats now always equal the ratings
+-- present in user_interactions: inserts add, updates replace and deletes
+-- subtract. Relies on recipe_key from migrations 004 and 006.
+
+CREATE OR REPLACE FUNCTION maintain_recipe_rating_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.interaction_type = 'rating' AND OLD.rating IS NOT NULL AND OLD.recipe_key IS NOT NULL THEN
+            UPDATE recipe_rating_stats
+            SET rating_count = rating_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                updated_at = NOW()
+            WHERE recipe_id = OLD.recipe_key;
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.interaction_type = 'rating' AND NEW.rating IS NOT NULL AND NEW.recipe_key IS NOT NULL THEN
+            -- Joined with recipes, so a recipe deleted in the same statement is skipped
+            INSERT INTO recipe_rating_stats (recipe_id, rating_count, rating_sum, updated_at)
+            SELECT r.recipe_id, 1, NEW.rating, NOW()
+            FROM recipes r
+            WHERE r.recipe_id = NEW.recipe_key
+            ON CONFLICT (recipe_id) DO UPDATE
+            SET rating_count = recipe_rating_stats.rating_count + 1,
+                rating_sum = recipe_rating_stats.rating_sum + EXCLUDED.rating_sum,
+                updated_at = NOW();
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- Writes wait while the trigger is installed and the stats are recomputed, so
+-- no rating is counted twice or missed in between. Safe to re-run.
+DO $$
+BEGIN
+    LOCK TABLE user_interactions IN SHARE ROW EXCLUSIVE MODE;
+
+    DROP TRIGGER IF EXISTS user_interactions_rating_stats ON user_interactions;
+    CREATE TRIGGER user_interactions_rating_stats
+        AFTER INSERT OR UPDATE OF rating, interaction_type, recipe_key OR DELETE ON user_interactions
+        FOR EACH ROW EXECUTE FUNCTION maintain_recipe_rating_stats();
+
+    DELETE FROM recipe_rating_stats;
+    INSERT INTO recipe_rating_stats (recipe_id, rating_count, rating_sum)
+    SELECT recipe_key, COUNT(*), SUM(rating)
+    FROM user_interactions
+    WHERE interaction_type = 'rating' AND rating IS NOT NULL AND recipe_key IS NOT NULL
+    GROUP BY recipe_key;
+END
+$$;
+
+ANALYZE recipe_rating_stats;
@@ -0,0 +1,17 @@
+-- Tables the service writes to that were only defined in schema.sql, so
+-- databases upgraded with python -m migrations.run never got them
+
+-- Exponentially decayed popularity scores (flushed by cache/popularity.py)
+CREATE TABLE IF NOT EXISTS recipe_popularity (
+    recipe_id INTEGER PRIMARY KEY REFERENCES recipes(recipe_id) ON DELETE CASCADE,
+    score FLOAT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Precomputed hybrid recommendations, items stored as [id, title, score] arrays
+-- (written by recommenders/precompute.py)
+CREATE TABLE IF NOT EXISTS user_recommendations (
+    user_id VARCHAR(100) PRIMARY KEY,
+    items JSONB NOT NULL,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
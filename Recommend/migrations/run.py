@@ -0,0 +1,105 @@
+"""
+Apply pending SQL migrations in order.
+
+Migrations are the numbered .sql files in this directory. Applied versions are
+recorded in the schema_migrations table. Statements run one at a time in
+autocommit mode so that CREATE INDEX CONCURRENTLY can be used; migrations are
+written to be safe to re-run if one fails part way.
+
+    python -m migrations.run            # apply pending migrations
+    python -m migrations.run --list     # show applied and pending migrations
+"""
+import argparse
+import logging
+import os
+import time
+from typing import List
+
+import psycopg2
+
+from config.config import DATABASE_URL, LOG_LEVEL, LOG_FORMAT
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def get_migration_files() -> List[str]:
+    """Get the migration file names in version order."""
+    return sorted(name for name in os.listdir(MIGRATIONS_DIR) if name.endswith(".sql"))
+
+def split_statements(sql: str) -> List[str]:
+    """Split a migration into statements, keeping $$-quoted bodies intact."""
+    statements, current, in_dollar_quote = [], [], False
+
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not current and (not stripped or stripped.startswith("--")):
+            continue
+
+        current.append(line)
+        if line.count("$$") % 2 == 1:
+            in_dollar_quote = not in_dollar_quote
+
+        if stripped.endswith(";") and not in_dollar_quote:
+            statements.append("\n".join(current))
+            current = []
+
+    if "\n".join(current).strip():
+        statements.append("\n".join(current))
+    return statements
+
+def run_migrations(list_only: bool = False) -> int:
+    """
+    Apply every migration not yet recorded in schema_migrations.
+
+    Args:
+        list_only: Only print the status of each migration
+
+    Returns:
+        Number of migrations applied
+    """
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    applied_count = 0
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(255) PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+
+            for name in get_migration_files():
+                if list_only:
+                    print(f"{'applied' if name in applied else 'pending':<8} {name}")
+                    continue
+                if name in applied:
+                    continue
+
+                logger.info(f"Applying migration {name}")
+                start_time = time.time()
+                with open(os.path.join(MIGRATIONS_DIR, name)) as migration_file:
+                    for statement in split_statements(migration_file.read()):
+                        cursor.execute(statement)
+
+                cursor.execute("INSERT INTO schema_migrations (version) VALUES (%(version)s)", {"version": name})
+                applied_count += 1
+                logger.info(f"Applied migration {name} in {time.time() - start_time:.1f}s")
+    finally:
+        conn.close()
+
+    return applied_count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--list", action="store_true", help="Show migration status without applying anything")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+    count = run_migrations(list_only=args.list)
+    if not args.list:
+        logger.info(f"{count} migration(s) applied")
@@ -43,6 +43,10 @@ class InteractionCreate(BaseModel):
     interaction_type: str
     rating: Optional[float] = None
 
+class InteractionBatch(BaseModel):
+    """Model for recording a batch of interactions."""
+    interactions: List[InteractionCreate] = Field(..., min_items=1)
+
 # Response models
 class RecipeBase(BaseModel):
     """Base model for recipe responses."""
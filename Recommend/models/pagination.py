@@ -0,0 +1,108 @@
+"""
+Keyset pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort key and recipe ID of the
+last row of a page. The next page starts strictly after that row, so it is read
+with an index range scan instead of skipping OFFSET rows.
+"""
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Sort signature of listings ordered by recipe ID only
+ID_SORT = "id:asc"
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor is malformed or belongs to a different sort order."""
+
+def decode_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Decode a cursor of a listing ordered by recipe ID.
+
+    Returns:
+        The last recipe ID of the previous page, or None if no cursor was given
+
+    Raises:
+        InvalidCursorError: If the cursor is invalid
+    """
+    if not cursor:
+        return None
+    position = decode_cursor(cursor, ID_SORT)
+    if position is None:
+        raise InvalidCursorError("Invalid cursor")
+    return position[1]
+
+def encode_cursor(sort: str, key: Any, recipe_id: int) -> str:
+    """
+    Encode the position of a row as a cursor.
+
+    Args:
+        sort: Sort signature the cursor belongs to, e.g. "time:asc"
+        key: Value of the sort key of the row
+        recipe_id: Recipe ID of the row
+
+    Returns:
+        Opaque cursor string
+    """
+    payload = json.dumps({"s": sort, "k": key, "id": recipe_id}, separators=(",", ":"), default=float)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Optional[Tuple[Any, int]]:
+    """
+    Decode a cursor.
+
+    Args:
+        cursor: Cursor returned with a previous page
+        sort: Sort signature of the current request
+
+    Returns:
+        Tuple of (sort key, recipe ID), or None if the cursor is malformed or was
+        issued for a different sort order
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if payload.get("s") != sort:
+            return None
+        return payload["k"], int(payload["id"])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+def keyset_condition(sort_expression: str, direction: str, position: Tuple[Any, int],
+                     params: Dict[str, Any], id_column: str = "r.recipe_id") -> str:
+    """
+    Build the condition selecting rows after a cursor position.
+
+    The sort key must never be NULL (wrap it in COALESCE) and ties are broken by
+    recipe ID in the same direction, so a row-value comparison is exact.
+
+    Args:
+        sort_expression: SQL expression of the sort key
+        direction: "ASC" or "DESC"
+        position: Decoded cursor position
+        params: Query parameters, updated in place
+        id_column: Recipe ID column
+
+    Returns:
+        SQL condition
+    """
+    params["cursor_key"], params["cursor_id"] = position
+    operator = ">" if direction == "ASC" else "<"
+    return f"({sort_expression}, {id_column}) {operator} (%(cursor_key)s, %(cursor_id)s)"
+
+def next_cursor(rows: List[Dict[str, Any]], limit: int, sort: str,
+                key_field: str = "sort_key", id_field: str = "recipe_id") -> Optional[str]:
+    """
+    Get the cursor of the page after rows, or None if rows is the last page.
+
+    Args:
+        rows: Rows of the current page
+        limit: Requested page size
+        sort: Sort signature
+        key_field: Field of the row holding the sort key
+        id_field: Field of the row holding the recipe ID
+    """
+    if len(rows) < limit or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(sort, last[key_field], last[id_field])
@@ -5,58 +5,73 @@ import logging
 import math
 from typing import Dict, List, Any, Optional
 
-from config.db import execute_query, execute_query_single, execute_transaction
+from config.db import execute_query, execute_query_single, execute_transaction, column_exists, POOL_TIMEOUTS
+from cache.recipe_cache import recipe_cache
+from cache.count_cache import count_cache
+from monitoring.metrics import timed_query
+from models.pagination import (
+    InvalidCursorError, decode_cursor, decode_id_cursor, keyset_condition, next_cursor
+)
 
 logger = logging.getLogger(__name__)
 
+@timed_query
 def get_recipe(recipe_id: int) -> Optional[Dict[str, Any]]:
     """Get a recipe by ID with its ingredients and instructions."""
-    try:
-        # Get recipe details
-        recipe_query = """
-        SELECT 
-            recipe_id, recipe_title, region, sub_region, continent,
-            source, image_url, cook_time, prep_time, total_time,
-            servings, url, calories
-        FROM recipes
-        WHERE recipe_id = %(recipe_id)s
-        """
-        
-        recipe = execute_query_single(recipe_query, {"recipe_id": recipe_id})
-        if not recipe:
-            return None
-        
-        # Get ingredients
-        ingredient_query = """
-        SELECT
-            i.ingredient_id, i.ingredient_name,
-            ri.quantity, ri.unit, ri.ingredient_state
-        FROM recipe_ingredients ri
-        JOIN ingredients i ON ri.ingredient_id = i.ingredient_id
-        WHERE ri.recipe_id = %(recipe_id)s
-        """
-        
-        recipe["ingredients"] = execute_query(ingredient_query, {"recipe_id": recipe_id})
+    recipes = get_recipes_by_ids([recipe_id])
+    return recipes[0] if recipes else None
+
+@timed_query
+def get_recipes_by_ids(recipe_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Get recipes with their ingredients and instructions, reading through the recipe cache.
+    
+    Args:
+        recipe_ids: Recipe IDs to fetch
         
-        # Get instructions
-        instruction_query = """
-        SELECT instructions
-        FROM recipe_instructions
-        WHERE recipe_id = %(recipe_id)s
-        """
+    Returns:
+        List of recipes in the order of recipe_ids, skipping IDs that do not exist
+    """
+    try:
+        recipe_ids = [int(recipe_id) for recipe_id in recipe_ids]
+        found, missing = recipe_cache.get_many(recipe_ids)
         
-        instruction = execute_query_single(instruction_query, {"recipe_id": recipe_id})
-        recipe["instructions"] = instruction["instructions"] if instruction else None
+        if missing:
+            query = f"""
+            SELECT 
+                r.recipe_id, r.recipe_title, r.region, r.sub_region, r.continent,
+                r.source, r.image_url, r.cook_time, r.prep_time, r.total_time,
+                r.servings, r.url, r.calories,{','.join(_hydration_columns(HYDRATION_FIELDS))}
+            FROM recipes r
+            WHERE r.recipe_id = ANY(%(ids)s)
+            """
+            
+            for recipe in execute_query(query, {"ids": list(missing)}, statement="recipes_by_ids"):
+                recipe_cache.put(recipe["recipe_id"], recipe, missing[recipe["recipe_id"]])
+                found[recipe["recipe_id"]] = recipe
         
-        return recipe
+        return [found[recipe_id] for recipe_id in recipe_ids if recipe_id in found]
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
-        logger.error(f"Error retrieving recipe {recipe_id}: {e}")
-        return None
+        logger.error(f"Error retrieving recipes {recipe_ids}: {e}")
+        return []
 
+@timed_query
 def get_recipes(limit: int = 20, offset: int = 0, filters: Optional[Dict[str, Any]] = None, 
-               calories_filter: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
-    """Get a list of recipes with optional filtering."""
+               calories_filter: Optional[Dict[str, float]] = None,
+               cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get a list of recipes with optional filtering.
+    
+    A cursor from a previous page continues after its last recipe and takes
+    precedence over offset.
+    
+    Raises:
+        InvalidCursorError: If the cursor is invalid
+    """
+    after_id = decode_id_cursor(cursor)
     try:
         # Start building the query
         query = """
@@ -91,6 +106,12 @@ def get_recipes(limit: int = 20, offset: int = 0, filters: Optional[Dict[str, An
                 query += " AND calories <= %(max_calories)s"
                 params["max_calories"] = max_calories
         
+        # Continue after the cursor if one was given
+        if after_id is not None:
+            query += " AND recipe_id > %(after_id)s"
+            params["after_id"] = after_id
+            params["offset"] = 0
+        
         # Add pagination
         query += """
         ORDER BY recipe_id
@@ -99,10 +120,13 @@ def get_recipes(limit: int = 20, offset: int = 0, filters: Optional[Dict[str, An
         
         return execute_query(query, params)
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving recipes: {e}")
         return []
 
+@timed_query
 def create_recipe(recipe_data: Dict[str, Any]) -> Optional[int]:
     """Create a new recipe and return its ID."""
     try:
@@ -187,10 +211,13 @@ def create_recipe(recipe_data: Dict[str, Any]) -> Optional[int]:
         
         return recipe_id
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error creating recipe: {e}")
         return None
 
+@timed_query
 def update_recipe(recipe_id, recipe_data):
     """Update an existing recipe."""
     try:
@@ -214,12 +241,16 @@ def update_recipe(recipe_id, recipe_data):
         """
         
         execute_query(query, params)
+        recipe_cache.invalidate(int(recipe_id))
         return True
     
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error updating recipe {recipe_id}: {e}")
         return False
 
+@timed_query
 def delete_recipe(recipe_id):
     """Delete a recipe and its related data."""
     try:
@@ -233,11 +264,15 @@ def delete_recipe(recipe_id):
         ]
         
         execute_transaction(queries)
+        recipe_cache.invalidate(int(recipe_id))
         return True
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error deleting recipe {recipe_id}: {e}")
         return False
 
+@timed_query
 def get_recipes_without_embeddings(limit=50):
     """Get recipes that don't have embeddings yet."""
     try:
@@ -254,14 +289,22 @@ def get_recipes_without_embeddings(limit=50):
         logger.error(f"Error getting recipes without embeddings: {e}")
         return []
 
-def filter_recipes_by_calories(min_calories, max_calories, limit=20, offset=0):
-    """Filter recipes by calorie range."""
+@timed_query
+def filter_recipes_by_calories(min_calories, max_calories, limit=20, offset=0, cursor=None):
+    """
+    Filter recipes by calorie range.
+    
+    Raises:
+        InvalidCursorError: If the cursor is invalid
+    """
+    after_id = decode_id_cursor(cursor)
     try:
         query = """
         SELECT 
             recipe_id, recipe_title, region, sub_region
         FROM recipes
         WHERE calories >= %(min)s AND calories <= %(max)s
+        AND recipe_id > %(after_id)s
         ORDER BY recipe_id
         LIMIT %(limit)s OFFSET %(offset)s
         """
@@ -269,15 +312,149 @@ def filter_recipes_by_calories(min_calories, max_calories, limit=20, offset=0):
         params = {
             "min": min_calories,
             "max": max_calories,
+            "after_id": after_id if after_id is not None else 0,
             "limit": limit,
-            "offset": offset
+            "offset": offset if after_id is None else 0
         }
         
         return execute_query(query, params)
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error filtering recipes by calories: {e}")
         return []
 
+# Ways to count the total number of results: exact (cached per filter
+# signature), estimate (planner row estimate) or none
+COUNT_MODES = ("exact", "estimate", "none")
+
+def _nulls_last(direction: str) -> str:
+    """Get the sort key substitute for NULL that sorts after every value."""
+    return "'Infinity'::float" if direction == "ASC" else "'-Infinity'::float"
+
+@timed_query
+def count_recipes(count_query: str, params: Dict[str, Any], count_mode: str = "exact") -> Optional[int]:
+    """
+    Count the recipes matched by a search.
+    
+    Args:
+        count_query: SELECT COUNT(*) as count query over the filtered recipes
+        params: Query parameters
+        count_mode: One of COUNT_MODES
+        
+    Returns:
+        Number of matching recipes, or None if count_mode is none
+    """
+    if count_mode == "none":
+        return None
+    
+    if count_mode == "estimate":
+        plan = execute_query_single(f"EXPLAIN (FORMAT JSON) {count_query.replace('COUNT(*) as count', '1')}", params)
+        return int(plan["QUERY PLAN"][0]["Plan"]["Plan Rows"]) if plan else 0
+    
+    key = count_cache.signature(count_query, params)
+    total_count = count_cache.get(key)
+    if total_count is None:
+        count_result = execute_query_single(count_query, params)
+        total_count = count_result["count"] if count_result else 0
+        count_cache.put(key, total_count)
+    return total_count
+
+_text_search_warned = False
+
+def text_search_available() -> bool:
+    """Check whether migrations/001_recipe_text_search.sql has been applied."""
+    global _text_search_warned
+    try:
+        available = column_exists("recipes", "search_vector")
+        if not available and not _text_search_warned:
+            logger.warning("recipes.search_vector is missing; text search falls back to ILIKE")
+            _text_search_warned = True
+        return available
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error checking for full-text search support: {e}")
+        return False
+
+def rating_stats_available() -> bool:
+    """Check whether migrations/002_recipe_rating_stats.sql has been applied."""
+    try:
+        return column_exists("recipe_rating_stats", "avg_rating")
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error checking for recipe rating stats: {e}")
+        return False
+
+# Related data that can be attached to recipe rows by hydrate_recipes
+HYDRATION_FIELDS = ("ingredients", "instructions")
+
+def _hydration_columns(fields) -> List[str]:
+    """Build correlated subquery columns for the related data of recipes aliased as r."""
+    columns = []
+    if "ingredients" in fields:
+        columns.append("""
+            (
+                SELECT COALESCE(json_agg(json_build_object(
+                    'ingredient_id', i.ingredient_id,
+                    'ingredient_name', i.ingredient_name,
+                    'quantity', ri.quantity,
+                    'unit', ri.unit,
+                    'ingredient_state', ri.ingredient_state
+                ) ORDER BY ri.recipe_ingredient_id), '[]'::json)
+                FROM recipe_ingredients ri
+                JOIN ingredients i ON ri.ingredient_id = i.ingredient_id
+                WHERE ri.recipe_id = r.recipe_id
+            ) as ingredients""")
+    if "instructions" in fields:
+        columns.append("""
+            (
+                SELECT rin.instructions
+                FROM recipe_instructions rin
+                WHERE rin.recipe_id = r.recipe_id
+                ORDER BY rin.instruction_id
+                LIMIT 1
+            ) as instructions""")
+    
+    return columns
+
+@timed_query
+def hydrate_recipes(recipes: List[Dict[str, Any]], fields=HYDRATION_FIELDS) -> List[Dict[str, Any]]:
+    """
+    Attach ingredients and instructions to a page of recipes in a single query.
+    
+    Args:
+        recipes: Recipe rows with a recipe_id key, updated in place
+        fields: Which of HYDRATION_FIELDS to attach
+        
+    Returns:
+        The same recipe rows
+    """
+    fields = [field for field in HYDRATION_FIELDS if field in fields]
+    if not recipes or not fields:
+        return recipes
+    
+    query = f"""
+    SELECT 
+        r.recipe_id,{','.join(_hydration_columns(fields))}
+    FROM recipes r
+    WHERE r.recipe_id = ANY(%(ids)s)
+    """
+    
+    rows = execute_query(query, {"ids": [recipe["recipe_id"] for recipe in recipes]}, statement="recipe_related")
+    related = {row["recipe_id"]: row for row in rows}
+    
+    for recipe in recipes:
+        row = related.get(recipe["recipe_id"], {})
+        if "ingredients" in fields:
+            recipe["ingredients"] = row.get("ingredients") or []
+        if "instructions" in fields:
+            recipe["instructions"] = row.get("instructions")
+    
+    return recipes
+
+@timed_query
 def search_recipes(
     query=None, 
     cuisines=None, 
@@ -292,10 +469,21 @@ def search_recipes(
     sort_by="relevance", 
     sort_order="desc", 
     limit=20, 
-    offset=0
+    offset=0,
+    fields=HYDRATION_FIELDS,
+    cursor=None,
+    count_mode="exact"
 ):
     """
     Advanced search for recipes with multiple criteria.
+    
+    fields selects which of HYDRATION_FIELDS are attached to each result, so list
+    views can skip the heavier ingredients and instructions. A cursor from a
+    previous page's pagination.next_cursor continues after that page instead of
+    using offset; count_mode is one of COUNT_MODES.
+    
+    Raises:
+        InvalidCursorError: If the cursor does not belong to this sort order
     """
     try:
         # Initialize SQL query parts
@@ -324,30 +512,54 @@ def search_recipes(
         join_clauses = []
         params = {}
         
-        # Process text search
-        if query:
+        # Process text search: full-text match on titles and sources, plus indexed
+        # substring and typo-tolerant matching on titles
+        use_text_search = bool(query) and text_search_available()
+        if use_text_search:
+            where_clauses.append("""(
+                r.search_vector @@ websearch_to_tsquery('english', %(text_query)s)
+                OR r.recipe_title ILIKE %(query)s
+                OR %(text_query)s <%% r.recipe_title
+            )""")
+            params["text_query"] = query
+            params["query"] = f"%{query}%"
+        elif query:
             where_clauses.append("(r.recipe_title ILIKE %(query)s OR r.source ILIKE %(query)s)")
             params["query"] = f"%{query}%"
         
+        # Resolve the structured filters from the facet index when it narrows them
+        # down to a short ID list; otherwise they are applied in SQL below
+        from indexes.facets import inline_candidate_ids
+        
+        cuisine_list = (cuisines.split(',') if isinstance(cuisines, str) else cuisines) if cuisines else []
+        dietary_list = (dietary.split(',') if isinstance(dietary, str) else dietary) if dietary else []
+        diet_columns = [
+            diet.strip().lower() for diet in dietary_list
+            if diet.strip().lower() in ("vegan", "pescetarian", "lacto_vegetarian")
+        ]
+        
+        candidate_ids = inline_candidate_ids(
+            cuisines=[cuisine.strip() for cuisine in cuisine_list] or None,
+            diets=diet_columns or None,
+            min_calories=min_calories,
+            max_calories=max_calories,
+            max_prep_time=max_prep_time,
+            max_cook_time=max_cook_time,
+            max_total_time=max_total_time
+        )
+        if candidate_ids is not None:
+            where_clauses.append("r.recipe_id = ANY(%(candidate_ids)s)")
+            params["candidate_ids"] = candidate_ids
+        
         # Process cuisine/region filters
-        if cuisines:
-            if isinstance(cuisines, str):
-                cuisine_list = cuisines.split(',')
-            else:
-                cuisine_list = cuisines
-                
+        if cuisine_list and candidate_ids is None:
             cuisine_placeholders = [f"%(cuisine{i})s" for i in range(len(cuisine_list))]
             where_clauses.append(f"(r.region IN ({','.join(cuisine_placeholders)}) OR r.sub_region IN ({','.join(cuisine_placeholders)}))")
             for i, cuisine in enumerate(cuisine_list):
                 params[f"cuisine{i}"] = cuisine.strip()
         
         # Process dietary restrictions
-        if dietary:
-            if isinstance(dietary, str):
-                dietary_list = dietary.split(',')
-            else:
-                dietary_list = dietary
-                
+        if dietary_list and candidate_ids is None:
             join_clauses.append("LEFT JOIN recipe_diet_attributes rda ON r.recipe_id = rda.recipe_id")
             
             dietary_conditions = []
@@ -408,124 +620,140 @@ def search_recipes(
                 where_clauses.append(f"({' AND '.join(ing_exclusion_conditions)})")
         
         # Process numerical filters
-        if min_calories is not None:
+        if min_calories is not None and candidate_ids is None:
             where_clauses.append("r.calories >= %(min_calories)s")
             params["min_calories"] = min_calories
         
-        if max_calories is not None:
+        if max_calories is not None and candidate_ids is None:
             where_clauses.append("r.calories <= %(max_calories)s")
             params["max_calories"] = max_calories
         
-        if max_prep_time is not None:
+        if max_prep_time is not None and candidate_ids is None:
             where_clauses.append("(r.prep_time IS NULL OR r.prep_time <= %(max_prep_time)s)")
             params["max_prep_time"] = max_prep_time
         
-        if max_cook_time is not None:
+        if max_cook_time is not None and candidate_ids is None:
             where_clauses.append("(r.cook_time IS NULL OR r.cook_time <= %(max_cook_time)s)")
             params["max_cook_time"] = max_cook_time
         
-        if max_total_time is not None:
+        if max_total_time is not None and candidate_ids is None:
             where_clauses.append("(r.total_time IS NULL OR r.total_time <= %(max_total_time)s)")
             params["max_total_time"] = max_total_time
         
-        # Build the ORDER BY clause
-        if sort_by == "relevance" and query:
+        # Count total results without pagination
+        count_params = dict(params)
+        count_query = f"""
+        SELECT COUNT(*) as count
+        {from_clause}
+        {' '.join(join_clauses)}
+        WHERE {' AND '.join(where_clauses)}
+        """
+        
+        # Attach rating aggregates to the page from the maintained stats table
+        rating_join = ""
+        rating_columns = ""
+        if rating_stats_available():
+            rating_join = "LEFT JOIN recipe_rating_stats rs ON rs.recipe_id = r.recipe_id"
+            rating_columns = """,
+            rs.avg_rating,
+            COALESCE(rs.rating_count, 0) as rating_count"""
+        
+        # Build the sort key; it is never NULL so that it can be used in a cursor
+        if sort_by == "relevance" and use_text_search:
+            # Both functions return real; as float8 the key survives the round trip
+            # through the cursor exactly, where a real would be compared with the
+            # double the cursor sends back and never equal it
+            sort_expression = """(
+                ts_rank(r.search_vector, websearch_to_tsquery('english', %(text_query)s))
+                + word_similarity(%(text_query)s, r.recipe_title)
+            )::float8"""
+            order_direction = "DESC"
+        elif sort_by == "relevance" and query:
             # Relevance sorting only makes sense with a query
-            order_clause = """
-            ORDER BY 
+            sort_expression = """
                 CASE
                     WHEN r.recipe_title ILIKE %(exact_query)s THEN 3  -- Exact match in title
                     WHEN r.recipe_title ILIKE %(start_query)s THEN 2  -- Starts with query
                     WHEN r.recipe_title ILIKE %(query)s THEN 1        -- Contains query
                     ELSE 0
-                END DESC
-            """
+                END"""
+            order_direction = "DESC"
             params["exact_query"] = query
             params["start_query"] = f"{query}%"
+        elif sort_by == "rating" and rating_join:
+            order_direction = "DESC" if sort_order.upper() == "DESC" else "ASC"
+            sort_expression = f"COALESCE(rs.avg_rating, {_nulls_last(order_direction)})"
         elif sort_by == "rating":
-            # We'll need to fetch ratings from the user_interactions table
-            join_clauses.append("""
+            # Without the rating stats table, aggregate ratings from user_interactions,
+            # by the integer recipe key once migration 004 has added it
+            if column_exists("user_interactions", "recipe_key"):
+                ratings_key, ratings_join = "recipe_key", "r.recipe_id = ratings.recipe_key"
+            else:
+                ratings_key, ratings_join = "recipe_id", "r.recipe_id::text = ratings.recipe_id"
+            join_clauses.append(f"""
             LEFT JOIN (
-                SELECT recipe_id, AVG(rating) as avg_rating
+                SELECT {ratings_key}, AVG(rating) as avg_rating
                 FROM user_interactions
                 WHERE interaction_type = 'rating'
-                GROUP BY recipe_id
-            ) ratings ON r.recipe_id::text = ratings.recipe_id
+                GROUP BY {ratings_key}
+            ) ratings ON {ratings_join}
             """)
             order_direction = "DESC" if sort_order.upper() == "DESC" else "ASC"
-            order_clause = f"ORDER BY ratings.avg_rating {order_direction} NULLS LAST"
+            sort_expression = f"COALESCE(ratings.avg_rating::float, {_nulls_last(order_direction)})"
         elif sort_by == "time":
             # Sort by total time, using prep_time + cook_time as fallback
             order_direction = "ASC" if sort_order.upper() == "ASC" else "DESC"  # Default to ASC for time
-            order_clause = f"""
-            ORDER BY 
-                COALESCE(r.total_time, r.prep_time + COALESCE(r.cook_time, 0)) {order_direction},
-                r.recipe_id
-            """
+            sort_expression = f"COALESCE(r.total_time, r.prep_time + COALESCE(r.cook_time, 0), {_nulls_last(order_direction)})"
         elif sort_by == "calories":
             order_direction = "ASC" if sort_order.upper() == "ASC" else "DESC"
-            order_clause = f"ORDER BY r.calories {order_direction} NULLS LAST, r.recipe_id"
+            sort_expression = f"COALESCE(r.calories, {_nulls_last(order_direction)})"
         else:
             # Default ordering by recipe_id
             order_direction = "DESC" if sort_order.upper() == "DESC" else "ASC"
-            order_clause = f"ORDER BY r.recipe_id {order_direction}"
+            sort_expression = "r.recipe_id"
+        
+        sort_signature = f"{sort_by if sort_expression != 'r.recipe_id' else 'id'}:{order_direction.lower()}"
+        order_clause = f"ORDER BY {sort_expression} {order_direction}, r.recipe_id {order_direction}"
+        
+        # Continue after the cursor if one was given, otherwise fall back to OFFSET
+        page_clauses = list(where_clauses)
+        position = decode_cursor(cursor, sort_signature) if cursor else None
+        if cursor and position is None:
+            raise InvalidCursorError("Invalid cursor for this sort order")
+        if position is not None:
+            page_clauses.append(keyset_condition(sort_expression, order_direction, position, params))
+            offset = 0
         
-        # Add pagination
         pagination_clause = "LIMIT %(limit)s OFFSET %(offset)s"
         params["limit"] = limit
         params["offset"] = offset
         
-        # Count total results without pagination
-        count_query = f"""
-        SELECT COUNT(*) as count
-        {from_clause}
-        {' '.join(join_clauses)}
-        WHERE {' AND '.join(where_clauses)}
-        """
-        
         # Main query with all clauses
         main_query = f"""
-        {select_clause}
+        {select_clause}{rating_columns},
+            {sort_expression} as sort_key
         {from_clause}
         {' '.join(join_clauses)}
-        WHERE {' AND '.join(where_clauses)}
+        {rating_join}
+        WHERE {' AND '.join(page_clauses)}
         {order_clause}
         {pagination_clause}
         """
         
-        # Execute count query
-        count_result = execute_query_single(count_query, params)
-        total_count = count_result["count"] if count_result else 0
-        
         # Execute main query
         results = execute_query(main_query, params)
-        
-        # Get ingredients and instructions for each recipe
+        cursor_for_next_page = next_cursor(results, limit, sort_signature)
         for recipe in results:
-            recipe_id = recipe["recipe_id"]
-            
-            # Get ingredients
-            ing_query = """
-            SELECT 
-                i.ingredient_id, i.ingredient_name, 
-                ri.quantity, ri.unit, ri.ingredient_state
-            FROM recipe_ingredients ri
-            JOIN ingredients i ON ri.ingredient_id = i.ingredient_id
-            WHERE ri.recipe_id = %(recipe_id)s
-            """
-            recipe["ingredients"] = execute_query(ing_query, {"recipe_id": recipe_id}) or []
-            
-            # Get instructions
-            instr_query = """
-            SELECT instructions
-            FROM recipe_instructions
-            WHERE recipe_id = %(recipe_id)s
-            """
-            instructions = execute_query_single(instr_query, {"recipe_id": recipe_id})
-            recipe["instructions"] = instructions["instructions"] if instructions else None
+            recipe.pop("sort_key", None)
+        
+        # Get ingredients and instructions for the whole page at once
+        hydrate_recipes(results, fields)
+        
+        # Count matching recipes as requested
+        total_count = count_recipes(count_query, count_params, count_mode)
         
         # Calculate total pages
-        total_pages = math.ceil(total_count / limit) if total_count > 0 else 0
+        total_pages = math.ceil(total_count / limit) if total_count else 0
         
         # Return a structured response
         return {
@@ -534,7 +762,9 @@ def search_recipes(
                 "offset": offset,
                 "limit": limit,
                 "total_items": total_count,
-                "total_pages": total_pages
+                "total_pages": total_pages,
+                "count_mode": count_mode,
+                "next_cursor": cursor_for_next_page
             },
             "criteria": {
                 "query": query,
@@ -548,9 +778,14 @@ def search_recipes(
                 "max_cook_time": max_cook_time,
                 "max_total_time": max_total_time,
                 "sort_by": sort_by,
-                "sort_order": sort_order
+                "sort_order": sort_order,
+                "fields": list(fields)
             }
         }
+    except InvalidCursorError:
+        raise
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error searching recipes: {e}")
         return {
@@ -563,4 +798,40 @@ def search_recipes(
             },
             "criteria": {},
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+@timed_query
+def get_recipe_facet_rows() -> Optional[List[Dict[str, Any]]]:
+    """
+    Get the filterable attributes of every recipe for the facet index.
+    
+    Returns:
+        List of rows with recipe_id, region, sub_region, effective_time, total_time,
+        prep_time, cook_time, calories and the names of the true diet attributes,
+        or None if the query failed
+    """
+    try:
+        query = """
+        SELECT 
+            r.recipe_id,
+            r.region,
+            r.sub_region,
+            COALESCE(r.total_time, r.prep_time + COALESCE(r.cook_time, 0)) as effective_time,
+            r.total_time,
+            r.prep_time,
+            r.cook_time,
+            r.calories,
+            ARRAY(
+                SELECT attribute.key
+                FROM jsonb_each(to_jsonb(rda) - 'attribute_id' - 'recipe_id' - 'created_at') attribute
+                WHERE attribute.value = 'true'::jsonb
+            ) as diets
+        FROM recipes r
+        LEFT JOIN recipe_diet_attributes rda ON r.recipe_id = rda.recipe_id
+        """
+        
+        return execute_query(query)
+        
+    except Exception as e:
+        logger.error(f"Error getting recipe facet rows: {e}")
+        return None
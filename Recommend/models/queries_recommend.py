@@ -2,14 +2,106 @@
 Database query functions for recommendations and user interactions.
 """
 import logging
+import math
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 
-from config.db import execute_query, execute_query_single
-from config.config import INTERACTION_TYPES
+from config.db import (
+    execute_query, execute_query_single, execute_transaction, column_exists,
+    execute_read_query, execute_read_query_single, replica_router, get_cursor, execute_on_cursor,
+    DATA_ERRORS, POOL_TIMEOUTS
+)
+from config.async_db import execute_read_query_async, execute_read_query_single_async
+from config.config import INTERACTION_TYPES, COLLABORATIVE_LOOKBACK_DAYS
+from indexes.facets import inline_candidate_ids
+from models.queries_recipe import rating_stats_available
+from cache.user_history import user_history_cache
+from monitoring.metrics import timed_query
 
 logger = logging.getLogger(__name__)
 
+# Length of the VARCHAR user_id and recipe_id columns of user_interactions
+INTERACTION_ID_MAX_LENGTH = 100
+
+class InteractionDataError(Exception):
+    """The database rejected a batch because of its contents; retrying it unchanged cannot succeed."""
+
+# Serializes writes of one (user, recipe, interaction type) until the transaction ends
+INTERACTION_KEY_LOCK = """
+SELECT pg_advisory_xact_lock(hashtext(%(user_id)s || ':' || %(recipe_id)s || ':' || %(interaction_type)s))
+"""
+
+# The same locks for every key of a batch, taken in hash order so that two batches cannot deadlock
+INTERACTION_BATCH_LOCK = """
+SELECT pg_advisory_xact_lock(k.key)
+FROM (
+    SELECT DISTINCT hashtext(u || ':' || r || ':' || t) as key
+    FROM unnest(%(user_ids)s::text[], %(recipe_ids)s::text[], %(interaction_types)s::text[]) AS b(u, r, t)
+    ORDER BY key
+) k
+"""
+
+def typed_recipe_key_available() -> bool:
+    """Check whether migrations/004_interaction_recipe_key.sql has been applied."""
+    try:
+        return column_exists("user_interactions", "recipe_key")
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error checking for user_interactions.recipe_key: {e}")
+        return False
+
+def interaction_recipe_column(alias: str = "ui", join: bool = True) -> str:
+    """
+    Get the SQL expression identifying the recipe of an interaction.
+    
+    The integer recipe_key can use the (recipe_key, timestamp) index and joins
+    recipes by primary key. Before migration 004 the text recipe_id is used,
+    cast to an integer when joining recipes.
+    
+    Args:
+        alias: Alias of user_interactions in the query
+        join: Whether the expression is compared with recipes.recipe_id
+    """
+    if typed_recipe_key_available():
+        return f"{alias}.recipe_key"
+    return f"{alias}.recipe_id::integer" if join else f"{alias}.recipe_id"
+
+def validate_interaction_ids(user_id: str, recipe_id: str) -> bool:
+    """
+    Check that user and recipe IDs are present, fit their columns and hold no NUL
+    characters, which PostgreSQL text cannot store.
+    
+    Returns:
+        bool: True if the IDs can be written
+    """
+    for value in (user_id, recipe_id):
+        if not value or len(value) > INTERACTION_ID_MAX_LENGTH or "\x00" in value:
+            logger.warning(f"Invalid interaction ID: {value[:INTERACTION_ID_MAX_LENGTH]!r}")
+            return False
+    return True
+
+def validate_interaction(interaction_type: str, rating: Optional[float] = None) -> bool:
+    """
+    Check that an interaction type is known and that ratings are finite and between 0 and 5.
+    
+    Returns:
+        bool: True if the interaction can be recorded
+    """
+    # Validate interaction type
+    if interaction_type not in INTERACTION_TYPES:
+        logger.warning(f"Invalid interaction type: {interaction_type}")
+        return False
+    
+    # Validate rating
+    # NaN passes both comparisons and would poison recipe_rating_stats.rating_sum
+    if interaction_type == 'rating' and (rating is None or not math.isfinite(rating) or rating < 0 or rating > 5):
+        logger.warning(f"Invalid rating: {rating}")
+        return False
+    
+    return True
+
+@timed_query
 def record_interaction(user_id: str, recipe_id: str, interaction_type: str, rating: Optional[float] = None) -> bool:
     """
     Record a user interaction with a recipe.
@@ -24,70 +116,224 @@ def record_interaction(user_id: str, recipe_id: str, interaction_type: str, rati
         bool: True if interaction was recorded successfully
     """
     try:
-        # Validate interaction type
-        if interaction_type not in INTERACTION_TYPES:
-            logger.warning(f"Invalid interaction type: {interaction_type}")
+        if not validate_interaction(interaction_type, rating):
             return False
         
-        # Validate rating
-        if interaction_type == 'rating' and (rating is None or rating < 0 or rating > 5):
-            logger.warning(f"Invalid rating: {rating}")
-            return False
-        
-        # Check if the interaction already exists
-        check_query = """
-        SELECT interaction_id
-        FROM user_interactions
-        WHERE user_id = %(user_id)s
-          AND recipe_id = %(recipe_id)s
-          AND interaction_type = %(interaction_type)s
-        """
-        
-        existing = execute_query_single(check_query, {
+        key_params = {
             "user_id": user_id,
             "recipe_id": recipe_id,
             "interaction_type": interaction_type
-        })
+        }
         
-        if existing:
-            # Update existing interaction
-            update_query = """
-            UPDATE user_interactions
-            SET timestamp = NOW(),
-                rating = %(rating)s
-            WHERE interaction_id = %(interaction_id)s
-            """
+        with get_cursor() as cursor:
+            # Concurrent writes of one (user, recipe, type) would each miss the
+            # other's row, inserting it twice and counting a rating twice in
+            # recipe_rating_stats, which a trigger keeps in step (migrations/007)
+            execute_on_cursor(cursor, INTERACTION_KEY_LOCK, key_params)
             
-            execute_query(update_query, {
-                "interaction_id": existing["interaction_id"],
-                "rating": rating
-            })
-        else:
-            # Create new interaction
-            insert_query = """
-            INSERT INTO user_interactions
-            (user_id, recipe_id, interaction_type, rating, timestamp)
-            VALUES
-            (%(user_id)s, %(recipe_id)s, %(interaction_type)s, %(rating)s, NOW())
+            # Check if the interaction already exists
+            check_query = """
+            SELECT interaction_id
+            FROM user_interactions
+            WHERE user_id = %(user_id)s
+              AND recipe_id = %(recipe_id)s
+              AND interaction_type = %(interaction_type)s
             """
             
-            execute_query(insert_query, {
-                "user_id": user_id,
-                "recipe_id": recipe_id,
-                "interaction_type": interaction_type,
-                "rating": rating
-            })
+            rows = execute_on_cursor(cursor, check_query, key_params)
+            existing = rows[0] if rows else None
+            
+            if existing:
+                # Update existing interaction
+                write_query = """
+                UPDATE user_interactions
+                SET timestamp = NOW(),
+                    rating = %(rating)s
+                WHERE interaction_id = %(interaction_id)s
+                """
+                
+                write_params = {
+                    "interaction_id": existing["interaction_id"],
+                    "rating": rating
+                }
+            elif typed_recipe_key_available():
+                # Create new interaction, writing the recipe ID as text and as a key
+                write_query = """
+                INSERT INTO user_interactions
+                (user_id, recipe_id, recipe_key, interaction_type, rating, timestamp)
+                VALUES
+                (%(user_id)s, %(recipe_id)s, (SELECT r.recipe_id FROM recipes r WHERE r.recipe_id = %(recipe_key)s),
+                 %(interaction_type)s, %(rating)s, NOW())
+                """
+                
+                write_params = {
+                    **key_params,
+                    "recipe_key": int(recipe_id) if str(recipe_id).isdigit() else None,
+                    "rating": rating
+                }
+            else:
+                # Create new interaction
+                write_query = """
+                INSERT INTO user_interactions
+                (user_id, recipe_id, interaction_type, rating, timestamp)
+                VALUES
+                (%(user_id)s, %(recipe_id)s, %(interaction_type)s, %(rating)s, NOW())
+                """
+                
+                write_params = {
+                    **key_params,
+                    "rating": rating
+                }
+            
+            execute_on_cursor(cursor, write_query, write_params)
         
+        replica_router.record_write(user_id)
+        remember_interaction(user_id, recipe_id, interaction_type, rating,
+                             existing["interaction_id"] if existing else None)
         return True
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error recording interaction: {e}")
         return False
 
+@timed_query
+def record_interactions_batch(interactions: List[Dict[str, Any]]) -> bool:
+    """
+    Record a batch of validated interactions in a single statement.
+    
+    Like record_interaction, each (user, recipe, interaction type) keeps one row:
+    existing rows get the new timestamp and rating and the rest are inserted.
+    Rating changes reach recipe_rating_stats through the trigger on
+    user_interactions (migrations/007_rating_stats_trigger.sql).
+    
+    Args:
+        interactions: Interactions with user_id, recipe_id, interaction_type,
+            rating and age_seconds (time since the event was received), at most
+            one per (user, recipe, interaction type)
+        
+    Returns:
+        bool: True if the batch was recorded, False if it may succeed when retried
+        
+    Raises:
+        InteractionDataError: If the database rejected the contents of the batch
+    """
+    if not interactions:
+        return True
+    
+    try:
+        params = {
+            "user_ids": [str(item["user_id"]) for item in interactions],
+            "recipe_ids": [str(item["recipe_id"]) for item in interactions],
+            "interaction_types": [item["interaction_type"] for item in interactions],
+            "ratings": [item.get("rating") for item in interactions],
+            "ages": [float(item.get("age_seconds", 0)) for item in interactions]
+        }
+        
+        # Also write the integer recipe key once migration 004 has added it
+        key_column, key_value = "", ""
+        if typed_recipe_key_available():
+            key_column = ", recipe_key"
+            key_value = """,
+            (SELECT r.recipe_id FROM recipes r
+             WHERE r.recipe_id = CASE WHEN b.recipe_id ~ '^[0-9]+$' THEN b.recipe_id::integer END)"""
+        
+        query = f"""
+        WITH batch AS (
+            SELECT
+                user_id, recipe_id, interaction_type, rating,
+                NOW() - age_seconds * INTERVAL '1 second' as event_time
+            FROM unnest(
+                %(user_ids)s::text[], %(recipe_ids)s::text[], %(interaction_types)s::text[],
+                %(ratings)s::float[], %(ages)s::float[]
+            ) AS b(user_id, recipe_id, interaction_type, rating, age_seconds)
+        ),
+        updated AS (
+            UPDATE user_interactions ui
+            SET timestamp = b.event_time,
+                rating = b.rating
+            FROM batch b
+            WHERE ui.user_id = b.user_id
+              AND ui.recipe_id = b.recipe_id
+              AND ui.interaction_type = b.interaction_type
+            RETURNING ui.user_id, ui.recipe_id, ui.interaction_type
+        )
+        INSERT INTO user_interactions (user_id, recipe_id, interaction_type, rating, timestamp{key_column})
+        SELECT b.user_id, b.recipe_id, b.interaction_type, b.rating, b.event_time{key_value}
+        FROM batch b
+        WHERE NOT EXISTS (
+            SELECT 1 FROM updated u
+            WHERE u.user_id = b.user_id
+              AND u.recipe_id = b.recipe_id
+              AND u.interaction_type = b.interaction_type
+        )
+        """
+        
+        # Locked like record_interaction, so concurrent batches cannot both insert a key
+        execute_transaction([(INTERACTION_BATCH_LOCK, params), (query, params)])
+        
+        for user_id in {str(item["user_id"]) for item in interactions}:
+            replica_router.record_write(user_id)
+        for item in interactions:
+            remember_interaction(
+                item["user_id"], item["recipe_id"], item["interaction_type"], item.get("rating"),
+                timestamp=datetime.now() - timedelta(seconds=item.get("age_seconds", 0))
+            )
+        return True
+        
+    except DATA_ERRORS as e:
+        logger.error(f"Database rejected a batch of {len(interactions)} interactions: {e}")
+        raise InteractionDataError(str(e)) from e
+        
+    except Exception as e:
+        logger.error(f"Error recording {len(interactions)} interactions: {e}")
+        return False
+
+def collaborative_since() -> datetime:
+    """
+    Get the start of the interaction history used for user-based recommendations.
+    
+    Bounding the history lets the planner skip older monthly partitions of
+    user_interactions.
+    """
+    return datetime.now() - timedelta(days=COLLABORATIVE_LOOKBACK_DAYS)
+
+def remember_interaction(user_id: str, recipe_id: str, interaction_type: str, rating: Optional[float] = None,
+                         interaction_id: Optional[int] = None, timestamp: Optional[datetime] = None) -> None:
+    """
+    Add a recorded interaction to the user's cached recent history.
+    
+    Args:
+        user_id: User ID
+        recipe_id: Recipe ID
+        interaction_type: Type of interaction
+        rating: Optional rating value
+        interaction_id: ID of the row, if it already existed
+        timestamp: Time of the interaction, defaults to now
+    """
+    # The history query only returns interactions that join to a recipe
+    if not str(recipe_id).isdigit():
+        return
+    
+    user_history_cache.append(str(user_id), {
+        "interaction_id": interaction_id,
+        "user_id": str(user_id),
+        "recipe_id": str(recipe_id),
+        "interaction_type": interaction_type,
+        "rating": rating,
+        "timestamp": timestamp or datetime.now(),
+        "title": None
+    })
+
+@timed_query
 def get_user_recent_interactions(user_id: str, limit: int = 10, exclude_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     """
     Get recent interactions for a user.
     
+    Served from the user's cached history when possible. On a miss the user's
+    last USER_HISTORY_LENGTH interactions are read and cached.
+    
     Args:
         user_id: User ID
         limit: Maximum number of interactions
@@ -97,18 +343,44 @@ def get_user_recent_interactions(user_id: str, limit: int = 10, exclude_types: O
         List of recent interactions
     """
     try:
-        query = """
+        since = collaborative_since()
+        cached = user_history_cache.get(user_id, limit, exclude_types, since)
+        if cached is not None:
+            return cached
+        
+        query = f"""
         SELECT 
             ui.interaction_id, ui.user_id, ui.recipe_id, 
             ui.interaction_type, ui.rating, ui.timestamp,
             r.recipe_title as title
         FROM user_interactions ui
-        JOIN recipes r ON ui.recipe_id::integer = r.recipe_id
+        JOIN recipes r ON {interaction_recipe_column()} = r.recipe_id
         WHERE ui.user_id = %(user_id)s
+        AND ui.timestamp >= %(since)s
+        """
+        
+        order_limit = """
+        ORDER BY ui.timestamp DESC
+        LIMIT %(limit)s
         """
         
+        if user_history_cache.enabled and limit <= user_history_cache.length:
+            # Load the whole ring buffer, then filter it like the cache would
+            token = user_history_cache.read_token(user_id)
+            history = execute_read_query(query + order_limit, {
+                "user_id": user_id,
+                "since": since,
+                "limit": user_history_cache.length
+            }, user_id=user_id, statement="recent_interactions")
+            user_history_cache.put(user_id, history, token)
+            
+            rows = [row for row in history if row["interaction_type"] not in (exclude_types or [])]
+            if len(rows) >= limit or len(history) < user_history_cache.length:
+                return rows[:limit]
+        
         params = {
             "user_id": user_id,
+            "since": since,
             "limit": limit
         }
         
@@ -117,18 +389,15 @@ def get_user_recent_interactions(user_id: str, limit: int = 10, exclude_types: O
             exclude_list = ", ".join([f"'{exclude}'" for exclude in exclude_types])
             query += f" AND ui.interaction_type NOT IN ({exclude_list})"
         
-        # Order and limit
-        query += """
-        ORDER BY ui.timestamp DESC
-        LIMIT %(limit)s
-        """
-        
-        return execute_query(query, params)
+        return execute_read_query(query + order_limit, params, user_id=user_id, statement="recent_interactions")
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error getting recent interactions: {e}")
         return []
 
+@timed_query
 def find_similar_users(user_id: str, min_common_items: int = 2, limit: int = 10) -> List[Dict[str, Any]]:
     """
     Find users with similar interaction patterns.
@@ -143,12 +412,13 @@ def find_similar_users(user_id: str, min_common_items: int = 2, limit: int = 10)
     """
     try:
         # Find users who have interacted with the same items
-        query = """
+        query = f"""
         WITH user_items AS (
             -- Get items the target user has interacted with positively
-            SELECT recipe_id
+            SELECT {interaction_recipe_column("user_interactions", join=False)} as recipe_ref
             FROM user_interactions
             WHERE user_id = %(user_id)s
+            AND timestamp >= %(since)s
             AND interaction_type IN ('like', 'save', 'cook', 'rating')
             AND (interaction_type != 'rating' OR rating >= 3)
         ),
@@ -169,8 +439,9 @@ def find_similar_users(user_id: str, min_common_items: int = 2, limit: int = 10)
                     END
                 ) as similarity_score
             FROM user_interactions ui
-            JOIN user_items ON ui.recipe_id = user_items.recipe_id
+            JOIN user_items ON {interaction_recipe_column(join=False)} = user_items.recipe_ref
             WHERE ui.user_id != %(user_id)s
+            AND ui.timestamp >= %(since)s
             GROUP BY ui.user_id
             HAVING COUNT(*) >= %(min_common_items)s
             ORDER BY similarity_score DESC, common_items DESC
@@ -185,16 +456,20 @@ def find_similar_users(user_id: str, min_common_items: int = 2, limit: int = 10)
         
         params = {
             "user_id": user_id,
+            "since": collaborative_since(),
             "min_common_items": min_common_items,
             "limit": limit
         }
         
-        return execute_query(query, params)
+        return execute_read_query(query, params, user_id=user_id, statement="similar_users")
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error finding similar users: {e}")
         return []
 
+@timed_query
 def get_content_from_similar_users(similar_users: List[Dict[str, Any]], user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
     """
     Get content recommendations based on similar users' interactions.
@@ -225,7 +500,7 @@ def get_content_from_similar_users(similar_users: List[Dict[str, Any]], user_id:
         user_weights_json = json.dumps(user_weights)
         
         # Query for recommendations from similar users
-        query = """
+        query = f"""
         WITH user_weights AS (
             SELECT 
                 user_id, 
@@ -235,14 +510,15 @@ def get_content_from_similar_users(similar_users: List[Dict[str, Any]], user_id:
         ),
         user_items AS (
             -- Items the target user has already interacted with
-            SELECT DISTINCT recipe_id
+            SELECT DISTINCT {interaction_recipe_column("user_interactions")} as recipe_key
             FROM user_interactions
             WHERE user_id = %(user_id)s
+            AND timestamp >= %(since)s
         ),
         weighted_recommendations AS (
             -- Get recommendations from similar users
             SELECT 
-                ui.recipe_id,
+                r.recipe_id::text as recipe_id,
                 r.recipe_title as title,
                 -- Calculate weighted score
                 SUM(
@@ -258,13 +534,14 @@ def get_content_from_similar_users(similar_users: List[Dict[str, Any]], user_id:
                 ) as score
             FROM user_interactions ui
             JOIN user_weights uw ON ui.user_id = uw.user_id
-            JOIN recipes r ON ui.recipe_id::integer = r.recipe_id
-            WHERE NOT EXISTS (
+            JOIN recipes r ON {interaction_recipe_column()} = r.recipe_id
+            WHERE ui.timestamp >= %(since)s
+            AND NOT EXISTS (
                 -- Exclude items the user has already interacted with
                 SELECT 1 FROM user_items
-                WHERE user_items.recipe_id = ui.recipe_id
+                WHERE user_items.recipe_key = r.recipe_id
             )
-            GROUP BY ui.recipe_id, r.recipe_title
+            GROUP BY r.recipe_id, r.recipe_title
             ORDER BY score DESC
             LIMIT %(limit)s
         )
@@ -278,15 +555,146 @@ def get_content_from_similar_users(similar_users: List[Dict[str, Any]], user_id:
         params = {
             "user_weights": user_weights_json,
             "user_id": user_id,
+            "since": collaborative_since(),
             "limit": limit
         }
         
-        return execute_query(query, params)
+        return execute_read_query(query, params, user_id=user_id, statement="similar_users_content")
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error getting content from similar users: {e}")
         return []
 
+def get_trending_diet_column(dietary_restriction: str) -> str:
+    """Map a dietary restriction to its recipe_diet_attributes column for trending filters."""
+    if dietary_restriction.lower() == "vegan":
+        return "vegan"
+    elif dietary_restriction.lower() == "vegetarian":
+        return "vegetarian"
+    elif dietary_restriction.lower() == "pescetarian":
+        return "pescetarian"
+    return dietary_restriction.lower()
+
+def _build_recipe_filters(cuisine: Optional[str], dietary_restriction: Optional[str], 
+                         params: Dict[str, Any]) -> str:
+    """
+    Build the WHERE clause for cuisine and dietary filters on recipes aliased as r.
+    
+    Args:
+        cuisine: Optional cuisine filter
+        dietary_restriction: Optional dietary restriction filter
+        params: Query parameters, updated in place
+        
+    Returns:
+        WHERE clause, or an empty string if no filters apply
+    """
+    conditions = []
+    column = get_trending_diet_column(dietary_restriction) if dietary_restriction else None
+    
+    # Use the facet index when it narrows the filters down to a short ID list
+    candidate_ids = inline_candidate_ids(
+        cuisines=[cuisine] if cuisine else None,
+        partial_cuisine=True,
+        diets=[column] if column else None
+    )
+    if candidate_ids is not None:
+        params["candidate_ids"] = candidate_ids
+        return "\n        WHERE r.recipe_id = ANY(%(candidate_ids)s)"
+    
+    # Add cuisine filter if provided
+    if cuisine:
+        conditions.append("(r.region ILIKE %(cuisine)s OR r.sub_region ILIKE %(cuisine)s)")
+        params["cuisine"] = f"%{cuisine}%"
+    
+    # Add dietary filter if provided
+    if dietary_restriction:
+        conditions.append(f"""
+            EXISTS (
+                SELECT 1 FROM recipe_diet_attributes rda
+                WHERE rda.recipe_id = r.recipe_id
+                AND rda.{column} = TRUE)""")
+    
+    if not conditions:
+        return ""
+    
+    return "\n        WHERE " + " AND ".join(conditions)
+
+def build_trending_query(time_window: str, limit: int, cuisine: Optional[str] = None,
+                         dietary_restriction: Optional[str] = None) -> tuple:
+    """
+    Build the trending recipes query.
+    
+    Args:
+        time_window: Time window for trending items (day, week, month)
+        limit: Maximum number of recommendations
+        cuisine: Optional cuisine filter
+        dietary_restriction: Optional dietary restriction filter
+        
+    Returns:
+        Tuple of (query, params)
+    """
+    # Calculate timestamp for the time window
+    now = datetime.now()
+    if time_window == "day":
+        since = now - timedelta(days=1)
+    elif time_window == "week":
+        since = now - timedelta(weeks=1)
+    elif time_window == "month":
+        since = now - timedelta(days=30)
+    else:
+        since = now - timedelta(days=7)  # Default to week
+    
+    # Build the query
+    query = f"""
+    WITH interaction_counts AS (
+        -- Count interactions by recipe
+        SELECT 
+            {interaction_recipe_column()} as recipe_key,
+            COUNT(*) as interaction_count,
+            -- Calculate weighted score based on interaction types
+            SUM(
+                CASE 
+                    WHEN ui.interaction_type = 'rating' THEN ui.rating / 5.0
+                    WHEN ui.interaction_type = 'cook' THEN 1.0
+                    WHEN ui.interaction_type = 'save' THEN 0.8
+                    WHEN ui.interaction_type = 'like' THEN 0.6
+                    WHEN ui.interaction_type = 'view' THEN 0.2
+                    ELSE 0.1
+                END
+            ) as weighted_score
+        FROM user_interactions ui
+        WHERE ui.timestamp >= %(since)s
+        GROUP BY 1
+    )
+    SELECT 
+        r.recipe_id as id,
+        r.recipe_title as title,
+        ROUND(ic.weighted_score::numeric / ic.interaction_count, 2) as score
+    FROM interaction_counts ic
+    JOIN recipes r ON ic.recipe_key = r.recipe_id
+    """
+    
+    params = {
+        "since": since,
+        "limit": limit
+    }
+    
+    # Add cuisine and dietary filters if provided
+    query += _build_recipe_filters(cuisine, dietary_restriction, params)
+    
+    # Add ordering and limit
+    query += """
+    ORDER BY 
+        ic.weighted_score DESC,
+        ic.interaction_count DESC
+    LIMIT %(limit)s
+    """
+    
+    return query, params
+
+@timed_query
 def get_trending_recipes(time_window: str = "day", limit: int = 10, cuisine: Optional[str] = None, 
                         dietary_restriction: Optional[str] = None) -> List[Dict[str, Any]]:
     """
@@ -302,95 +710,467 @@ def get_trending_recipes(time_window: str = "day", limit: int = 10, cuisine: Opt
         List of trending recipes
     """
     try:
-        # Calculate timestamp for the time window
-        now = datetime.now()
-        if time_window == "day":
-            since = now - timedelta(days=1)
-        elif time_window == "week":
-            since = now - timedelta(weeks=1)
-        elif time_window == "month":
-            since = now - timedelta(days=30)
-        else:
-            since = now - timedelta(days=7)  # Default to week
-        
-        # Build the query
+        query, params = build_trending_query(time_window, limit, cuisine, dietary_restriction)
+        return execute_read_query(query, params, statement="trending")
+        
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting trending recipes: {e}")
+        return []
+
+@timed_query
+async def get_trending_recipes_async(time_window: str = "day", limit: int = 10, cuisine: Optional[str] = None,
+                                     dietary_restriction: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Async variant of get_trending_recipes."""
+    try:
+        query, params = build_trending_query(time_window, limit, cuisine, dietary_restriction)
+        return await execute_read_query_async(query, params, statement="trending")
+        
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting trending recipes: {e}")
+        return []
+
+@timed_query
+def get_recipe_titles(recipe_ids: List[int], cuisine: Optional[str] = None, 
+                      dietary_restriction: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get titles for a set of recipes, applying the same filters as trending recipes.
+    
+    Args:
+        recipe_ids: Recipe IDs to look up
+        cuisine: Optional cuisine filter
+        dietary_restriction: Optional dietary restriction filter
+        
+    Returns:
+        List of recipes with id and title, in no particular order
+    """
+    try:
+        if not recipe_ids:
+            return []
+        
         query = """
-        WITH interaction_counts AS (
-            -- Count interactions by recipe
-            SELECT 
-                ui.recipe_id,
-                COUNT(*) as interaction_count,
-                -- Calculate weighted score based on interaction types
-                SUM(
-                    CASE 
-                        WHEN ui.interaction_type = 'rating' THEN ui.rating / 5.0
-                        WHEN ui.interaction_type = 'cook' THEN 1.0
-                        WHEN ui.interaction_type = 'save' THEN 0.8
-                        WHEN ui.interaction_type = 'like' THEN 0.6
-                        WHEN ui.interaction_type = 'view' THEN 0.2
-                        ELSE 0.1
-                    END
-                ) as weighted_score
-            FROM user_interactions ui
-            WHERE ui.timestamp >= %(since)s
-            GROUP BY ui.recipe_id
-        )
         SELECT 
             r.recipe_id as id,
-            r.recipe_title as title,
-            ROUND(ic.weighted_score::numeric / ic.interaction_count, 2) as score
-        FROM interaction_counts ic
-        JOIN recipes r ON ic.recipe_id::integer = r.recipe_id
+            r.recipe_title as title
+        FROM recipes r
+        JOIN unnest(%(recipe_ids)s::integer[]) AS ids(recipe_id) ON ids.recipe_id = r.recipe_id
+        """
+        
+        params = {"recipe_ids": list(recipe_ids)}
+        query += _build_recipe_filters(cuisine, dietary_restriction, params)
+        
+        return execute_read_query(query, params, statement="recipe_titles")
+        
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting recipe titles: {e}")
+        return []
+
+@timed_query
+def get_recipe_popularity_scores() -> List[Dict[str, Any]]:
+    """
+    Get persisted decayed popularity scores.
+    
+    Returns:
+        List of rows with recipe_id, score and age_seconds since the score was written
+    """
+    try:
+        query = """
+        SELECT 
+            recipe_id,
+            score,
+            EXTRACT(EPOCH FROM (NOW() - updated_at)) as age_seconds
+        FROM recipe_popularity
+        """
+        
+        return execute_query(query)
+        
+    except Exception as e:
+        logger.error(f"Error getting recipe popularity scores: {e}")
+        return []
+
+@timed_query
+def add_recipe_popularity_scores(recipe_ids: List[int], scores: List[float], decay_rate: float) -> bool:
+    """
+    Add locally accumulated popularity to the persisted scores.
+    
+    The stored score is decayed to the current time before the increment is added,
+    so several processes can flush their own increments without overwriting each other.
+    
+    Args:
+        recipe_ids: Recipe IDs
+        scores: Score increments, already decayed to the current time
+        decay_rate: Decay rate per second
+        
+    Returns:
+        bool: True if the scores were written successfully
+    """
+    try:
+        if not recipe_ids:
+            return True
+        
+        query = """
+        INSERT INTO recipe_popularity AS rp (recipe_id, score, updated_at)
+        SELECT u.recipe_id, u.score, NOW()
+        FROM unnest(%(recipe_ids)s::integer[], %(scores)s::float[]) AS u(recipe_id, score)
+        WHERE EXISTS (SELECT 1 FROM recipes r WHERE r.recipe_id = u.recipe_id)
+        ON CONFLICT (recipe_id) DO UPDATE SET
+            score = rp.score * EXP(-%(decay_rate)s * EXTRACT(EPOCH FROM (NOW() - rp.updated_at))) + EXCLUDED.score,
+            updated_at = NOW()
+        """
+        
+        execute_query(query, {
+            "recipe_ids": list(recipe_ids),
+            "scores": list(scores),
+            "decay_rate": decay_rate
+        })
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error saving recipe popularity scores: {e}")
+        return False
+
+@timed_query
+def seed_recipe_popularity_scores(decay_rate: float, horizon_seconds: float) -> bool:
+    """
+    Seed persisted popularity scores from the raw interaction history.
+    
+    Only used when no scores have been persisted yet; existing rows are left untouched.
+    
+    Args:
+        decay_rate: Decay rate per second
+        horizon_seconds: Ignore interactions older than this
+        
+    Returns:
+        bool: True if the seed query ran successfully
+    """
+    try:
+        recipe_join = "ui.recipe_key = r.recipe_id" if typed_recipe_key_available() else "ui.recipe_id = r.recipe_id::text"
+        query = f"""
+        INSERT INTO recipe_popularity (recipe_id, score, updated_at)
+        SELECT 
+            r.recipe_id,
+            SUM(
+                CASE 
+                    WHEN ui.interaction_type = 'rating' THEN ui.rating / 5.0
+                    WHEN ui.interaction_type = 'cook' THEN 1.0
+                    WHEN ui.interaction_type = 'save' THEN 0.8
+                    WHEN ui.interaction_type = 'like' THEN 0.6
+                    WHEN ui.interaction_type = 'view' THEN 0.2
+                    ELSE 0.1
+                END * EXP(-%(decay_rate)s * EXTRACT(EPOCH FROM (NOW() - ui.timestamp)))
+            ) as score,
+            NOW()
+        FROM user_interactions ui
+        JOIN recipes r ON {recipe_join}
+        WHERE ui.timestamp >= NOW() - make_interval(secs => %(horizon)s)
+        GROUP BY r.recipe_id
+        ON CONFLICT (recipe_id) DO NOTHING
+        """
+        
+        execute_query(query, {"decay_rate": decay_rate, "horizon": horizon_seconds})
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error seeding recipe popularity scores: {e}")
+        return False
+
+@timed_query
+def get_active_users(since_days: int = 7, limit: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Get the most active users over a recent period.
+    
+    Args:
+        since_days: Number of days to look back
+        limit: Maximum number of users
+        
+    Returns:
+        List of users with their interaction counts, most active first
+    """
+    try:
+        query = """
+        SELECT 
+            user_id,
+            COUNT(*) as interaction_count
+        FROM user_interactions
+        WHERE timestamp >= %(since)s
+        GROUP BY user_id
+        ORDER BY interaction_count DESC
+        LIMIT %(limit)s
         """
         
         params = {
-            "since": since,
+            "since": datetime.now() - timedelta(days=since_days),
             "limit": limit
         }
         
-        # Add cuisine filter if provided
-        if cuisine:
-            query += """
-            WHERE (r.region ILIKE %(cuisine)s OR r.sub_region ILIKE %(cuisine)s)
-            """
-            params["cuisine"] = f"%{cuisine}%"
+        return execute_read_query(query, params)
         
-        # Add dietary filter if provided
-        if dietary_restriction:
-            # We need to join with recipe_diet_attributes
-            if "WHERE" in query:
-                query += " AND "
-            else:
-                query += " WHERE "
-            
-            query += """
-            EXISTS (
-                SELECT 1 FROM recipe_diet_attributes rda
-                WHERE rda.recipe_id = r.recipe_id
-                AND rda."""
-            
-            # Add the specific dietary restriction
-            if dietary_restriction.lower() == "vegan":
-                query += "vegan = TRUE"
-            elif dietary_restriction.lower() == "vegetarian":
-                query += "vegetarian = TRUE"
-            elif dietary_restriction.lower() == "pescetarian":
-                query += "pescetarian = TRUE"
-            else:
-                query += f"{dietary_restriction.lower()} = TRUE"
-            
-            query += ")"
+    except Exception as e:
+        logger.error(f"Error getting active users: {e}")
+        return []
+
+@timed_query
+def save_user_recommendations(user_id: str, items: List[List[Any]]) -> bool:
+    """
+    Store a precomputed recommendation list for a user.
+    
+    Args:
+        user_id: User ID
+        items: Compact [id, title, score] entries, best first
         
-        # Add ordering and limit
-        query += """
-        ORDER BY 
-            ic.weighted_score DESC,
-            ic.interaction_count DESC
-        LIMIT %(limit)s
+    Returns:
+        bool: True if the list was stored successfully
+    """
+    try:
+        import json
+        
+        query = """
+        INSERT INTO user_recommendations (user_id, items, computed_at)
+        VALUES (%(user_id)s, %(items)s::jsonb, NOW())
+        ON CONFLICT (user_id) DO UPDATE SET
+            items = EXCLUDED.items,
+            computed_at = EXCLUDED.computed_at
         """
         
-        return execute_query(query, params)
+        execute_query(query, {"user_id": user_id, "items": json.dumps(items)})
+        return True
         
     except Exception as e:
-        logger.error(f"Error getting trending recipes: {e}")
-        return []
\ No newline at end of file
+        logger.error(f"Error saving recommendations for user {user_id}: {e}")
+        return False
+
+# Precomputed list of a user with the recipes they have interacted with since
+PRECOMPUTED_RECOMMENDATIONS_QUERY = """
+SELECT 
+    ur.items,
+    EXTRACT(EPOCH FROM (NOW() - ur.computed_at)) as age_seconds,
+    ARRAY(
+        SELECT ui.recipe_id
+        FROM user_interactions ui
+        WHERE ui.user_id = ur.user_id
+        AND ui.timestamp >= ur.computed_at
+    ) as interacted_ids
+FROM user_recommendations ur
+WHERE ur.user_id = %(user_id)s
+"""
+
+@timed_query
+def get_user_recommendations(user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a user's precomputed recommendation list.
+    
+    Args:
+        user_id: User ID
+        
+    Returns:
+        Row with items, age_seconds and the recipe IDs the user has interacted
+        with since the list was computed, or None if there is no list
+    """
+    try:
+        return execute_read_query_single(
+            PRECOMPUTED_RECOMMENDATIONS_QUERY, {"user_id": user_id}, user_id=user_id, statement="precomputed_recommendations"
+        )
+        
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting precomputed recommendations for user {user_id}: {e}")
+        return None
+
+@timed_query
+async def get_user_recommendations_async(user_id: str) -> Optional[Dict[str, Any]]:
+    """Async variant of get_user_recommendations."""
+    try:
+        return await execute_read_query_single_async(
+            PRECOMPUTED_RECOMMENDATIONS_QUERY, {"user_id": user_id}, user_id=user_id, statement="precomputed_recommendations"
+        )
+        
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting precomputed recommendations for user {user_id}: {e}")
+        return None
+
+# Monthly partitions of user_interactions are named after the month they hold
+INTERACTION_PARTITION_PREFIX = "user_interactions_p"
+
+# Adds interactions to the per-day rollup; {source} and {condition} select the rows
+INTERACTION_ROLLUP = """
+INSERT INTO user_interaction_daily AS d
+    (day, user_id, recipe_id, interaction_type, interaction_count, rating_count, rating_sum)
+SELECT
+    ui.timestamp::date, ui.user_id, ui.recipe_id, ui.interaction_type,
+    COUNT(*), COUNT(ui.rating), COALESCE(SUM(ui.rating), 0)
+FROM {source} ui
+WHERE {condition}
+GROUP BY ui.timestamp::date, ui.user_id, ui.recipe_id, ui.interaction_type
+ON CONFLICT (day, user_id, recipe_id, interaction_type) DO UPDATE
+SET interaction_count = d.interaction_count + EXCLUDED.interaction_count,
+    rating_count = d.rating_count + EXCLUDED.rating_count,
+    rating_sum = d.rating_sum + EXCLUDED.rating_sum
+"""
+
+# Deletes expired interactions and rolls up exactly the rows it deleted, in one
+# statement: a concurrent run skips rows already deleted instead of counting them again
+EXPIRED_INTERACTION_ROLLUP = """
+WITH expired AS (
+    DELETE FROM user_interactions
+    WHERE timestamp < %(cutoff)s
+    RETURNING timestamp, user_id, recipe_id, interaction_type, rating
+)
+""" + INTERACTION_ROLLUP.format(source="expired", condition="TRUE")
+
+# Takes a partition's ratings out of recipe_rating_stats before it is dropped;
+# dropping a partition does not fire the row trigger that handles deleted rows
+PARTITION_RATING_STATS_EXPIRY = """
+UPDATE recipe_rating_stats rs
+SET rating_count = rs.rating_count - expired.rating_count,
+    rating_sum = rs.rating_sum - expired.rating_sum,
+    updated_at = NOW()
+FROM (
+    SELECT recipe_key, COUNT(*) as rating_count, SUM(rating) as rating_sum
+    FROM {source}
+    WHERE interaction_type = 'rating' AND rating IS NOT NULL AND recipe_key IS NOT NULL
+    GROUP BY recipe_key
+) expired
+WHERE rs.recipe_id = expired.recipe_key
+"""
+
+def interactions_partitioned() -> bool:
+    """
+    Check whether user_interactions is a partitioned table.
+    
+    Returns:
+        bool: True once migrations/003_partition_user_interactions.sql is applied
+    """
+    try:
+        row = execute_query_single("""
+        SELECT relkind = 'p' as partitioned
+        FROM pg_class
+        WHERE oid = to_regclass('user_interactions')
+        """)
+        return bool(row and row["partitioned"])
+        
+    except Exception as e:
+        logger.error(f"Error checking user_interactions partitioning: {e}")
+        return False
+
+@timed_query
+def get_interaction_partitions() -> List[Dict[str, Any]]:
+    """
+    Get the monthly partitions of user_interactions.
+    
+    Returns:
+        List of partitions with name and month (first day), oldest first
+    """
+    try:
+        query = """
+        SELECT c.relname as name
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'user_interactions'::regclass
+        AND c.relname LIKE %(pattern)s
+        ORDER BY c.relname
+        """
+        
+        partitions = []
+        for row in execute_query(query, {"pattern": f"{INTERACTION_PARTITION_PREFIX}%"}):
+            suffix = row["name"][len(INTERACTION_PARTITION_PREFIX):]
+            if len(suffix) == 6 and suffix.isdigit():
+                partitions.append({
+                    "name": row["name"],
+                    "month": datetime(int(suffix[:4]), int(suffix[4:]), 1)
+                })
+        return partitions
+        
+    except Exception as e:
+        logger.error(f"Error getting interaction partitions: {e}")
+        return []
+
+@timed_query
+def create_interaction_partition(month: datetime) -> bool:
+    """
+    Create the partition of user_interactions for a month if it does not exist.
+    
+    Args:
+        month: Any time within the month
+        
+    Returns:
+        bool: True if the partition exists afterwards
+    """
+    start = datetime(month.year, month.month, 1)
+    end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    name = f"{INTERACTION_PARTITION_PREFIX}{start:%Y%m}"
+    
+    try:
+        execute_query(f"""
+        CREATE TABLE IF NOT EXISTS {name} PARTITION OF user_interactions
+        FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')
+        """)
+        return True
+        
+    except Exception as e:
+        # Fails if rows for the month already landed in the default partition
+        logger.error(f"Error creating interaction partition {name}: {e}")
+        return False
+
+@timed_query
+def rollup_interaction_partition(name: str) -> bool:
+    """
+    Summarise a monthly partition into user_interaction_daily and drop it.
+    
+    The partition's ratings are subtracted from recipe_rating_stats in the same
+    transaction, which holds off writes to the partition until it is dropped.
+    
+    Args:
+        name: Partition name, as returned by get_interaction_partitions
+        
+    Returns:
+        bool: True if the partition was rolled up and dropped
+    """
+    try:
+        statements = [
+            (f"LOCK TABLE {name} IN EXCLUSIVE MODE", None),
+            (INTERACTION_ROLLUP.format(source=name, condition="TRUE"), None)
+        ]
+        if rating_stats_available() and typed_recipe_key_available():
+            statements.append((PARTITION_RATING_STATS_EXPIRY.format(source=name), None))
+        statements += [
+            (f"ALTER TABLE user_interactions DETACH PARTITION {name}", None),
+            (f"DROP TABLE {name}", None)
+        ]
+        execute_transaction(statements)
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error rolling up interaction partition {name}: {e}")
+        return False
+
+@timed_query
+def rollup_interactions_before(cutoff: datetime) -> bool:
+    """
+    Summarise interactions older than cutoff into user_interaction_daily and delete them.
+    
+    Used for the rows left in partly expired or default partitions, and for the
+    whole table before it is partitioned. The trigger of
+    migrations/007_rating_stats_trigger.sql takes the deleted ratings out of
+    recipe_rating_stats.
+    
+    Args:
+        cutoff: Interactions before this time are rolled up
+        
+    Returns:
+        bool: True if the rollup succeeded
+    """
+    try:
+        execute_query(EXPIRED_INTERACTION_ROLLUP, {"cutoff": cutoff})
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error rolling up interactions before {cutoff}: {e}")
+        return False
@@ -1,14 +1,37 @@
 """
 Vector-based search queries using recipe embeddings.
 """
+import asyncio
+import contextvars
 import logging
-from typing import List, Dict, Any, Optional, Union
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Union
 import numpy as np
-from config.db import execute_query, execute_query_single
-from config.config import MIN_SIMILARITY_SCORE
+from config.db import execute_query, execute_query_single, execute_read_query, POOL_TIMEOUTS
+from config.async_db import execute_read_query_async
+from config.config import (
+    MIN_SIMILARITY_SCORE, MIN_COMMON_ITEMS, FACET_INLINE_LIMIT,
+    HYBRID_RRF_K, HYBRID_CANDIDATE_LIMIT, HYBRID_SEARCH_WORKERS
+)
+from indexes.facets import get_facet_index, inline_candidate_ids
+from models.queries_recipe import HYDRATION_FIELDS, get_recipes_by_ids, text_search_available
+from monitoring.metrics import timed_query
 
 logger = logging.getLogger(__name__)
 
+# recipe_diet_attributes columns for the dietary filters of search and quick recipes
+DIETARY_FILTER_COLUMNS = {
+    "vegan": "vegan",
+    "vegetarian": "lacto_vegetarian",
+    "pescetarian": "pescetarian"
+}
+
+# Runs the lexical and vector retrievals of hybrid searches side by side
+_search_executor = ThreadPoolExecutor(max_workers=HYBRID_SEARCH_WORKERS, thread_name_prefix="hybrid-search")
+
+@timed_query
 def find_similar_content(embedding: List[float], exclude_ids: List[int] = None, limit: int = 10) -> List[Dict[str, Any]]:
     """
     Find recipes similar to the provided embedding vector.
@@ -53,15 +76,151 @@ def find_similar_content(embedding: List[float], exclude_ids: List[int] = None,
         LIMIT %(limit)s
         """
         
-        results = execute_query(query, params)
+        results = execute_read_query(query, params)
         
         # Return the results with scores
         return results
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error finding similar content: {e}")
         return []
 
+_query_generator = None
+_query_generator_lock = threading.Lock()
+
+def get_query_embedding(query_text: str) -> Optional[List[float]]:
+    """
+    Embed search query text with a generator shared by all searches.
+    
+    Args:
+        query_text: Text to search for
+        
+    Returns:
+        Embedding vector, or None if it could not be generated
+    """
+    global _query_generator
+    if _query_generator is None:
+        # Import here to avoid circular import
+        from embedding.embeddings import EmbeddingGenerator
+        with _query_generator_lock:
+            if _query_generator is None:
+                _query_generator = EmbeddingGenerator()
+    
+    mock_recipe = {
+        "recipe_title": query_text,
+        "instructions": query_text,
+        "ingredients": []
+    }
+    return _query_generator.generate_recipe_embedding(mock_recipe)
+
+def _facet_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Translate search endpoint filters to FacetIndex.match keyword arguments."""
+    filters = filters or {}
+    dietary = (filters.get("dietary") or "").lower()
+    calories = filters.get("calories") or {}
+    return {
+        "cuisines": [filters["cuisine"]] if filters.get("cuisine") else None,
+        "diets": [DIETARY_FILTER_COLUMNS[dietary]] if dietary in DIETARY_FILTER_COLUMNS else None,
+        "max_time": filters.get("max_time") or None,
+        "min_calories": calories.get("min"),
+        "max_calories": calories.get("max")
+    }
+
+def _sql_filters(filters: Optional[Dict[str, Any]]) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Build SQL conditions on recipes aliased as r for search endpoint filters.
+    
+    Returns:
+        Tuple of (conditions, parameters)
+    """
+    filter_clauses = []
+    params = {}
+    if not filters:
+        return filter_clauses, params
+    
+    if "cuisine" in filters and filters["cuisine"]:
+        filter_clauses.append("(r.region = %(cuisine)s OR r.sub_region = %(cuisine)s)")
+        params["cuisine"] = filters["cuisine"]
+        
+    if "dietary" in filters and filters["dietary"]:
+        column_name = DIETARY_FILTER_COLUMNS.get(filters["dietary"].lower())
+        if column_name:
+            filter_clauses.append(f"EXISTS (SELECT 1 FROM recipe_diet_attributes rda WHERE rda.recipe_id = r.recipe_id AND rda.{column_name} = TRUE)")
+    
+    if "max_time" in filters and filters["max_time"]:
+        filter_clauses.append("(r.total_time <= %(max_time)s OR (r.total_time IS NULL AND (r.prep_time + COALESCE(r.cook_time, 0)) <= %(max_time)s))")
+        params["max_time"] = filters["max_time"]
+        
+    if "calories" in filters:
+        if "min" in filters["calories"] and filters["calories"]["min"] is not None:
+            filter_clauses.append("r.calories >= %(min_calories)s")
+            params["min_calories"] = filters["calories"]["min"]
+        if "max" in filters["calories"] and filters["calories"]["max"] is not None:
+            filter_clauses.append("r.calories <= %(max_calories)s")
+            params["max_calories"] = filters["calories"]["max"]
+    
+    return filter_clauses, params
+
+def build_text_embedding_query(embedding: List[float], limit: int,
+                               filters: Dict[str, Any] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Build the query ranking recipes by similarity to a query embedding.
+    
+    Args:
+        embedding: Embedding of the query text
+        limit: Maximum number of results
+        filters: Optional filters to apply to the search
+        
+    Returns:
+        Tuple of (query, params), or None if no recipe matches the filters
+    """
+    # Build filter clauses
+    filter_clauses, params = _sql_filters(filters)
+    params["limit"] = limit
+    
+    if filters:
+        # Resolve the filters from the facet index when it narrows them down enough
+        candidate_ids = inline_candidate_ids(**_facet_filters(filters))
+        if candidate_ids is not None:
+            if not candidate_ids:
+                return None
+            filter_clauses = ["r.recipe_id = ANY(%(candidate_ids)s)"]
+            params["candidate_ids"] = candidate_ids
+    
+    # Convert embedding for PostgreSQL
+    pg_vector = f"[{', '.join(map(str, embedding))}]"
+    params["embedding"] = pg_vector
+    params["min_score"] = MIN_SIMILARITY_SCORE
+    
+    # Build the WHERE clause
+    where_clause = " AND ".join(filter_clauses) if filter_clauses else "1=1"
+    
+    # Query using cosine similarity
+    query = f"""
+    SELECT 
+        r.recipe_id as id,
+        r.recipe_title as title,
+        r.region,
+        r.sub_region,
+        r.image_url,
+        r.total_time,
+        r.prep_time,
+        r.cook_time,
+        r.calories,
+        1 - (re.embedding <=> %(embedding)s::vector) as score
+    FROM recipe_embeddings re
+    JOIN recipes r ON re.recipe_id = r.recipe_id
+    WHERE {where_clause}
+    AND 1 - (re.embedding <=> %(embedding)s::vector) >= %(min_score)s
+    ORDER BY score DESC
+    LIMIT %(limit)s
+    """
+    
+    return query, params
+
+@timed_query
 def search_by_text_embedding(query_text: str, limit: int = 10, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
     """
     Search recipes by generating an embedding from query text.
@@ -75,93 +234,263 @@ def search_by_text_embedding(query_text: str, limit: int = 10, filters: Dict[str
         List of similar recipes
     """
     try:
-        # Import here to avoid circular import
-        from embedding.embeddings import EmbeddingGenerator
-        
         # Generate embedding for the query text
-        generator = EmbeddingGenerator()
-        mock_recipe = {
-            "recipe_title": query_text,
-            "instructions": query_text,
-            "ingredients": []
-        }
-        embedding = generator.generate_recipe_embedding(mock_recipe)
+        embedding = get_query_embedding(query_text)
         
         if not embedding:
             logger.error(f"Failed to generate embedding for query: {query_text}")
             return []
         
-        # Build filter clauses
-        filter_clauses = []
-        params = {"limit": limit}
-        
-        if filters:
-            if "cuisine" in filters and filters["cuisine"]:
-                filter_clauses.append("(r.region = %(cuisine)s OR r.sub_region = %(cuisine)s)")
-                params["cuisine"] = filters["cuisine"]
-                
-            if "dietary" in filters and filters["dietary"]:
-                dietary = filters["dietary"].lower()
-                if dietary == "vegan":
-                    filter_clauses.append("EXISTS (SELECT 1 FROM recipe_diet_attributes rda WHERE rda.recipe_id = r.recipe_id AND rda.vegan = TRUE)")
-                elif dietary == "vegetarian":
-                    filter_clauses.append("EXISTS (SELECT 1 FROM recipe_diet_attributes rda WHERE rda.recipe_id = r.recipe_id AND rda.lacto_vegetarian = TRUE)")
-                elif dietary == "pescetarian":
-                    filter_clauses.append("EXISTS (SELECT 1 FROM recipe_diet_attributes rda WHERE rda.recipe_id = r.recipe_id AND rda.pescetarian = TRUE)")
-            
-            if "max_time" in filters and filters["max_time"]:
-                filter_clauses.append("(r.total_time <= %(max_time)s OR (r.total_time IS NULL AND (r.prep_time + COALESCE(r.cook_time, 0)) <= %(max_time)s))")
-                params["max_time"] = filters["max_time"]
-                
-            if "calories" in filters:
-                if "min" in filters["calories"] and filters["calories"]["min"] is not None:
-                    filter_clauses.append("r.calories >= %(min_calories)s")
-                    params["min_calories"] = filters["calories"]["min"]
-                if "max" in filters["calories"] and filters["calories"]["max"] is not None:
-                    filter_clauses.append("r.calories <= %(max_calories)s")
-                    params["max_calories"] = filters["calories"]["max"]
-        
-        # Convert embedding for PostgreSQL
-        pg_vector = f"[{', '.join(map(str, embedding))}]"
-        params["embedding"] = pg_vector
-        params["min_score"] = MIN_SIMILARITY_SCORE
+        built = build_text_embedding_query(embedding, limit, filters)
+        if built is None:
+            return []
         
-        # Build the WHERE clause
-        where_clause = " AND ".join(filter_clauses) if filter_clauses else "1=1"
+        return execute_read_query(*built, statement="vector_search")
+    
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching by text embedding: {e}")
+        return []
+
+@timed_query
+async def search_by_text_embedding_async(query_text: str, limit: int = 10,
+                                         filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """
+    Async variant of search_by_text_embedding.
+    
+    The query is embedded in a worker thread so the event loop keeps serving
+    other requests meanwhile.
+    """
+    try:
+        embedding = await asyncio.to_thread(get_query_embedding, query_text)
+        
+        if not embedding:
+            logger.error(f"Failed to generate embedding for query: {query_text}")
+            return []
+        
+        built = build_text_embedding_query(embedding, limit, filters)
+        if built is None:
+            return []
+        
+        return await execute_read_query_async(*built, statement="vector_search")
+    
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching by text embedding: {e}")
+        return []
+
+@timed_query
+def get_lexical_ranking(query_text: str, filter_clauses: List[str], params: Dict[str, Any], limit: int) -> List[int]:
+    """
+    Rank recipe IDs by full-text relevance, as search_recipes does.
+    
+    Args:
+        query_text: Text to search for
+        filter_clauses: Additional SQL conditions on recipes aliased as r
+        params: Parameters of filter_clauses
+        limit: Maximum number of IDs
+        
+    Returns:
+        Recipe IDs, best match first
+    """
+    try:
+        params = dict(params, text_query=query_text, query=f"%{query_text}%", limit=limit)
+        
+        if text_search_available():
+            match_clause = """(
+                r.search_vector @@ websearch_to_tsquery('english', %(text_query)s)
+                OR r.recipe_title ILIKE %(query)s
+                OR %(text_query)s <%% r.recipe_title
+            )"""
+            rank_expression = """
+                ts_rank(r.search_vector, websearch_to_tsquery('english', %(text_query)s))
+                + word_similarity(%(text_query)s, r.recipe_title)"""
+        else:
+            match_clause = "(r.recipe_title ILIKE %(query)s OR r.source ILIKE %(query)s)"
+            rank_expression = """
+                CASE
+                    WHEN r.recipe_title ILIKE %(text_query)s THEN 3
+                    WHEN r.recipe_title ILIKE %(start_query)s THEN 2
+                    WHEN r.recipe_title ILIKE %(query)s THEN 1
+                    ELSE 0
+                END"""
+            params["start_query"] = f"{query_text}%"
         
-        # Query using cosine similarity
         query = f"""
-        SELECT 
-            r.recipe_id as id,
-            r.recipe_title as title,
-            r.region,
-            r.sub_region,
-            r.image_url,
-            r.total_time,
-            r.prep_time,
-            r.cook_time,
-            r.calories,
-            1 - (re.embedding <=> %(embedding)s::vector) as score
+        SELECT r.recipe_id
+        FROM recipes r
+        WHERE {' AND '.join([match_clause] + filter_clauses)}
+        ORDER BY {rank_expression} DESC, r.recipe_id
+        LIMIT %(limit)s
+        """
+        
+        return [row["recipe_id"] for row in execute_read_query(query, params, statement="lexical_ranking")]
+        
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error ranking recipes by text: {e}")
+        return []
+
+@timed_query
+def get_vector_ranking(query_text: str, filter_clauses: List[str], params: Dict[str, Any], limit: int) -> List[int]:
+    """
+    Rank recipe IDs by embedding similarity to the query text.
+    
+    Args:
+        query_text: Text to search for
+        filter_clauses: Additional SQL conditions on recipes aliased as r
+        params: Parameters of filter_clauses
+        limit: Maximum number of IDs
+        
+    Returns:
+        Recipe IDs, most similar first
+    """
+    try:
+        embedding = get_query_embedding(query_text)
+        if not embedding:
+            logger.error(f"Failed to generate embedding for query: {query_text}")
+            return []
+        
+        params = dict(
+            params,
+            embedding=f"[{', '.join(map(str, embedding))}]",
+            min_score=MIN_SIMILARITY_SCORE,
+            limit=limit
+        )
+        
+        query = f"""
+        SELECT r.recipe_id
         FROM recipe_embeddings re
         JOIN recipes r ON re.recipe_id = r.recipe_id
-        WHERE {where_clause}
-        AND 1 - (re.embedding <=> %(embedding)s::vector) >= %(min_score)s
-        ORDER BY score DESC
+        WHERE {' AND '.join(["1 - (re.embedding <=> %(embedding)s::vector) >= %(min_score)s"] + filter_clauses)}
+        ORDER BY re.embedding <=> %(embedding)s::vector
         LIMIT %(limit)s
         """
         
-        results = execute_query(query, params)
+        return [row["recipe_id"] for row in execute_read_query(query, params, statement="vector_ranking")]
         
-        # Return the results
-        return results
-    
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
-        logger.error(f"Error searching by text embedding: {e}")
+        logger.error(f"Error ranking recipes by embedding: {e}")
         return []
 
+def reciprocal_rank_fusion(rankings: Dict[str, List[int]], k: int = HYBRID_RRF_K) -> List[Tuple[int, float, Dict[str, int]]]:
+    """
+    Fuse rankings by summing 1 / (k + rank) over the rankings each item appears in.
+    
+    Only ranks are used, so the incomparable scales of text relevance and cosine
+    similarity never need to be normalised against each other.
+    
+    Args:
+        rankings: Ranked recipe IDs by retriever name, best first
+        k: Damping constant; larger values flatten the contribution of top ranks
+        
+    Returns:
+        List of (recipe ID, fused score, rank by retriever name), best first
+    """
+    scores = {}
+    ranks = {}
+    for name, recipe_ids in rankings.items():
+        for rank, recipe_id in enumerate(recipe_ids, start=1):
+            scores[recipe_id] = scores.get(recipe_id, 0.0) + 1.0 / (k + rank)
+            ranks.setdefault(recipe_id, {})[name] = rank
+    
+    fused = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [(recipe_id, score, ranks[recipe_id]) for recipe_id, score in fused]
+
+@timed_query
+def hybrid_search(query_text: str, limit: int = 20, filters: Dict[str, Any] = None,
+                  fields=HYDRATION_FIELDS, candidate_limit: int = HYBRID_CANDIDATE_LIMIT) -> Dict[str, Any]:
+    """
+    Search recipes by text relevance and embedding similarity at once.
+    
+    Both retrievals run concurrently and are fused with reciprocal-rank fusion.
+    The filters are resolved once from the facet index: a short candidate list is
+    pushed into both queries, while a broad one is applied to the fused list after
+    over-fetching candidates. Without the index they are applied in SQL.
+    
+    Args:
+        query_text: Text to search for
+        limit: Maximum number of results
+        filters: Optional filters, as for search_by_text_embedding
+        fields: Which of HYDRATION_FIELDS to include in the results
+        candidate_limit: Number of candidates taken from each retrieval
+        
+    Returns:
+        Dict with the fused results and the number of candidates per retrieval
+    """
+    try:
+        filter_clauses, params = [], {}
+        post_filter = None
+        fetch_limit = max(candidate_limit, limit)
+        
+        index = get_facet_index()
+        bitmap = index.match(**_facet_filters(filters)) if index is not None else None
+        if bitmap is not None:
+            matches = index.count(bitmap)
+            if matches == 0:
+                return {"results": [], "candidates": {"lexical": 0, "vector": 0}}
+            if matches <= FACET_INLINE_LIMIT:
+                filter_clauses = ["r.recipe_id = ANY(%(candidate_ids)s)"]
+                params["candidate_ids"] = index.to_ids(bitmap).tolist()
+            else:
+                # Over-fetch in proportion to how selective the filters are
+                post_filter = bitmap
+                fetch_limit = min(fetch_limit * math.ceil(len(index) / matches), fetch_limit * 10)
+        elif index is None:
+            filter_clauses, params = _sql_filters(filters)
+        
+        # Each ranking runs in a copy of this context, so its spans join the request's trace
+        lexical = _search_executor.submit(contextvars.copy_context().run, get_lexical_ranking,
+                                          query_text, filter_clauses, params, fetch_limit)
+        vector = _search_executor.submit(contextvars.copy_context().run, get_vector_ranking,
+                                         query_text, filter_clauses, params, fetch_limit)
+        rankings = {"lexical": lexical.result(), "vector": vector.result()}
+        
+        fused = reciprocal_rank_fusion(rankings)
+        if post_filter is not None:
+            allowed = set(index.contains(post_filter, [recipe_id for recipe_id, _, _ in fused]))
+            fused = [item for item in fused if item[0] in allowed]
+        fused = fused[:limit]
+        
+        # Hydrate the page in one batch through the recipe cache
+        recipes = {recipe["recipe_id"]: recipe for recipe in get_recipes_by_ids([recipe_id for recipe_id, _, _ in fused])}
+        
+        results = []
+        for recipe_id, score, ranks in fused:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            for field in HYDRATION_FIELDS:
+                if field not in fields:
+                    recipe.pop(field, None)
+            recipe["score"] = round(score, 6)
+            recipe["lexical_rank"] = ranks.get("lexical")
+            recipe["vector_rank"] = ranks.get("vector")
+            results.append(recipe)
+        
+        return {
+            "results": results,
+            "candidates": {name: len(recipe_ids) for name, recipe_ids in rankings.items()}
+        }
+        
+    except POOL_TIMEOUTS:
+        raise
+    except Exception as e:
+        logger.error(f"Error in hybrid search: {e}")
+        return {"results": [], "candidates": {"lexical": 0, "vector": 0}}
+
+@timed_query
 def get_similar_by_ingredients(recipe_id: int, limit: int = 10) -> List[Dict[str, Any]]:
     """
-    Find recipes with similar ingredients.
+    Find recipes with similar ingredients, ranked by exact Jaccard similarity.
+    
+    This scans recipe_ingredients for every recipe sharing an ingredient; the
+    MinHash index in indexes/minhash.py answers the same question from memory.
     
     Args:
         recipe_id: ID of the reference recipe
@@ -172,35 +501,40 @@ def get_similar_by_ingredients(recipe_id: int, limit: int = 10) -> List[Dict[str
     """
     try:
         query = """
-        WITH recipe_ingredients AS (
-            SELECT ingredient_id 
+        WITH source_ingredients AS (
+            SELECT DISTINCT ingredient_id 
             FROM recipe_ingredients 
             WHERE recipe_id = %(recipe_id)s
         ),
         recipe_matches AS (
             SELECT 
-                r.recipe_id as id,
-                r.recipe_title as title,
-                COUNT(ri.ingredient_id) as common_ingredients,
-                (
-                    SELECT COUNT(ingredient_id) 
-                    FROM recipe_ingredients 
-                    WHERE recipe_id = r.recipe_id
-                ) as total_ingredients
-            FROM recipes r
-            JOIN recipe_ingredients ri ON r.recipe_id = ri.recipe_id
-            WHERE ri.ingredient_id IN (SELECT ingredient_id FROM recipe_ingredients)
-            AND r.recipe_id != %(recipe_id)s
-            GROUP BY r.recipe_id, r.recipe_title
-            HAVING COUNT(ri.ingredient_id) >= %(min_common)s
+                ri.recipe_id,
+                COUNT(DISTINCT ri.ingredient_id) as common_ingredients
+            FROM recipe_ingredients ri
+            JOIN source_ingredients si ON ri.ingredient_id = si.ingredient_id
+            WHERE ri.recipe_id != %(recipe_id)s
+            GROUP BY ri.recipe_id
+            HAVING COUNT(DISTINCT ri.ingredient_id) >= %(min_common)s
+        ),
+        recipe_sizes AS (
+            SELECT 
+                ri.recipe_id,
+                COUNT(DISTINCT ri.ingredient_id) as total_ingredients
+            FROM recipe_ingredients ri
+            JOIN recipe_matches rm ON ri.recipe_id = rm.recipe_id
+            GROUP BY ri.recipe_id
         )
         SELECT 
-            id, 
-            title, 
-            common_ingredients, 
-            total_ingredients,
-            (common_ingredients::float / total_ingredients) as score
-        FROM recipe_matches
+            r.recipe_id as id, 
+            r.recipe_title as title, 
+            rm.common_ingredients, 
+            rs.total_ingredients,
+            rm.common_ingredients::float / (
+                rs.total_ingredients + (SELECT COUNT(*) FROM source_ingredients) - rm.common_ingredients
+            ) as score
+        FROM recipe_matches rm
+        JOIN recipe_sizes rs ON rm.recipe_id = rs.recipe_id
+        JOIN recipes r ON rm.recipe_id = r.recipe_id
         ORDER BY score DESC, common_ingredients DESC
         LIMIT %(limit)s
         """
@@ -211,23 +545,78 @@ def get_similar_by_ingredients(recipe_id: int, limit: int = 10) -> List[Dict[str
             "limit": limit
         }
         
-        results = execute_query(query, params)
+        results = execute_read_query(query, params)
         return results
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error finding similar by ingredients: {e}")
         return []
 
-def get_cuisine_recommendations(cuisine_name: str, limit: int = 10) -> List[Dict[str, Any]]:
+@timed_query
+def get_recipe_ingredient_sets(recipe_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
     """
-    Get recipes for a specific cuisine or region.
+    Get the distinct ingredient IDs of each recipe.
+    
+    Args:
+        recipe_ids: Optional recipe IDs to restrict to; all recipes if omitted
+        
+    Returns:
+        List of rows with recipe_id and an ingredient_ids array
+    """
+    try:
+        query = """
+        SELECT 
+            recipe_id,
+            array_agg(DISTINCT ingredient_id) as ingredient_ids
+        FROM recipe_ingredients
+        WHERE ingredient_id IS NOT NULL
+        """
+        
+        params = {}
+        if recipe_ids is not None:
+            query += " AND recipe_id = ANY(%(recipe_ids)s)"
+            params["recipe_ids"] = list(recipe_ids)
+        
+        query += " GROUP BY recipe_id"
+        
+        return execute_query(query, params)
+        
+    except Exception as e:
+        logger.error(f"Error getting recipe ingredient sets: {e}")
+        return []
+
+def get_dietary_column(dietary_restriction: str) -> str:
+    """
+    Map a dietary restriction to its recipe_diet_attributes column.
+    
+    Args:
+        dietary_restriction: Type of dietary restriction
+        
+    Returns:
+        Column name, defaulting to vegan
+    """
+    column_name = "vegan"  # Default
+    if dietary_restriction.lower() == "vegetarian":
+        column_name = "lacto_vegetarian"
+    elif dietary_restriction.lower() == "pescetarian":
+        column_name = "pescetarian"
+    return column_name
+
+@timed_query
+def get_cuisine_recipes(cuisine_name: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Get every recipe for a specific cuisine or region.
+    
+    Used to fill the in-memory candidate pools that cuisine recommendations
+    are sampled from.
     
     Args:
         cuisine_name: Name of cuisine or region
-        limit: Maximum number of results
         
     Returns:
-        List of cuisine-specific recipes
+        List of cuisine-specific recipes ordered by ID, or None if the query failed
     """
     try:
         query = """
@@ -236,63 +625,60 @@ def get_cuisine_recommendations(cuisine_name: str, limit: int = 10) -> List[Dict
             r.recipe_title as title
         FROM recipes r
         WHERE r.region = %(cuisine)s OR r.sub_region = %(cuisine)s
-        ORDER BY RANDOM()
-        LIMIT %(limit)s
+        ORDER BY r.recipe_id
         """
         
         params = {
-            "cuisine": cuisine_name,
-            "limit": limit
+            "cuisine": cuisine_name
         }
         
-        results = execute_query(query, params)
+        results = execute_read_query(query, params)
         return results
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
-        logger.error(f"Error getting cuisine recommendations: {e}")
-        return []
+        logger.error(f"Error getting cuisine recipes: {e}")
+        return None
 
-def get_dietary_recommendations(dietary_restriction: str, limit: int = 10) -> List[Dict[str, Any]]:
+@timed_query
+def get_dietary_recipes(dietary_restriction: str) -> Optional[List[Dict[str, Any]]]:
     """
-    Get recipes based on dietary restrictions.
+    Get every recipe matching a dietary restriction.
+    
+    Used to fill the in-memory candidate pools that dietary recommendations
+    are sampled from.
     
     Args:
         dietary_restriction: Type of dietary restriction
-        limit: Maximum number of results
         
     Returns:
-        List of dietary-specific recipes
+        List of dietary-specific recipes ordered by ID, or None if the query failed
     """
     try:
         # Determine the dietary column
-        column_name = "vegan"  # Default
-        if dietary_restriction.lower() == "vegetarian":
-            column_name = "lacto_vegetarian"
-        elif dietary_restriction.lower() == "pescetarian":
-            column_name = "pescetarian"
+        column_name = get_dietary_column(dietary_restriction)
         
         query = f"""
-        SELECT 
+        SELECT DISTINCT
             r.recipe_id as id,
             r.recipe_title as title
         FROM recipes r
         JOIN recipe_diet_attributes rda ON r.recipe_id = rda.recipe_id
         WHERE rda.{column_name} = TRUE
-        ORDER BY RANDOM()
-        LIMIT %(limit)s
+        ORDER BY r.recipe_id
         """
         
-        params = {
-            "limit": limit
-        }
-        
-        results = execute_query(query, params)
+        results = execute_read_query(query)
         return results
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
-        logger.error(f"Error getting dietary recommendations: {e}")
-        return []
+        logger.error(f"Error getting dietary recipes: {e}")
+        return None
 
+@timed_query
 def get_quick_recipes(max_time: int = 30, limit: int = 10, cuisine: Optional[str] = None, 
                      dietary_restriction: Optional[str] = None) -> List[Dict[str, Any]]:
     """
@@ -308,6 +694,33 @@ def get_quick_recipes(max_time: int = 30, limit: int = 10, cuisine: Optional[str
         List of quick recipes
     """
     try:
+        # Filter and order by time in memory when the facet index is available
+        index = get_facet_index()
+        if index is not None:
+            diet_column = DIETARY_FILTER_COLUMNS.get(dietary_restriction.lower()) if dietary_restriction else None
+            bitmap = index.match(
+                cuisines=[cuisine] if cuisine else None,
+                diets=[diet_column] if diet_column else None,
+                max_time=max_time
+            )
+            recipe_ids = index.first_by("effective_time", bitmap, limit)
+            if not recipe_ids:
+                return []
+            
+            query = """
+            SELECT 
+                r.recipe_id as id,
+                r.recipe_title as title,
+                r.total_time,
+                r.prep_time,
+                r.cook_time
+            FROM recipes r
+            WHERE r.recipe_id = ANY(%(recipe_ids)s)
+            """
+            
+            rows = {row["id"]: row for row in execute_read_query(query, {"recipe_ids": recipe_ids})}
+            return [rows[recipe_id] for recipe_id in recipe_ids if recipe_id in rows]
+        
         where_clauses = [
             "(r.total_time <= %(max_time)s OR (r.total_time IS NULL AND (r.prep_time + COALESCE(r.cook_time, 0)) <= %(max_time)s))"
         ]
@@ -351,9 +764,11 @@ def get_quick_recipes(max_time: int = 30, limit: int = 10, cuisine: Optional[str
         LIMIT %(limit)s
         """
         
-        results = execute_query(query, params)
+        results = execute_read_query(query, params)
         return results
         
+    except POOL_TIMEOUTS:
+        raise
     except Exception as e:
         logger.error(f"Error getting quick recipes: {e}")
         return []
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+Scrape-time collectors for database pool and cache statistics.
+
+Each collector turns the stats() a component already keeps into metric
+families for the registry in monitoring/metrics.py. Importing this module
+registers them.
+"""
+from typing import Any, Dict, List
+
+from cache.recipe_cache import recipe_cache
+from cache.recommendation_store import store as precomputed_store
+from cache.user_history import user_history_cache
+from config import async_db, db
+from monitoring.metrics import MetricFamily, registry
+
+def collect_pool_stats() -> List[MetricFamily]:
+    """Get connection counts, waits and timeouts of every open database pool."""
+    connections, acquired, timeouts, wait_seconds = [], [], [], []
+
+    for name, pool in (("primary", db.pool), ("replica", db.replica_pool)):
+        if pool is None:
+            continue
+        stats = pool.stats()
+        for state in ("in_use", "idle", "waiting"):
+            connections.append(({"pool": name, "state": state}, stats[state]))
+        acquired.append(({"pool": name}, stats["acquired"]))
+        timeouts.append(({"pool": name}, stats["timeouts"]))
+        wait_seconds.append(({"pool": name}, stats["mean_wait_ms"] / 1000))
+
+    for name, pool in (("async", async_db.async_pool), ("async_replica", async_db.async_replica_pool)):
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        available = stats.get("pool_available", 0)
+        connections.append(({"pool": name, "state": "in_use"}, stats.get("pool_size", 0) - available))
+        connections.append(({"pool": name, "state": "idle"}, available))
+        connections.append(({"pool": name, "state": "waiting"}, stats.get("requests_waiting", 0)))
+        acquired.append(({"pool": name}, stats.get("requests_num", 0)))
+        timeouts.append(({"pool": name}, stats.get("requests_errors", 0)))
+        requests = stats.get("requests_num", 0)
+        wait_seconds.append(({"pool": name}, stats.get("requests_wait_ms", 0) / requests / 1000 if requests else 0))
+
+    return [
+        ("db_pool_connections", "gauge", "Database connections by pool and state.", connections),
+        ("db_pool_acquired_total", "counter", "Connections handed out by the pool.", acquired),
+        ("db_pool_timeouts_total", "counter", "Connection requests that gave up waiting.", timeouts),
+        ("db_pool_mean_wait_seconds", "gauge", "Mean time spent waiting for a connection.", wait_seconds)
+    ]
+
+def collect_cache_stats() -> List[MetricFamily]:
+    """Get lookup outcomes, hit rates and sizes of the in-process caches."""
+    caches: Dict[str, Dict[str, Any]] = {
+        "recipe": recipe_cache.stats(),
+        "user_history": user_history_cache.stats(),
+        "precomputed_recommendations": precomputed_store.stats()
+    }
+    outcomes = {"hit", "miss", "stale", "short"}
+
+    lookups, hit_rates, entries = [], [], []
+    for name, stats in caches.items():
+        for outcome in sorted(outcomes & stats.keys()):
+            lookups.append(({"cache": name, "result": outcome}, stats[outcome]))
+        hit_rates.append(({"cache": name}, stats["hit_rate"]))
+        size = stats.get("size", stats.get("entries"))
+        if size is not None:
+            entries.append(({"cache": name}, size))
+
+    return [
+        ("cache_lookups_total", "counter", "Cache lookups by outcome.", lookups),
+        ("cache_hit_ratio", "gauge", "Share of cache lookups that were hits.", hit_rates),
+        ("cache_entries", "gauge", "Entries currently held by the cache.", entries)
+    ]
+
+registry.register_collector(collect_pool_stats)
+registry.register_collector(collect_cache_stats)
@@ -0,0 +1,229 @@
+"""
+Prometheus-style metrics for the recommendation service.
+
+Latency histograms are recorded in process by the timing decorators and
+rendered in the Prometheus text exposition format by GET /metrics, together
+with values from collectors. Collectors read counters the pools and caches
+already keep, only when metrics are scraped, so they add nothing to the
+request path. A timed call costs two clock reads, a bucket bisect and a short
+locked update, about a microsecond.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# Upper bounds in seconds, from sub-millisecond cache hits to slow model loads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# A collector returns (name, type, help, [(labels, value), ...]) families
+MetricFamily = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+def _escape(value: Any) -> str:
+    """Escape a label value for the text format."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    """Format a label set, e.g. {route="/trending",status="200"}."""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    """Format a sample value."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class HistogramChild:
+    """Bucket counts and sum of one label combination."""
+
+    __slots__ = ("_lock", "_buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        # One count per bucket plus +Inf, not yet cumulative
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Record one duration in seconds."""
+        index = bisect_left(self._buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += seconds
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Get the bucket counts and sum."""
+        with self._lock:
+            return list(self.counts), self.sum
+
+class _Timer:
+    """Context manager that observes the time spent in its block."""
+
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: HistogramChild):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+class Histogram:
+    """Latency histogram partitioned by label values."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            name: Metric name, ending in _seconds
+            documentation: HELP text
+            labelnames: Names of the labels every observation carries
+            buckets: Sorted bucket upper bounds in seconds, without +Inf
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._children: Dict[tuple, HistogramChild] = {}
+        # Children by the label values as passed, e.g. status 200 as well as "200"
+        self._bound: Dict[tuple, HistogramChild] = {}
+
+    def labels(self, *values: Any) -> HistogramChild:
+        """Get the child for a label combination; bind it once where the labels are fixed."""
+        child = self._bound.get(values)
+        if child is None:
+            key = tuple(str(value) for value in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, HistogramChild(self.buckets))
+                self._bound[values] = child
+        return child
+
+    def observe(self, seconds: float, *values: Any) -> None:
+        """Record one duration for a label combination."""
+        self.labels(*values).observe(seconds)
+
+    def time(self, *values: Any) -> _Timer:
+        """Time a block, e.g. with EMBEDDING_ENCODE_LATENCY.time("text"): ..."""
+        return _Timer(self.labels(*values))
+
+    def render(self) -> List[str]:
+        """Get the exposition lines of every label combination."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            children = sorted(self._children.items())
+
+        for values, child in children:
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = _labels(self.labelnames + ("le",), values + (_number(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            series = _labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{series} {_number(total)}")
+            lines.append(f"{self.name}_count{series} {cumulative}")
+        return lines
+
+def timed(histogram: Histogram, *values: Any) -> Callable:
+    """
+    Decorate a function or coroutine function to record its duration, including failures.
+
+    Args:
+        histogram: Histogram to record into
+        values: Label values, bound once at decoration time
+    """
+    child = histogram.labels(*values)
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start_time = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - start_time)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start_time)
+        return wrapper
+
+    return decorator
+
+class MetricsRegistry:
+    """Histograms and scrape-time collectors rendered together."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._histograms: List[Histogram] = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a histogram."""
+        histogram = Histogram(name, documentation, labelnames, buckets)
+        self._histograms.append(histogram)
+        return histogram
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """Register a function called on every scrape that returns metric families."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for histogram in self._histograms:
+            lines.extend(histogram.render())
+
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                # A broken collector must not hide the other metrics
+                lines.append(f"# collector {getattr(collector, '__name__', collector)} failed: {_escape(e)}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+# Global metrics registry
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request.", ("method", "route", "status")
+)
+RECOMMENDER_LATENCY = registry.histogram(
+    "recommender_duration_seconds", "Time spent in a recommendation strategy method.", ("strategy", "method")
+)
+QUERY_LATENCY = registry.histogram(
+    "query_function_duration_seconds", "Time spent in a query function in models/.", ("module", "function")
+)
+EMBEDDING_ENCODE_LATENCY = registry.histogram(
+    "embedding_encode_duration_seconds", "Time to encode one text with the embedding model.", ("source",)
+)
+
+def timed_query(func: Callable) -> Callable:
+    """Decorate a query function in models/ to record its duration under its module and name."""
+    return timed(QUERY_LATENCY, func.__module__.rsplit(".", 1)[-1], func.__name__)(func)
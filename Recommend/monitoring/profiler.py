@@ -0,0 +1,182 @@
+"""
+Statistical stack sampler for profiling a running worker process.
+
+A sampling thread wakes every interval, reads the current frame of every other
+thread with sys._current_frames() and counts each distinct stack. Nothing is
+hooked into the profiled code, so the cost is the sampling thread's own work:
+walking the stacks once per interval while holding the GIL, typically well
+under a millisecond. Stacks are returned in the collapsed format ("root;...;leaf
+count" per line) read by flamegraph.pl and speedscope. A profile only covers
+the process that served the request, i.e. one uvicorn worker.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from config.config import PROFILER_INTERVAL_MS
+
+# Leaf frames of threads that are blocked waiting for work rather than running
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker")
+}
+
+_THREAD_NUMBER = re.compile(r"-\d+")
+
+class ProfilerBusyError(Exception):
+    """A profile is already being taken in this process."""
+
+class Profile:
+    """Stack counts collected by one sampling run."""
+
+    def __init__(self, stacks: Counter, samples: int, duration: float, interval: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.duration = duration
+        self.interval = interval
+
+    def collapsed(self) -> str:
+        """Get the stacks in collapsed format, most frequent first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit: int = 30) -> Dict[str, Any]:
+        """
+        Get the functions with the most samples.
+
+        Args:
+            limit: Maximum number of functions in each ranking
+
+        Returns:
+            Dict with sampling totals and the top functions by self samples,
+            where they were the leaf, and by total samples, where they were on the stack
+        """
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if frames:
+                own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+
+        stack_samples = sum(self.stacks.values())
+        return {
+            "samples": self.samples,
+            "stack_samples": stack_samples,
+            "duration_seconds": round(self.duration, 3),
+            "interval_ms": round(self.interval * 1000, 3),
+            "distinct_stacks": len(self.stacks),
+            "top_self": [{"frame": frame, "samples": count} for frame, count in own.most_common(limit)],
+            "top_total": [{"frame": frame, "samples": count} for frame, count in total.most_common(limit)]
+        }
+
+class StackSampler:
+    """Samples the stacks of every thread in the process on a timer thread."""
+
+    def __init__(self):
+        """Initialize the sampler."""
+        self._lock = threading.Lock()
+        # Frame labels by code object, so each label is formatted once
+        self._labels: Dict[Any, str] = {}
+
+    def profile(self, seconds: float, interval_ms: float = PROFILER_INTERVAL_MS,
+                include_idle: bool = False) -> Profile:
+        """
+        Sample all threads for a while and aggregate their stacks.
+
+        Args:
+            seconds: How long to sample
+            interval_ms: Time between samples in milliseconds
+            include_idle: Keep stacks of threads blocked waiting for work
+
+        Returns:
+            The aggregated profile
+
+        Raises:
+            ProfilerBusyError: If another profile is running
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+
+        try:
+            result = {}
+            sampler = threading.Thread(
+                target=self._sample,
+                args=(seconds, interval_ms / 1000, include_idle, threading.get_ident(), result),
+                name="stack-sampler",
+                daemon=True
+            )
+            sampler.start()
+            sampler.join()
+            return result["profile"]
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, interval: float, include_idle: bool, caller_id: int,
+                result: Dict[str, Profile]) -> None:
+        """Take samples until the time is up. Runs on the sampling thread."""
+        # Neither this thread nor the one waiting for the profile is worth sampling
+        skipped = {threading.get_ident(), caller_id}
+        stacks = Counter()
+        samples = 0
+        start_time = time.perf_counter()
+        deadline = start_time + seconds
+        next_sample = start_time
+
+        while True:
+            names = {thread.ident: _THREAD_NUMBER.sub("", thread.name) for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in skipped:
+                    continue
+                if not include_idle and self._idle(frame):
+                    continue
+                stacks[f"{names.get(thread_id, 'unknown')};{self._stack(frame)}"] += 1
+            samples += 1
+
+            next_sample += interval
+            now = time.perf_counter()
+            if next_sample >= deadline:
+                break
+            if next_sample > now:
+                time.sleep(next_sample - now)
+            else:
+                # Sampling fell behind; skip the missed ticks instead of bursting
+                next_sample = now
+
+        result["profile"] = Profile(stacks, samples, time.perf_counter() - start_time, interval)
+
+    def _stack(self, frame) -> str:
+        """Get a frame's stack as root-first labels joined by semicolons."""
+        labels: List[str] = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = f"{code.co_name} ({self._short_path(code.co_filename)}:{code.co_firstlineno})"
+            labels.append(label)
+            frame = frame.f_back
+        labels.reverse()
+        return ";".join(labels)
+
+    @staticmethod
+    def _short_path(filename: str) -> str:
+        """Shorten a file path to the part below site-packages or the service directory."""
+        for marker in ("site-packages" + os.sep, "Recommend" + os.sep):
+            position = filename.rfind(marker)
+            if position >= 0:
+                return filename[position + len(marker):]
+        return os.path.basename(filename)
+
+    @staticmethod
+    def _idle(frame) -> bool:
+        """Whether a thread's leaf frame is a known wait for work."""
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+# Global stack sampler
+stack_sampler = StackSampler()
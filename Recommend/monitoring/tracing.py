@@ -0,0 +1,213 @@
+"""
+OpenTelemetry tracing for the recommendation service.
+
+Spans cover each HTTP request, each recommender strategy call, each database
+helper call and each embedding encode. configure_tracing() installs a tracer
+provider that exports to TRACING_EXPORTER: "otlp" sends spans to a collector
+over OTLP/HTTP and "json" appends one JSON object per span to
+TRACING_JSON_PATH, which is handy in tests. With "none", the default, nothing
+is installed and the helpers below skip span creation entirely.
+
+A request that arrives with a W3C traceparent header continues that trace.
+Otherwise its trace ID is derived from the middleware's X-Request-ID, so the
+request ID in a log line is enough to find the trace: it is stored on the root
+span as http.request_id, and trace_id_for_request() maps it to the trace ID.
+"""
+import contextvars
+import functools
+import hashlib
+import inspect
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from opentelemetry import propagate, trace
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.id_generator import RandomIdGenerator
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind
+
+from config.config import (
+    TRACING_EXPORTER, TRACING_OTLP_ENDPOINT, TRACING_JSON_PATH, TRACING_SAMPLE_RATIO, TRACING_SERVICE_NAME
+)
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("mealflow.recommend")
+
+# Set while tracing exports somewhere; checked on every call so disabled tracing costs one lookup
+_enabled = False
+_provider = None
+
+# Trace ID the next root span should use, set by request_span()
+_request_trace_id: contextvars.ContextVar = contextvars.ContextVar("request_trace_id", default=None)
+
+def trace_id_for_request(request_id: str) -> int:
+    """Get the trace ID of a request that arrived without a traceparent header."""
+    return int.from_bytes(hashlib.md5(request_id.encode()).digest(), "big")
+
+class RequestIdGenerator(RandomIdGenerator):
+    """Random span IDs, and trace IDs taken from the current request ID when there is one."""
+
+    def generate_trace_id(self) -> int:
+        trace_id = _request_trace_id.get()
+        return trace_id if trace_id is not None else super().generate_trace_id()
+
+class JsonFileSpanExporter(SpanExporter):
+    """Append finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        """
+        Open the file for appending.
+
+        Args:
+            path: File to write spans to
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        try:
+            with self._lock:
+                for span in spans:
+                    self._file.write(span.to_json(indent=None) + "\n")
+                self._file.flush()
+            return SpanExportResult.SUCCESS
+        except (OSError, ValueError) as e:
+            logger.error(f"Error writing spans to {self.path}: {e}")
+            return SpanExportResult.FAILURE
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+def configure_tracing(exporter: str = TRACING_EXPORTER) -> bool:
+    """
+    Install the tracer provider for the configured exporter.
+
+    Args:
+        exporter: "otlp", "json" or "none"
+
+    Returns:
+        True if spans are now exported
+    """
+    global _enabled, _provider
+    if exporter == "none" or _provider is not None:
+        return _enabled
+
+    if exporter == "otlp":
+        span_exporter = OTLPSpanExporter(endpoint=TRACING_OTLP_ENDPOINT)
+    elif exporter == "json":
+        span_exporter = JsonFileSpanExporter(TRACING_JSON_PATH)
+    else:
+        logger.error(f"Unknown tracing exporter '{exporter}', tracing stays disabled")
+        return False
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": TRACING_SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)),
+        id_generator=RequestIdGenerator()
+    )
+    _provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(_provider)
+    _enabled = True
+    logger.info(f"Tracing enabled with the {exporter} exporter")
+    return True
+
+def shutdown_tracing() -> None:
+    """Export the spans still buffered and stop the exporter."""
+    if _provider is not None:
+        _provider.shutdown()
+
+def tracing_enabled() -> bool:
+    """Whether spans are being recorded and exported."""
+    return _enabled
+
+@contextmanager
+def request_span(scope: Dict[str, Any], request_id: str):
+    """
+    Open the root span of an HTTP request; yields the span, or None while tracing is disabled.
+
+    Args:
+        scope: ASGI scope of the request
+        request_id: The request's X-Request-ID
+    """
+    if not _enabled:
+        yield None
+        return
+
+    headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope.get("headers", [])}
+    token = _request_trace_id.set(trace_id_for_request(request_id))
+    try:
+        span = tracer.start_span(
+            f"{scope['method']} {scope['path']}",
+            context=propagate.extract(headers),
+            kind=SpanKind.SERVER,
+            attributes={
+                "http.method": scope["method"],
+                "http.target": scope["path"],
+                "http.request_id": request_id
+            }
+        )
+    finally:
+        _request_trace_id.reset(token)
+
+    with trace.use_span(span, end_on_exit=True):
+        yield span
+
+def finish_request_span(span, method: str, route: str, status: Optional[int]) -> None:
+    """Name a request span after its route template and record the response status."""
+    if span is None:
+        return
+    span.update_name(f"{method} {route}")
+    span.set_attribute("http.route", route)
+    if status is not None:
+        span.set_attribute("http.status_code", status)
+        if status >= 500:
+            span.set_status(trace.Status(trace.StatusCode.ERROR))
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """Open a child span around a block, e.g. with start_span("embedding.encode"): ..."""
+    if not _enabled:
+        return nullcontext()
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+def set_span_attributes(attributes: Dict[str, Any]) -> None:
+    """Add attributes to the current span, if one is recording."""
+    if _enabled:
+        current = trace.get_current_span()
+        if current.is_recording():
+            current.set_attributes(attributes)
+
+def traced(name: str, attributes: Optional[Dict[str, Any]] = None) -> Callable:
+    """
+    Decorate a function or coroutine function to run it in a child span.
+
+    Args:
+        name: Span name
+        attributes: Attributes every span of this function carries
+    """
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await func(*args, **kwargs)
+                with tracer.start_as_current_span(name, attributes=attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with tracer.start_as_current_span(name, attributes=attributes):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
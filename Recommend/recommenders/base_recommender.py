@@ -1,15 +1,28 @@
 """
 Base class for recommenders with common functionality.
 """
+import inspect
 import logging
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 
+from monitoring.metrics import RECOMMENDER_LATENCY, timed
+from monitoring.tracing import traced
+
 logger = logging.getLogger(__name__)
 
 class BaseRecommender(ABC):
     """Base class for recommendation strategies."""
     
+    def __init_subclass__(cls, **kwargs):
+        """Record the latency and a span of every get_* method a strategy defines, labelled by strategy."""
+        super().__init_subclass__(**kwargs)
+        strategy = cls.__name__.replace("Recommender", "").lower()
+        for name, method in list(vars(cls).items()):
+            if name.startswith("get_") and inspect.isfunction(method):
+                method = traced(f"recommender.{name}", {"recommender.strategy": strategy})(method)
+                setattr(cls, name, timed(RECOMMENDER_LATENCY, strategy, name)(method))
+    
     @abstractmethod
     def get_recommendations(self, **kwargs) -> List[Dict[str, Any]]:
         """Get recommendations based on implementation strategy."""
@@ -19,11 +32,11 @@ class BaseRecommender(ABC):
         """Get recommendations similar to a specific recipe."""
         raise NotImplementedError("This recommender does not support similar recommendations")
     
-    def get_cuisine_recommendations(self, cuisine_name: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_cuisine_recommendations(self, cuisine_name: str, limit: int = 10, weighted: bool = False) -> List[Dict[str, Any]]:
         """Get recommendations for a specific cuisine."""
         raise NotImplementedError("This recommender does not support cuisine recommendations")
     
-    def get_dietary_recommendations(self, dietary_restriction: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_dietary_recommendations(self, dietary_restriction: str, limit: int = 10, weighted: bool = False) -> List[Dict[str, Any]]:
         """Get recommendations for a specific dietary restriction."""
         raise NotImplementedError("This recommender does not support dietary recommendations")
     
@@ -5,11 +5,9 @@ import logging
 from typing import List, Dict, Any, Optional
 
 from recommenders.base_recommender import BaseRecommender
-from models.queries_search import (
-    find_similar_content, get_similar_by_ingredients, 
-    get_cuisine_recommendations, get_dietary_recommendations,
-    get_quick_recipes
-)
+from models.queries_search import find_similar_content, get_quick_recipes
+from indexes.minhash import find_similar_by_ingredients
+from cache.candidate_pools import candidate_pools
 from models.queries_recipe import get_recipe
 from embedding.embeddings import EmbeddingGenerator
 
@@ -98,7 +96,7 @@ class ContentRecommender(BaseRecommender):
         
         # Choose similarity method
         if similarity_method == "ingredient":
-            similar_items = get_similar_by_ingredients(recipe_id, limit)
+            similar_items = find_similar_by_ingredients(recipe_id, limit)
             return [
                 {
                     "id": str(item["id"]),
@@ -147,18 +145,19 @@ class ContentRecommender(BaseRecommender):
                 for item in similar_items
             ]
     
-    def get_cuisine_recommendations(self, cuisine_name: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_cuisine_recommendations(self, cuisine_name: str, limit: int = 10, weighted: bool = False) -> List[Dict[str, Any]]:
         """
-        Get recommendations for a specific cuisine.
+        Get random recommendations for a specific cuisine.
         
         Args:
             cuisine_name: Name of the cuisine or region
             limit: Maximum number of recommendations
+            weighted: Whether to favour popular recipes when sampling
             
         Returns:
             List of cuisine-specific recipes
         """
-        cuisine_items = get_cuisine_recommendations(cuisine_name, limit)
+        cuisine_items = candidate_pools.sample_cuisine(cuisine_name, limit, weighted)
         return [
             {
                 "id": str(item["id"]),
@@ -168,18 +167,19 @@ class ContentRecommender(BaseRecommender):
             for item in cuisine_items
         ]
     
-    def get_dietary_recommendations(self, dietary_restriction: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_dietary_recommendations(self, dietary_restriction: str, limit: int = 10, weighted: bool = False) -> List[Dict[str, Any]]:
         """
-        Get recommendations for a specific dietary restriction.
+        Get random recommendations for a specific dietary restriction.
         
         Args:
             dietary_restriction: Type of dietary restriction (vegan, pescetarian, etc.)
             limit: Maximum number of recommendations
+            weighted: Whether to favour popular recipes when sampling
             
         Returns:
             List of dietary-specific recipes
         """
-        dietary_items = get_dietary_recommendations(dietary_restriction, limit)
+        dietary_items = candidate_pools.sample_dietary(dietary_restriction, limit, weighted)
         return [
             {
                 "id": str(item["id"]),
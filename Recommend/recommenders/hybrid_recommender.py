@@ -9,6 +9,8 @@ from recommenders.base_recommender import BaseRecommender
 from recommenders.content_recommender import ContentRecommender
 from recommenders.collaborative_recommender import CollaborativeRecommender
 from recommenders.popularity_recommender import PopularityRecommender
+from config.config import HYBRID_POPULARITY_WINDOW
+from config.db import POOL_TIMEOUTS
 
 logger = logging.getLogger(__name__)
 
@@ -76,6 +78,8 @@ class HybridRecommender(BaseRecommender):
                             all_recommendations[item_id] = item
                 
                 logger.info(f"Collaborative filtering added {len(collaborative_items)} items")
+            except POOL_TIMEOUTS:
+                raise
             except Exception as e:
                 logger.error(f"Error getting collaborative recommendations: {e}")
         
@@ -104,15 +108,21 @@ class HybridRecommender(BaseRecommender):
                             all_recommendations[item_id] = item
                 
                 logger.info(f"Content-based filtering added {len(content_based_items)} items")
+            except POOL_TIMEOUTS:
+                raise
             except Exception as e:
                 logger.error(f"Error getting content-based recommendations: {e}")
         
         # Step 3: Add popularity-based recommendations to fill any gaps
         try:
+            # Decayed popularity by default, which is served from memory
+            popularity_kwargs = dict(kwargs)
+            popularity_kwargs.setdefault('time_window', HYBRID_POPULARITY_WINDOW)
+            
             popularity_items = self.popularity.get_recommendations(
                 content_type=content_type,
                 limit=limit * 2,  # Request more items for better blending
-                **kwargs
+                **popularity_kwargs
             )
             
             # Add to all recommendations with popularity weight
@@ -128,6 +138,8 @@ class HybridRecommender(BaseRecommender):
                         all_recommendations[item_id] = item
             
             logger.info(f"Popularity-based filtering added {len(popularity_items)} items")
+        except POOL_TIMEOUTS:
+            raise
         except Exception as e:
             logger.error(f"Error getting popularity-based recommendations: {e}")
         
@@ -154,31 +166,33 @@ class HybridRecommender(BaseRecommender):
         """
         return self.content.get_similar_recommendations(recipe_id, similarity_method, limit, **kwargs)
     
-    def get_cuisine_recommendations(self, cuisine_name: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_cuisine_recommendations(self, cuisine_name: str, limit: int = 10, weighted: bool = False) -> List[Dict[str, Any]]:
         """
         Get recommendations for a specific cuisine.
         
         Args:
             cuisine_name: Name of the cuisine or region
             limit: Maximum number of recommendations
+            weighted: Whether to favour popular recipes when sampling
             
         Returns:
             List of cuisine-specific recipes
         """
-        return self.content.get_cuisine_recommendations(cuisine_name, limit)
+        return self.content.get_cuisine_recommendations(cuisine_name, limit, weighted)
     
-    def get_dietary_recommendations(self, dietary_restriction: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_dietary_recommendations(self, dietary_restriction: str, limit: int = 10, weighted: bool = False) -> List[Dict[str, Any]]:
         """
         Get recommendations for a specific dietary restriction.
         
         Args:
             dietary_restriction: Type of dietary restriction
             limit: Maximum number of recommendations
+            weighted: Whether to favour popular recipes when sampling
             
         Returns:
             List of dietary-specific recipes
         """
-        return self.content.get_dietary_recommendations(dietary_restriction, limit)
+        return self.content.get_dietary_recommendations(dietary_restriction, limit, weighted)
     
     def get_trending_recommendations(self, time_window: str = "day", limit: int = 10, **kwargs) -> List[Dict[str, Any]]:
         """
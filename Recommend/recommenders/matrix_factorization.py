@@ -8,6 +8,7 @@ import pickle
 from typing import Dict, List, Any, Optional, Tuple
 
 from config.db import execute_query, execute_query_single, execute_transaction
+from models.queries_recommend import collaborative_since
 
 logger = logging.getLogger(__name__)
 
@@ -248,9 +249,10 @@ class MatrixFactorization:
                 END as rating
             FROM user_interactions
             WHERE interaction_type IN ('rating', 'like', 'save', 'cook')
+            AND timestamp >= %(since)s
             """
             
-            return execute_query(query)
+            return execute_query(query, {"since": collaborative_since()})
             
         except Exception as e:
             logger.error(f"Error loading interactions: {e}")
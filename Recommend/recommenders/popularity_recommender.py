@@ -1,11 +1,16 @@
 """
 Popularity-based recommender implementation.
 """
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 
 from recommenders.base_recommender import BaseRecommender
-from models.queries_recommend import get_trending_recipes
+from models.queries_recommend import (
+    get_trending_recipes, get_trending_recipes_async, get_recipe_titles, get_trending_diet_column
+)
+from cache.popularity import get_popularity_tracker
+from indexes.facets import get_facet_index
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +48,8 @@ class PopularityRecommender(BaseRecommender):
         Get trending recipes based on recent interactions.
         
         Args:
-            time_window: Time window for trending items (day, week, month)
+            time_window: Time window for trending items (day, week, month, or decay
+                for exponentially decayed popularity)
             limit: Maximum number of recommendations
             kwargs: Additional filters like cuisine and dietary_restriction
             
@@ -53,6 +59,9 @@ class PopularityRecommender(BaseRecommender):
         cuisine = kwargs.get('cuisine')
         dietary_restriction = kwargs.get('dietary_restriction')
         
+        if time_window == "decay":
+            return self.get_decayed_recommendations(limit, cuisine, dietary_restriction)
+        
         trending_items = get_trending_recipes(
             time_window=time_window,
             limit=limit,
@@ -60,4 +69,85 @@ class PopularityRecommender(BaseRecommender):
             dietary_restriction=dietary_restriction
         )
         
-        return trending_items
\ No newline at end of file
+        return trending_items
+    
+    async def get_trending_recommendations_async(self, time_window: str = "day", limit: int = 10,
+                                                 **kwargs) -> List[Dict[str, Any]]:
+        """
+        Async variant of get_trending_recommendations.
+        
+        The decay window is ranked in memory and only looks up titles, so it
+        runs in a worker thread rather than through the async pool.
+        """
+        cuisine = kwargs.get('cuisine')
+        dietary_restriction = kwargs.get('dietary_restriction')
+        
+        if time_window == "decay":
+            return await asyncio.to_thread(self.get_decayed_recommendations, limit, cuisine, dietary_restriction)
+        
+        return await get_trending_recipes_async(
+            time_window=time_window,
+            limit=limit,
+            cuisine=cuisine,
+            dietary_restriction=dietary_restriction
+        )
+    
+    def get_decayed_recommendations(self, limit: int = 10, cuisine: Optional[str] = None, 
+                                    dietary_restriction: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most popular recipes by exponentially decayed interaction score.
+        
+        Ranking comes from the in-memory popularity tracker and filters from the
+        facet index when it is available, so only a lookup of recipe titles goes
+        to the database.
+        
+        Args:
+            limit: Maximum number of recommendations
+            cuisine: Optional cuisine filter
+            dietary_restriction: Optional dietary restriction filter
+            
+        Returns:
+            List of popular recipes with scores normalized to the most popular recipe
+        """
+        tracker = get_popularity_tracker()
+        
+        # Resolve the filters to a candidate bitmap once
+        index = get_facet_index() if (cuisine or dietary_restriction) else None
+        bitmap = None
+        if index is not None:
+            bitmap = index.match(
+                cuisines=[cuisine] if cuisine else None,
+                partial_cuisine=True,
+                diets=[get_trending_diet_column(dietary_restriction)] if dietary_restriction else None
+            )
+        
+        # Filters drop candidates, so rank more than we need and widen if necessary
+        fetch_size = limit * 4 if (cuisine or dietary_restriction) else limit
+        
+        while True:
+            ranked = tracker.top(fetch_size)
+            if not ranked or ranked[0][1] <= 0:
+                return []
+            
+            max_score = ranked[0][1]
+            candidate_ids = [recipe_id for recipe_id, _ in ranked]
+            if bitmap is not None:
+                matches = get_recipe_titles(index.contains(bitmap, candidate_ids))
+            else:
+                matches = get_recipe_titles(candidate_ids, cuisine, dietary_restriction)
+            titles = {int(item["id"]): item["title"] for item in matches}
+            
+            items = [
+                {
+                    "id": recipe_id,
+                    "title": titles[recipe_id],
+                    "score": round(score / max_score, 4)
+                }
+                for recipe_id, score in ranked
+                if recipe_id in titles
+            ]
+            
+            if len(items) >= limit or len(ranked) < fetch_size:
+                return items[:limit]
+            
+            fetch_size *= 4
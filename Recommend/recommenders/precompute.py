@@ -0,0 +1,114 @@
+"""
+Batch job that precomputes hybrid recommendations for active users.
+
+Runs every PRECOMPUTE_INTERVAL seconds in a background thread of one worker
+process at a time, or once from the command line:
+
+    python -m recommenders.precompute
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from config.config import (
+    PRECOMPUTE_TOP_N, PRECOMPUTE_TTL, PRECOMPUTE_INTERVAL, PRECOMPUTE_ACTIVE_DAYS,
+    PRECOMPUTE_MAX_USERS, SCHEDULER_SLEEP_INTERVAL
+)
+from config.db import advisory_lock
+from models.queries_recommend import get_active_users, save_user_recommendations
+from recommenders.hybrid_recommender import HybridRecommender
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock that keeps the job to one worker process at a time
+PRECOMPUTE_LOCK = "recommend.precompute"
+
+def precompute_user_recommendations(max_users: int = PRECOMPUTE_MAX_USERS,
+                                    top_n: int = PRECOMPUTE_TOP_N) -> int:
+    """
+    Compute and store the top-N hybrid recommendations for the most active users.
+
+    Args:
+        max_users: Maximum number of users to process
+        top_n: Number of recommendations to store per user
+
+    Returns:
+        Number of users whose lists were stored
+    """
+    start_time = time.time()
+    users = get_active_users(since_days=PRECOMPUTE_ACTIVE_DAYS, limit=max_users)
+    if not users:
+        logger.info("No active users to precompute recommendations for")
+        return 0
+
+    recommender = HybridRecommender()
+    count = 0
+
+    for user in users:
+        user_id = user["user_id"]
+        try:
+            items = recommender.get_recommendations(user_id=user_id, limit=top_n)
+            compact = [
+                [str(item["id"]), item.get("title", ""),
+                 float(item["score"]) if item.get("score") is not None else None]
+                for item in items
+            ]
+            if save_user_recommendations(user_id, compact):
+                count += 1
+        except Exception as e:
+            logger.error(f"Error precomputing recommendations for user {user_id}: {e}")
+
+    execution_time = time.time() - start_time
+    logger.info(f"Precomputed recommendations for {count} users in {execution_time:.3f}s")
+    return count
+
+def run_scheduled_precompute() -> Optional[int]:
+    """
+    Precompute recommendations unless another worker process is already doing so.
+
+    Returns:
+        Number of users whose lists were stored, or None if another process holds the lock
+    """
+    with advisory_lock(PRECOMPUTE_LOCK) as locked:
+        if not locked:
+            logger.info("Recommendation precompute already running in another process")
+            return None
+        return precompute_user_recommendations()
+
+def precompute_task():
+    """Background task to periodically precompute recommendations."""
+    while True:
+        start_time = time.monotonic()
+        try:
+            logger.info("Starting scheduled recommendation precompute")
+            run_scheduled_precompute()
+        except Exception as e:
+            logger.error(f"Error in recommendation precompute task: {e}")
+
+        # The interval counts from the start of a run, so long runs do not push lists past their TTL
+        time.sleep(max(SCHEDULER_SLEEP_INTERVAL, PRECOMPUTE_INTERVAL - (time.monotonic() - start_time)))
+
+def start_precompute_scheduler():
+    """Start the recommendation precompute scheduler in a background thread."""
+    if PRECOMPUTE_INTERVAL <= 0:
+        logger.info("Recommendation precompute scheduler disabled")
+        return
+
+    if PRECOMPUTE_INTERVAL >= PRECOMPUTE_TTL:
+        logger.warning(
+            f"PRECOMPUTE_INTERVAL ({PRECOMPUTE_INTERVAL}s) is not shorter than PRECOMPUTE_TTL "
+            f"({PRECOMPUTE_TTL}s); lists will expire before they are recomputed"
+        )
+
+    scheduler_thread = threading.Thread(target=precompute_task, daemon=True)
+    scheduler_thread.start()
+    logger.info("Recommendation precompute scheduler started")
+
+if __name__ == "__main__":
+    from config.config import LOG_LEVEL, LOG_FORMAT
+    from config.db import initialize_pool
+
+    logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+    initialize_pool()
+    precompute_user_recommendations()
@@ -1,5 +1,6 @@
 -- Extension setup for pgvector
 CREATE EXTENSION IF NOT EXISTS vector;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Recipe-related tables
 CREATE TABLE IF NOT EXISTS recipes (
@@ -58,6 +59,18 @@ CREATE TABLE IF NOT EXISTS recipe_diet_attributes (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Full-text and trigram search (see migrations/001_recipe_text_search.sql)
+ALTER TABLE recipes ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(recipe_title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(source, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS recipes_search_vector_idx ON recipes USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS recipes_title_trgm_idx ON recipes USING gin (recipe_title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ingredients_name_trgm_idx ON ingredients USING gin (ingredient_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS recipe_ingredients_recipe_idx ON recipe_ingredients(recipe_id);
+CREATE INDEX IF NOT EXISTS recipe_ingredients_ingredient_idx ON recipe_ingredients(ingredient_id);
+
 -- Vector storage for recipe embeddings
 CREATE TABLE IF NOT EXISTS recipe_embeddings (
     embedding_id SERIAL PRIMARY KEY,
@@ -70,20 +83,138 @@ CREATE TABLE IF NOT EXISTS recipe_embeddings (
 -- Create index for fast similarity search
 CREATE INDEX IF NOT EXISTS recipe_embedding_idx ON recipe_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
 
--- User interaction tables
+-- User interaction tables, range partitioned by month on "timestamp"; partitions
+-- are created ahead and expired ones rolled up into user_interaction_daily by
+-- maintenance/interaction_retention.py
 CREATE TABLE IF NOT EXISTS user_interactions (
-    interaction_id SERIAL PRIMARY KEY,
+    interaction_id SERIAL,
     user_id VARCHAR(100) NOT NULL,
     recipe_id VARCHAR(100) NOT NULL,
+    recipe_key INTEGER REFERENCES recipes(recipe_id) ON DELETE SET NULL,
     interaction_type VARCHAR(50) NOT NULL,
     rating FLOAT,
-    interaction_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    "timestamp" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (interaction_id, "timestamp")
+) PARTITION BY RANGE ("timestamp");
+
+CREATE TABLE IF NOT EXISTS user_interactions_default PARTITION OF user_interactions DEFAULT;
+
+DO $$
+DECLARE
+    month_start DATE := date_trunc('month', CURRENT_TIMESTAMP)::date;
+BEGIN
+    FOR i IN 0..2 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF user_interactions FOR VALUES FROM (%L) TO (%L)',
+            'user_interactions_p' || to_char(month_start, 'YYYYMM'),
+            month_start,
+            (month_start + INTERVAL '1 month')::date
+        );
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+END
+$$;
+
+CREATE INDEX IF NOT EXISTS user_interactions_user_time_idx ON user_interactions(user_id, "timestamp");
+CREATE INDEX IF NOT EXISTS user_interactions_recipe_time_idx ON user_interactions(recipe_id, "timestamp");
+CREATE INDEX IF NOT EXISTS user_interactions_recipe_key_time_idx ON user_interactions(recipe_key, "timestamp");
+CREATE INDEX IF NOT EXISTS user_interactions_lookup_idx ON user_interactions(user_id, recipe_id, interaction_type);
+CREATE INDEX IF NOT EXISTS user_interactions_type_time_idx ON user_interactions(interaction_type, "timestamp");
+
+-- recipe_key is derived from recipe_id for writers that leave it out
+-- (see migrations/006_interaction_recipe_key_trigger.sql)
+CREATE OR REPLACE FUNCTION set_interaction_recipe_key() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW.recipe_key IS NOT NULL THEN
+        RETURN NEW;
+    END IF;
+    IF TG_OP = 'UPDATE' AND NEW.recipe_id IS NOT DISTINCT FROM OLD.recipe_id THEN
+        RETURN NEW;
+    END IF;
+    SELECT r.recipe_id INTO NEW.recipe_key
+    FROM recipes r
+    WHERE r.recipe_id = CASE WHEN NEW.recipe_id ~ '^[0-9]+$' THEN NEW.recipe_id::integer END;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_interactions_recipe_key ON user_interactions;
+CREATE TRIGGER user_interactions_recipe_key
+    BEFORE INSERT OR UPDATE OF recipe_id ON user_interactions
+    FOR EACH ROW EXECUTE FUNCTION set_interaction_recipe_key();
+
+-- Per-day interaction counts of events past the retention period
+CREATE TABLE IF NOT EXISTS user_interaction_daily (
+    day DATE NOT NULL,
+    user_id VARCHAR(100) NOT NULL,
+    recipe_id VARCHAR(100) NOT NULL,
+    interaction_type VARCHAR(50) NOT NULL,
+    interaction_count INTEGER NOT NULL,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum FLOAT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, user_id, recipe_id, interaction_type)
 );
 
-CREATE INDEX IF NOT EXISTS user_interactions_user_idx ON user_interactions(user_id);
-CREATE INDEX IF NOT EXISTS user_interactions_recipe_idx ON user_interactions(recipe_id);
-CREATE INDEX IF NOT EXISTS user_interactions_type_idx ON user_interactions(interaction_type);
-CREATE INDEX IF NOT EXISTS user_interactions_time_idx ON user_interactions(interaction_time);
+CREATE INDEX IF NOT EXISTS user_interaction_daily_user_idx ON user_interaction_daily(user_id, day);
+CREATE INDEX IF NOT EXISTS user_interaction_daily_recipe_idx ON user_interaction_daily(recipe_id, day);
+
+-- Exponentially decayed popularity scores (flushed by cache/popularity.py)
+CREATE TABLE IF NOT EXISTS recipe_popularity (
+    recipe_id INTEGER PRIMARY KEY REFERENCES recipes(recipe_id) ON DELETE CASCADE,
+    score FLOAT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Rating count and sum per recipe, kept equal to the ratings in user_interactions
+-- by a trigger (see migrations/007_rating_stats_trigger.sql)
+CREATE TABLE IF NOT EXISTS recipe_rating_stats (
+    recipe_id INTEGER PRIMARY KEY REFERENCES recipes(recipe_id) ON DELETE CASCADE,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum FLOAT NOT NULL DEFAULT 0,
+    avg_rating FLOAT GENERATED ALWAYS AS (rating_sum / NULLIF(rating_count, 0)) STORED,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS recipe_rating_stats_avg_idx ON recipe_rating_stats(avg_rating, recipe_id);
+
+CREATE OR REPLACE FUNCTION maintain_recipe_rating_stats() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.interaction_type = 'rating' AND OLD.rating IS NOT NULL AND OLD.recipe_key IS NOT NULL THEN
+            UPDATE recipe_rating_stats
+            SET rating_count = rating_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                updated_at = NOW()
+            WHERE recipe_id = OLD.recipe_key;
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.interaction_type = 'rating' AND NEW.rating IS NOT NULL AND NEW.recipe_key IS NOT NULL THEN
+            INSERT INTO recipe_rating_stats (recipe_id, rating_count, rating_sum, updated_at)
+            SELECT r.recipe_id, 1, NEW.rating, NOW()
+            FROM recipes r
+            WHERE r.recipe_id = NEW.recipe_key
+            ON CONFLICT (recipe_id) DO UPDATE
+            SET rating_count = recipe_rating_stats.rating_count + 1,
+                rating_sum = recipe_rating_stats.rating_sum + EXCLUDED.rating_sum,
+                updated_at = NOW();
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_interactions_rating_stats ON user_interactions;
+CREATE TRIGGER user_interactions_rating_stats
+    AFTER INSERT OR UPDATE OF rating, interaction_type, recipe_key OR DELETE ON user_interactions
+    FOR EACH ROW EXECUTE FUNCTION maintain_recipe_rating_stats();
+
+-- Precomputed hybrid recommendations, items stored as [id, title, score] arrays
+CREATE TABLE IF NOT EXISTS user_recommendations (
+    user_id VARCHAR(100) PRIMARY KEY,
+    items JSONB NOT NULL,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
 
 -- Matrix factorization model storage
 CREATE TABLE IF NOT EXISTS matrix_factorization_models (
@@ -99,7 +230,7 @@ CREATE TABLE IF NOT EXISTS matrix_factorization_models (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- View for trending recipes
+-- View for trending recipes (see migrations/005_trending_view_recipe_key.sql)
 CREATE OR REPLACE VIEW trending_recipes AS
 SELECT 
     r.recipe_id as id,
@@ -109,10 +240,10 @@ SELECT
     COUNT(CASE WHEN ui.interaction_type = 'like' THEN 1 ELSE NULL END) as like_count,
     COUNT(CASE WHEN ui.interaction_type = 'save' THEN 1 ELSE NULL END) as save_count,
     COUNT(CASE WHEN ui.interaction_type = 'cook' THEN 1 ELSE NULL END) as cook_count,
-    MAX(ui.interaction_time) as last_interaction
+    MAX(ui."timestamp") as last_interaction
 FROM recipes r
-JOIN user_interactions ui ON r.recipe_id::text = ui.recipe_id
-WHERE ui.interaction_time > (CURRENT_TIMESTAMP - INTERVAL '7 days')
+JOIN user_interactions ui ON ui.recipe_key = r.recipe_id
+WHERE ui."timestamp" > (CURRENT_TIMESTAMP - INTERVAL '7 days')
 GROUP BY r.recipe_id, r.recipe_title
 ORDER BY interaction_count DESC;
 
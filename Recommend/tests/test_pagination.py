@@ -0,0 +1,55 @@
+"""
+Tests for keyset pagination of recipe searches.
+"""
+import re
+
+import indexes.facets
+import models.queries_recipe as queries_recipe
+from models.pagination import decode_cursor, encode_cursor
+
+# Relevance scores as Postgres computes them in double precision, with ties
+SCORES = [0.1 + 0.2, 0.3, 0.3, 1 / 3, 1 / 3, 1 / 3, 0.0607927, 0.0607927, 2 / 7, 0.0]
+
+def fake_search_database(recipes):
+    """Stand in for execute_query, ordering recipes by (score, id) descending as the SQL does."""
+    queries = []
+
+    def execute_query(query, params=None, statement=None):
+        queries.append(query)
+        rows = sorted(recipes, key=lambda row: (row["sort_key"], row["recipe_id"]), reverse=True)
+        if "cursor_key" in params:
+            position = (params["cursor_key"], params["cursor_id"])
+            rows = [row for row in rows if (row["sort_key"], row["recipe_id"]) < position]
+        return [dict(row) for row in rows[:params["limit"]]]
+
+    return execute_query, queries
+
+def test_relevance_cursor_pages_cover_every_row_once(monkeypatch):
+    recipes = [{"recipe_id": recipe_id, "sort_key": score} for recipe_id, score in enumerate(SCORES, start=1)]
+    execute_query, queries = fake_search_database(recipes)
+    monkeypatch.setattr(queries_recipe, "execute_query", execute_query)
+    monkeypatch.setattr(queries_recipe, "text_search_available", lambda: True)
+    monkeypatch.setattr(queries_recipe, "rating_stats_available", lambda: False)
+    monkeypatch.setattr(queries_recipe, "hydrate_recipes", lambda rows, fields: None)
+    monkeypatch.setattr(queries_recipe, "count_recipes", lambda query, params, mode: len(recipes))
+    monkeypatch.setattr(indexes.facets, "inline_candidate_ids", lambda **filters: None)
+
+    seen, cursor = [], None
+    for _ in range(len(recipes)):
+        page = queries_recipe.search_recipes(query="stew", sort_by="relevance", limit=3, cursor=cursor)
+        seen.extend(recipe["recipe_id"] for recipe in page["results"])
+        cursor = page["pagination"]["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(seen) == [recipe["recipe_id"] for recipe in recipes]
+    assert len(seen) == len(set(seen))
+    # The database must produce the key as float8, or it cannot equal the cursor's value
+    assert re.search(r"\)::float8\s+as sort_key", queries[0])
+
+def test_cursor_keeps_float_keys_exact():
+    for score in SCORES:
+        assert decode_cursor(encode_cursor("relevance:desc", score, 7), "relevance:desc") == (score, 7)
+
+def test_cursor_of_other_sort_order_is_rejected():
+    assert decode_cursor(encode_cursor("time:asc", 10, 7), "relevance:desc") is None
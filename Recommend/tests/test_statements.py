@@ -0,0 +1,71 @@
+"""
+Tests for the conversion of %(name)s queries to PREPARE/EXECUTE syntax.
+"""
+from config.statements import PreparedStatement, StatementRegistry
+
+class FakeConnection:
+    """Stands in for a database connection; the registry only tracks it by identity."""
+
+class FakeCursor:
+    """Records the SQL executed on it."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.executed = []
+
+    def execute(self, sql, values=None):
+        self.executed.append((sql, values))
+
+def test_placeholders_are_numbered_in_order_of_first_use():
+    statement = PreparedStatement("trending", "SELECT * FROM t WHERE a = %(a)s AND b = %(b)s LIMIT %(limit)s")
+
+    assert statement.param_names == ["a", "b", "limit"]
+    assert statement.prepare_sql == f"PREPARE {statement.server_name} AS SELECT * FROM t WHERE a = $1 AND b = $2 LIMIT $3"
+    assert statement.execute_sql == f"EXECUTE {statement.server_name}(%s, %s, %s)"
+
+def test_repeated_placeholder_reuses_its_number():
+    statement = PreparedStatement("similar", "SELECT %(user_id)s, x FROM t WHERE u <> %(user_id)s AND y = %(y)s")
+
+    assert statement.param_names == ["user_id", "y"]
+    assert statement.prepare_sql.endswith("AS SELECT $1, x FROM t WHERE u <> $1 AND y = $2")
+    assert statement.values({"y": 2, "user_id": "u1"}) == ["u1", 2]
+
+def test_escaped_percent_becomes_literal():
+    statement = PreparedStatement("search", "SELECT * FROM t WHERE title ILIKE '%%' || %(term)s || '%%'")
+
+    assert statement.prepare_sql.endswith("AS SELECT * FROM t WHERE title ILIKE '%' || $1 || '%'")
+    assert statement.execute_sql == f"EXECUTE {statement.server_name}(%s)"
+
+def test_query_without_placeholders_executes_without_arguments():
+    statement = PreparedStatement("all", "SELECT 1")
+
+    assert statement.param_names == []
+    assert statement.execute_sql == f"EXECUTE {statement.server_name}"
+    assert statement.values(None) == []
+
+def test_server_name_depends_on_query_text():
+    first = PreparedStatement("trending", "SELECT 1")
+    again = PreparedStatement("trending", "SELECT 1")
+    variant = PreparedStatement("trending", "SELECT 2")
+
+    assert first.server_name == again.server_name
+    assert first.server_name != variant.server_name
+    assert first.server_name.startswith("trending_")
+
+def test_registry_prepares_once_per_connection():
+    registry = StatementRegistry()
+    conn, other = FakeConnection(), FakeConnection()
+    cursor = FakeCursor(conn)
+
+    registry.execute(cursor, "lookup", "SELECT * FROM t WHERE id = %(id)s", {"id": 1})
+    registry.execute(cursor, "lookup", "SELECT * FROM t WHERE id = %(id)s", {"id": 2})
+    registry.execute(FakeCursor(other), "lookup", "SELECT * FROM t WHERE id = %(id)s", {"id": 3})
+
+    prepares = [sql for sql, _ in cursor.executed if sql.startswith("PREPARE")]
+    assert len(prepares) == 1
+    assert cursor.executed[-1][1] == [2]
+
+    stats = registry.stats()["lookup"]
+    assert stats["calls"] == 3
+    assert stats["prepares"] == 2
+    assert stats["prepares_per_call"] == round(2 / 3, 3)